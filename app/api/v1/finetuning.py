@@ -1,14 +1,54 @@
 from fastapi import APIRouter, HTTPException
-from app.schemas.requests import ExpandIn, ExpandOut, TokenUsage
-from app.services.text_expander import generate_expansion
+from starlette.concurrency import run_in_threadpool
+from app.schemas.requests import (
+    FinetunedExpandIn, FinetunedExpandOut, FinetunedSummarizeIn, FinetunedSummarizeOut, TokenUsage
+)
+from app.core.config import FINETUNED_SUMMARIZE_ADAPTER, FINETUNED_EXPAND_ADAPTER
 from app.core.constants import MODEL_ID
+from app.models.adapters import AdaptersUnavailable, adapters
+from app.services.finetuned import expand_with_adapter, summarize_with_adapter
 
 router = APIRouter()
 
-@router.post("/finetuned_summarize", response_model=ExpandOut)
-def expand_endpoint(payload: ExpandIn):
-    pass
+async def _run_on_adapter(adapter: str, fn, *args):
+    try:
+        adapters.path(adapter)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown adapter: {adapter}")
+    try:
+        return await run_in_threadpool(fn, adapter, *args)
+    except AdaptersUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-@router.post("/finetuned_expand", response_model=ExpandOut)
-def expand_endpoint(payload: ExpandIn):
-    pass
+@router.post("/finetuned_summarize", response_model=FinetunedSummarizeOut)
+async def finetuned_summarize_endpoint(payload: FinetunedSummarizeIn):
+    if not payload.transcript.strip():
+        raise HTTPException(status_code=400, detail="transcript cannot be empty")
+
+    adapter = payload.adapter or FINETUNED_SUMMARIZE_ADAPTER
+    summary, tokens, safety = await _run_on_adapter(
+        adapter, summarize_with_adapter,
+        payload.prompt, payload.transcript, payload.user_type, payload.note_type
+    )
+    return FinetunedSummarizeOut(
+        summary=summary,
+        model=MODEL_ID,
+        adapter=adapter,
+        tokens=TokenUsage(**tokens),
+        safety=safety
+    )
+
+@router.post("/finetuned_expand", response_model=FinetunedExpandOut)
+async def finetuned_expand_endpoint(payload: FinetunedExpandIn):
+    if not payload.brief.strip():
+        raise HTTPException(status_code=400, detail="brief cannot be empty")
+
+    adapter = payload.adapter or FINETUNED_EXPAND_ADAPTER
+    expanded, tokens, safety = await _run_on_adapter(adapter, expand_with_adapter, payload)
+    return FinetunedExpandOut(
+        expanded_text=expanded,
+        model=MODEL_ID,
+        adapter=adapter,
+        tokens=TokenUsage(**tokens),
+        safety=safety
+    )
@@ -1,19 +1,48 @@
-from fastapi import APIRouter, HTTPException
+import json
+import threading
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from app.schemas.requests import ExpandIn, ExpandOut, TokenUsage
-from app.services.text_expander import generate_expansion
+from app.services.output_cache import cache_bypassed
+from app.services.text_expander import generate_expansion, stream_expansion
 from app.core.constants import MODEL_ID
 
 router = APIRouter()
 
 @router.post("/expand", response_model=ExpandOut)
-def expand_endpoint(payload: ExpandIn):
+async def expand_endpoint(payload: ExpandIn, request: Request, stream: bool = False):
     if not payload.brief.strip():
         raise HTTPException(status_code=400, detail="brief cannot be empty")
 
-    expanded, tokens = generate_expansion(payload)
+    use_cache = not cache_bypassed(request.headers)
+    if stream:
+        return StreamingResponse(_sse_expansion(payload, request, use_cache), media_type="text/event-stream")
+
+    expanded, tokens, safety = await run_in_threadpool(generate_expansion, payload, use_cache)
     return ExpandOut(
         expanded_text=expanded,
         model=MODEL_ID,
         tokens=TokenUsage(**tokens),
-        safety={"pii_removed": True, "disclaimer_added": True}
+        safety=safety
     )
+
+async def _sse_expansion(payload: ExpandIn, request: Request, use_cache: bool = True):
+    cancelled = threading.Event()
+    try:
+        async for event, data in iterate_in_threadpool(stream_expansion(payload, cancelled, use_cache)):
+            if await request.is_disconnected():
+                # Client went away: stop burning CPU on tokens nobody reads
+                break
+            if event in ("token", "disclaimer"):
+                data = {"text": data}
+            elif event == "usage":
+                data = {
+                    "model": MODEL_ID,
+                    "tokens": TokenUsage(**data["tokens"]).model_dump(),
+                    "safety": data["safety"],
+                }
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    finally:
+        cancelled.set()
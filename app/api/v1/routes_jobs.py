@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import tempfile
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import JOB_UPLOAD_DIR
+from app.core.constants import NOTE_TYPE_MAP
+from app.models.whisper import RECORDED_MODEL_SIZE
+from app.services.jobs import get_job_queue, TERMINAL_STATES
+from app.services.output_cache import cache_bypassed
+from app.utils.audio import copy_and_hash
+
+router = APIRouter()
+
+JOB_EVENT_POLL_SECONDS = 0.5
+
+
+def _spool_upload(audio_file: UploadFile):
+    """Persist the upload for the worker, hashing it on the way to disk."""
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    suffix = os.path.splitext(audio_file.filename or "")[-1]
+    fd, path = tempfile.mkstemp(dir=JOB_UPLOAD_DIR, suffix=suffix)
+    with os.fdopen(fd, "wb") as out:
+        audio_hash = copy_and_hash(audio_file.file, out)
+    return path, audio_hash
+
+
+@router.post("/transcribe-recorded/jobs", status_code=202)
+async def submit_transcription_job(
+    request: Request,
+    user_type: str = Form(...),
+    note_type: str = Form(...),
+    prompt: str = Form(...),
+    audio_file: UploadFile = File(...),
+):
+    if user_type not in NOTE_TYPE_MAP:
+        raise HTTPException(status_code=400, detail="Invalid user_type")
+    if note_type not in NOTE_TYPE_MAP[user_type]:
+        raise HTTPException(status_code=400, detail="Invalid note_type for given user_type")
+
+    audio_path, audio_hash = await run_in_threadpool(_spool_upload, audio_file)
+    job = await run_in_threadpool(
+        get_job_queue().submit,
+        "transcribe",
+        {
+            "audio_path": audio_path,
+            "audio_hash": audio_hash,
+            "user_type": user_type,
+            "note_type": note_type,
+            "prompt": prompt,
+            "model_size": RECORDED_MODEL_SIZE,
+            "use_cache": not cache_bypassed(request.headers),
+        },
+    )
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/v1/jobs/{job['job_id']}",
+        "events_url": f"/v1/jobs/{job['job_id']}/events",
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(get_job_queue().store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    store = get_job_queue().store
+    if await run_in_threadpool(store.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        last_status = None
+        while True:
+            job = await run_in_threadpool(store.get, job_id)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {json.dumps(job)}\n\n"
+            if job["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
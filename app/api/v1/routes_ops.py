@@ -0,0 +1,91 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import PRELOAD_MODELS
+from app.core.metrics import render_metrics
+from app.inference import client as model_client
+from app.models.adapters import adapters
+from app.models.registry import registry
+from app.models.backends import get_backend
+from app.services.providers import provider_stats
+from app.utils.cache import cache_stats
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    return cache_stats()
+
+
+@router.get("/expand/backend/stats")
+def get_backend_stats():
+    """Generation backend in use, with its batching and prefix-cache counters."""
+    return get_backend().stats()
+
+
+@router.get("/providers/stats")
+def get_provider_stats():
+    """Request, retry and in-flight counters for the hosted LLM clients."""
+    return provider_stats()
+
+
+@router.get("/adapters")
+def get_adapters():
+    """Fine-tuned adapters on disk and in memory, with load/eviction counters."""
+    return adapters.stats()
+
+
+@router.get("/models")
+def get_models():
+    if model_client.installed():
+        return {**registry.status(), **model_client.models_status()}
+    return registry.status()
+
+
+@router.get("/models/pool")
+def get_model_pool():
+    """Memory budget occupancy, busy/waiting callers and slot wait times for loaded models."""
+    if model_client.installed():
+        return {"local": registry.pool_stats(), "model_servers": model_client.pool_stats()}
+    return registry.pool_stats()
+
+
+@router.post("/warmup")
+async def warmup(models: Optional[List[str]] = None):
+    """
+    Load and run one dummy inference on each model (default: PRELOAD_MODELS).
+    """
+    names = models or PRELOAD_MODELS
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {unknown}")
+
+    results = {}
+    for name in names:
+        if model_client.installed() and name in model_client.REMOTE_MODELS:
+            results[name] = await run_in_threadpool(model_client.warmup, name)
+        else:
+            results[name] = await run_in_threadpool(registry.warmup, name)
+    return results
+
+
+@router.get("/ready")
+def ready():
+    if model_client.installed():
+        remote = model_client.models_status()
+        pending = [name for name in PRELOAD_MODELS if not remote.get(name, {}).get("loaded", registry.is_loaded(name))]
+    else:
+        pending = [name for name in PRELOAD_MODELS if not registry.is_loaded(name)]
+    if pending:
+        return JSONResponse(status_code=503, content={"ready": False, "pending": pending})
+    return {"ready": True}
@@ -1,76 +1,172 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from app.core.config import REDACT_TRANSCRIPTS
 from app.core.constants import NOTE_TYPE_MAP
-from app.models.whisper import get_whisper_model
-from app.models.summarizer import summarize_text
 from app.models.summarizer_claude import summarize_text as summarize_claude
 from app.models.summarizer_openai import summarize_text as summarize_openai
-from app.utils.audio import convert_to_wav, get_file_hash, cleanup_files
-from app.services.transcriber import transcribe_audio
-import tempfile, shutil, os
+from app.models.whisper import RECORDED_MODEL_SIZE, get_whisper_model
+from app.models.summarizer import summarize_text
+from app.services.output_cache import cache_bypassed
+from app.services.pipeline import run_transcription, stream_transcription
+from app.services.providers import ProviderError, ProviderNotConfigured
+from app.services.redaction import redact, redact_batch, safety_flags
+from app.services.streaming import DECODERS, StreamingTranscriber
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+import io
+import json
+import os
 import re
 
 
 router = APIRouter()
 
-transcript_cache = {}
-
 @router.post("/transcribe-live")
 async def transcribe_live(
+    request: Request,
     user_type: str = Form(...),
     note_type: str = Form(...),
     prompt: str = Form(...),
-    audio_file: UploadFile = File(...)
+    audio_file: UploadFile = File(...),
+    stream: bool = False
 ):
-    return await _transcribe(user_type, note_type, prompt, audio_file, model_size="base")
+    return await _transcribe(request, user_type, note_type, prompt, audio_file, model_size="base", stream=stream)
 
 
 @router.post("/transcribe-recorded")
 async def transcribe_recorded(
+    request: Request,
     user_type: str = Form(...),
     note_type: str = Form(...),
     prompt: str = Form(...),
-    audio_file: UploadFile = File(...)
+    audio_file: UploadFile = File(...),
+    stream: bool = False
 ):
-    return await _transcribe(user_type, note_type, prompt, audio_file, model_size="large-v3")
-
-
-async def _transcribe(user_type, note_type, prompt, audio_file, model_size):
+    return await _transcribe(request, user_type, note_type, prompt, audio_file, model_size=RECORDED_MODEL_SIZE, stream=stream)
+
+
+@router.websocket("/transcribe-live/stream")
+async def transcribe_live_stream(
+    websocket: WebSocket,
+    user_type: str,
+    note_type: str,
+    prompt: str,
+    encoding: str = "pcm_s16le",
+    sample_rate: int = 16000,
+    channels: int = 1,
+):
+    """
+    Stream audio chunks in as binary messages; partial and final segments
+    are pushed back as they are recognized. Send the text message "stop"
+    to finish and receive the summarized note.
+    """
+    await websocket.accept()
+
+    error = None
     if user_type not in NOTE_TYPE_MAP:
-        raise HTTPException(status_code=400, detail="Invalid user_type")
-    if note_type not in NOTE_TYPE_MAP[user_type]:
-        raise HTTPException(status_code=400, detail="Invalid note_type for given user_type")
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(audio_file.filename)[-1]) as tmp_orig:
-        temp_orig_path = tmp_orig.name
-        shutil.copyfileobj(audio_file.file, tmp_orig)
-
-    temp_wav_path = temp_orig_path + ".wav"
+        error = "Invalid user_type"
+    elif note_type not in NOTE_TYPE_MAP[user_type]:
+        error = "Invalid note_type for given user_type"
+    elif encoding not in DECODERS:
+        error = f"Unsupported encoding; expected one of {sorted(DECODERS)}"
+    if error:
+        await websocket.send_json({"type": "error", "detail": error})
+        await websocket.close(code=1008)
+        return
+
+    decoder = DECODERS[encoding](sample_rate=sample_rate, channels=channels)
+    # Load before accepting audio so the first window isn't stuck behind it
+    await run_in_threadpool(get_whisper_model, "base")
+    stream = StreamingTranscriber("base")
+
+    async def push(result):
+        if REDACT_TRANSCRIPTS:
+            # Copies: the transcriber keeps the raw text for its prompt and final transcript
+            final, partial = [dict(s) for s in result["final"]], [dict(s) for s in result["partial"]]
+            redactions = await run_in_threadpool(redact_batch, [s["text"] for s in final + partial])
+            for segment, redaction in zip(final + partial, redactions):
+                segment["text"] = redaction.text
+            result = {"final": final, "partial": partial}
+        for segment in result["final"]:
+            await websocket.send_json({"type": "final", **segment})
+        if result["partial"]:
+            await websocket.send_json({
+                "type": "partial",
+                "text": " ".join(s["text"] for s in result["partial"]),
+                "start": result["partial"][0]["start"],
+                "end": result["partial"][-1]["end"],
+            })
 
     try:
-        convert_to_wav(temp_orig_path, temp_wav_path)
-        audio_hash = get_file_hash(temp_wav_path)
-
-        if audio_hash in transcript_cache:
-            raw_transcript = transcript_cache[audio_hash]
-        else:
-            model = get_whisper_model(model_size)
-            raw_transcript = transcribe_audio(model, temp_wav_path)
-            transcript_cache[audio_hash] = raw_transcript
-
-        summary = summarize_text(prompt, raw_transcript)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                stream.feed(decoder.decode(message["bytes"]))
+                if stream.ready():
+                    await push(await run_in_threadpool(stream.process))
+            elif message.get("text", "").strip().lower() == "stop":
+                break
+
+        await push(await run_in_threadpool(stream.process, True))
+        raw_transcript = stream.transcript
+        if REDACT_TRANSCRIPTS:
+            transcript_redaction = await run_in_threadpool(redact, raw_transcript)
+            raw_transcript = transcript_redaction.text
+        summary = await run_in_threadpool(summarize_text, prompt, raw_transcript) if raw_transcript else ""
+
+        metadata = {
+            "user_type": user_type,
+            "note_type": note_type
+        }
+        if REDACT_TRANSCRIPTS:
+            summary_redaction = await run_in_threadpool(redact, summary)
+            summary = summary_redaction.text
+            metadata["safety"] = safety_flags(transcript_redaction, summary_redaction)
 
-        return {
+        await websocket.send_json({
+            "type": "summary",
             "original_transcript": raw_transcript,
             "formatted_text": summary,
             "prompt_used": prompt,
-            "metadata": {
-                "user_type": user_type,
-                "note_type": note_type
-            }
-        }
+            "metadata": metadata
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+async def _transcribe(request, user_type, note_type, prompt, audio_file, model_size, stream=False):
+    """
+    With stream=True the response is server-sent events: "segment" and
+    "partial_summary" as the recording is transcribed and summarized in
+    one pipelined pass, then "result" with the usual response body (or
+    "error").
+    """
+    if user_type not in NOTE_TYPE_MAP:
+        raise HTTPException(status_code=400, detail="Invalid user_type")
+    if note_type not in NOTE_TYPE_MAP[user_type]:
+        raise HTTPException(status_code=400, detail="Invalid note_type for given user_type")
 
-    finally:
-        cleanup_files([temp_orig_path, temp_wav_path])
+    suffix = os.path.splitext(audio_file.filename or "")[-1]
+    use_cache = not cache_bypassed(request.headers)
+    if stream:
+        # The upload is closed once this handler returns, before the events are read
+        audio = io.BytesIO(await audio_file.read())
+        events = stream_transcription(audio, user_type, note_type, prompt, model_size, suffix, use_cache=use_cache)
+        return StreamingResponse(_sse_transcription(events, request), media_type="text/event-stream")
+    return await run_in_threadpool(
+        run_transcription, audio_file.file, user_type, note_type, prompt, model_size, suffix,
+        use_cache=use_cache,
+    )
+
+
+async def _sse_transcription(events, request: Request):
+    async for event, data in iterate_in_threadpool(events):
+        if await request.is_disconnected():
+            # The run finishes in the background so its transcript is cached
+            break
+        yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # @router.post("/summarize-text-claude")
 # async def summarize_text_claude(
@@ -97,6 +193,7 @@ async def _transcribe(user_type, note_type, prompt, audio_file, model_size):
 
 @router.post("/summarize-text")
 async def summarize_text_openai(
+    request: Request,
     user_type: str = Form(...),
     note_type: str = Form(...),
     prompt: str = Form(...),
@@ -107,16 +204,34 @@ async def summarize_text_openai(
     if note_type not in NOTE_TYPE_MAP[user_type]:
         raise HTTPException(status_code=400, detail="Invalid note_type for given user_type")
 
-    summary = await summarize_openai(prompt, long_text, user_type, note_type)
+    if REDACT_TRANSCRIPTS:
+        # Redact before the text leaves for the provider
+        text_redaction = await run_in_threadpool(redact, long_text)
+        long_text = text_redaction.text
+
+    try:
+        summary = await summarize_openai(
+            prompt, long_text, user_type, note_type, use_cache=not cache_bypassed(request.headers)
+        )
+    except ProviderNotConfigured as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ProviderError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
     cleaned_text = re.sub(r"\s+", " ", summary.replace("\n", " ")).strip()
 
+    metadata = {
+        "user_type": user_type,
+        "note_type": note_type
+    }
+    if REDACT_TRANSCRIPTS:
+        summary_redaction = await run_in_threadpool(redact, cleaned_text)
+        cleaned_text = summary_redaction.text
+        metadata["safety"] = safety_flags(text_redaction, summary_redaction)
+
     return {
         "original_transcript": long_text,
         "formatted_text": cleaned_text,
         "prompt_used": prompt,
-        "metadata": {
-            "user_type": user_type,
-            "note_type": note_type
-        }
+        "metadata": metadata
     }
\ No newline at end of file
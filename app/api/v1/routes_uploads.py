@@ -0,0 +1,115 @@
+import re
+
+from fastapi import APIRouter, Form, HTTPException, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.core.constants import NOTE_TYPE_MAP
+from app.models.whisper import RECORDED_MODEL_SIZE
+from app.schemas.requests import UploadCreateIn
+from app.services.output_cache import cache_bypassed
+from app.services.pipeline import run_transcription
+from app.services.uploads import UploadError, get_upload_store
+
+router = APIRouter()
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+def _http_error(e: UploadError) -> HTTPException:
+    headers = {"Upload-Offset": str(e.received)} if e.received is not None else None
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers=headers)
+
+
+def _with_urls(status: dict) -> dict:
+    upload_url = f"/v1/uploads/{status['upload_id']}"
+    return {**status, "upload_url": upload_url, "finalize_url": f"{upload_url}/finalize"}
+
+
+@router.post("/uploads", status_code=201)
+async def create_upload(body: UploadCreateIn):
+    """Start a resumable upload; PUT byte ranges to upload_url, then POST to finalize_url."""
+    try:
+        status = await run_in_threadpool(get_upload_store().create, body.filename, body.size)
+    except UploadError as e:
+        raise _http_error(e)
+    return _with_urls(status)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    try:
+        return _with_urls(await run_in_threadpool(get_upload_store().status, upload_id))
+    except UploadError as e:
+        raise _http_error(e)
+
+
+@router.put("/uploads/{upload_id}")
+async def put_upload_range(upload_id: str, request: Request):
+    """
+    Store the body as the bytes given by `Content-Range: bytes start-end/size`.
+    Ranges go in order; after a dropped connection, GET the upload and
+    resume from `received`. Bytes received before a disconnect are kept.
+    """
+    match = _CONTENT_RANGE.match(request.headers.get("content-range", ""))
+    if match is None:
+        raise HTTPException(status_code=400, detail="Content-Range: bytes <start>-<end>/<size> is required")
+    start, end = int(match.group(1)), int(match.group(2))
+    total = None if match.group(3) == "*" else int(match.group(3))
+
+    store = get_upload_store()
+    try:
+        writer = await run_in_threadpool(store.open_range, upload_id, start, end, total)
+        try:
+            async for chunk in request.stream():
+                await run_in_threadpool(writer.write, chunk)
+        finally:
+            await run_in_threadpool(writer.close)
+        return _with_urls(await run_in_threadpool(store.status, upload_id))
+    except UploadError as e:
+        raise _http_error(e)
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    request: Request,
+    upload_id: str,
+    user_type: str = Form(...),
+    note_type: str = Form(...),
+    prompt: str = Form(...),
+):
+    """
+    Transcribe and summarize a complete upload like /transcribe-recorded,
+    then delete it. If transcription fails the upload is kept, so finalize
+    can be retried without uploading again.
+    """
+    if user_type not in NOTE_TYPE_MAP:
+        raise HTTPException(status_code=400, detail="Invalid user_type")
+    if note_type not in NOTE_TYPE_MAP[user_type]:
+        raise HTTPException(status_code=400, detail="Invalid note_type for given user_type")
+
+    store = get_upload_store()
+    try:
+        upload = await run_in_threadpool(store.finalize, upload_id)
+    except UploadError as e:
+        raise _http_error(e)
+    try:
+        result = await run_in_threadpool(
+            run_transcription, upload["path"], user_type, note_type, prompt, RECORDED_MODEL_SIZE, upload["suffix"],
+            audio_hash=upload["audio_hash"],
+            use_cache=not cache_bypassed(request.headers),
+            decoded=upload["decoded"],
+        )
+    except BaseException:
+        store.release(upload_id)
+        raise
+    await run_in_threadpool(store.delete, upload_id)
+    return result
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    try:
+        await run_in_threadpool(get_upload_store().delete, upload_id)
+    except UploadError as e:
+        raise _http_error(e)
+    return Response(status_code=204)
@@ -0,0 +1,329 @@
+"""
+Offline batch runner for summarization and expansion.
+
+    python -m app.cli.batch summarize data/notes_summary.csv -o summaries.jsonl
+    python -m app.cli.batch expand data/notes_generation.csv -o expansions.parquet --workers 2
+
+Rows are streamed from the CSV, grouped into batches and run on a process
+pool through the same summarize_text / generate_expansion code the API
+uses. Results are appended to the output as batches finish and a
+checkpoint file (<output>.checkpoint) records which rows are done, so a
+killed run picks up where it stopped when started again with the same
+arguments. Rows that fail are reported and left unchecked, so a rerun
+retries them. An existing output with no checkpoint is left alone and the
+run refuses to start.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+
+
+# Tasks return one entry per row, in order: the row's result, or the
+# exception it failed with.
+
+def _summarize_batch(rows: list) -> list:
+    from app.models.summarizer import summarize_texts
+
+    summaries = summarize_texts([(row["prompt"], row["notes"]) for row in rows])
+    return [{"id": row["uuid"], "summary": summary} for row, summary in zip(rows, summaries)]
+
+
+def _expand_batch(rows: list) -> list:
+    from app.schemas.requests import ExpandIn
+    from app.services.text_expander import generate_expansion
+
+    def run(row):
+        try:
+            expanded, tokens, safety = generate_expansion(
+                ExpandIn(brief=row["brief"], audience=row["audience"], tone=row["tone"])
+            )
+        except Exception as e:
+            return e
+        return {
+            "id": row["uuid"],
+            "expanded_text": expanded,
+            "prompt_tokens": tokens["prompt"],
+            "completion_tokens": tokens["completion"],
+            "pii_removed": safety["pii_removed"],
+        }
+
+    # Submitted concurrently so the expand micro-batcher can coalesce them
+    with ThreadPoolExecutor(max_workers=len(rows)) as pool:
+        return list(pool.map(run, rows))
+
+
+TASKS = {
+    "summarize": _summarize_batch,
+    "expand": _expand_batch,
+}
+
+
+def _run_row(task: str, row: dict):
+    try:
+        return TASKS[task]([row])[0]
+    except Exception as e:
+        return e
+
+
+def _run_batch(task: str, rows: list):
+    """Worker entry point: (results, errors) for one batch. Failed rows are
+    retried on their own, so one bad row doesn't fail its whole batch and
+    rows that succeeded aren't run twice."""
+    try:
+        outcomes = TASKS[task](rows)
+    except Exception as e:
+        outcomes = [e] * len(rows)
+    results, errors = [], []
+    for row, outcome in zip(rows, outcomes):
+        if isinstance(outcome, Exception) and len(rows) > 1:
+            outcome = _run_row(task, row)
+        if isinstance(outcome, Exception):
+            errors.append({"id": row["uuid"], "error": f"{type(outcome).__name__}: {outcome}"})
+        else:
+            results.append(outcome)
+    return results, errors
+
+
+def _init_worker(threads: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+class JsonlWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "ab")
+
+    def write(self, rows: list):
+        for row in rows:
+            self._file.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+        return self._sync()
+
+    def _sync(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    @staticmethod
+    def rollback(path: str, position: int):
+        """Drop anything written after the last checkpoint."""
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                f.truncate(position)
+
+    def close(self):
+        self._file.close()
+
+
+class CsvWriter(JsonlWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._text = None
+        self._writer = None
+
+    def write(self, rows: list):
+        if self._writer is None:
+            import io
+
+            self._text = io.TextIOWrapper(self._file, encoding="utf-8", newline="", write_through=True)
+            self._writer = csv.DictWriter(self._text, fieldnames=list(rows[0]))
+            if self._file.tell() == 0:
+                self._writer.writeheader()
+        self._writer.writerows(rows)
+        return self._sync()
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+        else:
+            self._file.close()
+
+
+class ParquetWriter:
+    """A directory of part files, one per written batch of rows."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._part = len(self._parts(path))
+
+    @staticmethod
+    def _parts(path: str) -> list:
+        return sorted(name for name in os.listdir(path) if name.startswith("part-")) if os.path.isdir(path) else []
+
+    def write(self, rows: list):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.Table.from_pylist(rows), os.path.join(self.path, f"part-{self._part:05d}.parquet"))
+        self._part += 1
+        return self._part
+
+    @classmethod
+    def rollback(cls, path: str, position: int):
+        for name in cls._parts(path)[position:]:
+            os.remove(os.path.join(path, name))
+
+    def close(self):
+        pass
+
+
+WRITERS = {
+    ".jsonl": JsonlWriter,
+    ".csv": CsvWriter,
+    ".parquet": ParquetWriter,
+}
+
+
+class Checkpoint:
+    """
+    Append-only log of finished row ids. Each line also records the output
+    position after those rows were durably written; on resume the output is
+    rolled back to the last recorded position so rows written after the
+    final checkpoint aren't duplicated.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        self.position = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # torn final line from a killed run
+                    self.done.update(entry["ids"])
+                    self.position = entry["position"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def record(self, ids: list, position: int):
+        self.done.update(ids)
+        self.position = position
+        self._file.write(json.dumps({"ids": ids, "position": position}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def _has_output(path: str) -> bool:
+    if os.path.isdir(path):
+        return bool(os.listdir(path))
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+
+def _read_rows(path: str, done: set):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row["uuid"] not in done:
+                yield row
+
+
+def _count_rows(path: str) -> int:
+    with open(path, newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def _batches(rows, size: int):
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _progress(done: int, total: int, processed: int, started: float):
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed else 0.0
+    eta = (total - done) / rate if rate else float("inf")
+    print(f"\r{done}/{total} rows  {rate:.2f} rows/s  ETA {eta:,.0f}s", end="", file=sys.stderr, flush=True)
+
+
+def run(task: str, input_path: str, output_path: str, batch_size: int = 8, workers: int = 1) -> dict:
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext not in WRITERS:
+        raise SystemExit(f"Unsupported output format {ext!r}; expected one of {sorted(WRITERS)}")
+    writer_cls = WRITERS[ext]
+
+    checkpoint_path = f"{output_path}.checkpoint"
+    resuming = os.path.exists(checkpoint_path)
+    if not resuming and _has_output(output_path):
+        raise SystemExit(f"{output_path} already exists and has no checkpoint to resume from; remove it or pick another output")
+    checkpoint = Checkpoint(checkpoint_path)
+    if resuming:
+        writer_cls.rollback(output_path, checkpoint.position)
+    writer = writer_cls(output_path)
+
+    total = _count_rows(input_path)
+    already_done = len(checkpoint.done)
+    processed = failed = 0
+    started = time.perf_counter()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        batches = _batches(_read_rows(input_path, checkpoint.done), batch_size)
+        pending = set()
+        try:
+            while True:
+                # Keep a bounded number of batches in flight so the CSV is streamed, not loaded
+                for batch in islice(batches, 2 * workers - len(pending)):
+                    pending.add(pool.submit(_run_batch, task, batch))
+                if not pending:
+                    break
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results, errors = future.result()
+                    if results:
+                        checkpoint.record([r["id"] for r in results], writer.write(results))
+                    for error in errors:
+                        print(f"\nrow {error['id']} failed: {error['error']}", file=sys.stderr)
+                    processed += len(results)
+                    failed += len(errors)
+                    _progress(already_done + processed, total, processed, started)
+        finally:
+            writer.close()
+            checkpoint.close()
+    print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "task": task,
+        "rows": total,
+        "processed": processed,
+        "skipped": already_done,
+        "failed": failed,
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=sorted(TASKS))
+    parser.add_argument("input", help="CSV with a uuid column (notes_summary.csv / notes_generation.csv)")
+    parser.add_argument("-o", "--output", required=True, help="Output file: .jsonl, .csv or .parquet (a directory of parts)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; each loads its own models")
+    args = parser.parse_args(argv)
+
+    print(json.dumps(run(args.task, args.input, args.output, args.batch_size, max(1, args.workers))))
+
+
+if __name__ == "__main__":
+    main()
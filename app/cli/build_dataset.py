@@ -0,0 +1,42 @@
+"""
+Tokenize a training CSV once into a memory-mapped dataset for fine-tuning
+the /finetuned_summarize and /finetuned_expand adapters.
+
+    python -m app.cli.build_dataset summarize data/notes_summary.csv -o datasets/summarize
+    python -m app.cli.build_dataset expand data/notes_generation.csv -o datasets/expand --max-length 1024
+
+Load the result with app.services.finetune_data.TokenizedDataset. Train a
+peft LoRA adapter on it and save it under ADAPTER_DIR/<name>; the
+endpoints pick it up by name.
+"""
+
+import argparse
+import json
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=["summarize", "expand"])
+    parser.add_argument("input", help="notes_summary.csv (summarize) or notes_generation.csv (expand)")
+    parser.add_argument("-o", "--output", required=True, help="dataset directory (replaced if it exists)")
+    parser.add_argument("--max-length", type=int, default=2048, help="skip examples longer than this many tokens")
+    parser.add_argument("--tokenizer", help="tokenizer to use instead of the served model's")
+    args = parser.parse_args(argv)
+
+    from app.services.finetune_data import build_dataset
+
+    tokenizer = None
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+
+    started = time.perf_counter()
+    meta = build_dataset(args.task, args.input, args.output, max_length=args.max_length, tokenizer=tokenizer)
+    meta["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,154 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-HUGGINGFACE_HUB_TOKEN = os.getenv("HUGGINGFACE_HUB_TOKEN")
\ No newline at end of file
+HUGGINGFACE_HUB_TOKEN = os.getenv("HUGGINGFACE_HUB_TOKEN")
+
+# Local state (job database, spooled uploads, caches)
+STATE_DIR = os.getenv("TAD_STATE_DIR", os.path.join(tempfile.gettempdir(), "tad_ai"))
+
+# Background transcription jobs
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")  # "thread" or "process"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", os.cpu_count() or 1))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(STATE_DIR, "jobs.sqlite3"))
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join(STATE_DIR, "uploads"))
+
+# Resumable uploads: create, PUT byte ranges, finalize. Bytes are hashed and
+# decoded as they arrive; unfinished uploads expire after UPLOAD_TTL_SECONDS.
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(STATE_DIR, "upload_sessions"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 4 * 2 ** 30))
+UPLOAD_TTL_SECONDS = float(os.getenv("UPLOAD_TTL_SECONDS", 24 * 3600))
+UPLOAD_DECODE_AHEAD = os.getenv("UPLOAD_DECODE_AHEAD", "true").lower() in ("1", "true", "yes")
+
+# Transcript cache: per-process LRU in front of a node-wide SQLite store
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(STATE_DIR, "cache.sqlite3"))
+TRANSCRIPT_CACHE_MEMORY_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_ITEMS", 128))
+TRANSCRIPT_CACHE_DISK_ITEMS = int(os.getenv("TRANSCRIPT_CACHE_DISK_ITEMS", 10000))
+TRANSCRIPT_CACHE_TTL_SECONDS = float(os.getenv("TRANSCRIPT_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Summary/expansion output cache (same database, "outputs" namespace)
+OUTPUT_CACHE = os.getenv("OUTPUT_CACHE", "true").lower() in ("1", "true", "yes")
+OUTPUT_CACHE_MEMORY_ITEMS = int(os.getenv("OUTPUT_CACHE_MEMORY_ITEMS", 256))
+OUTPUT_CACHE_DISK_ITEMS = int(os.getenv("OUTPUT_CACHE_DISK_ITEMS", 10000))
+OUTPUT_CACHE_TTL_SECONDS = float(os.getenv("OUTPUT_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+# Long-transcript (map-reduce) summarization
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 900))
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", 4))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 1))
+SUMMARY_MAX_LATENCY_SECONDS = float(os.getenv("SUMMARY_MAX_LATENCY_SECONDS", 0)) or None
+
+# Pipelined transcription: summarize the transcript in windows of
+# PIPELINE_WINDOW_TOKENS while Whisper is still decoding, so only a short
+# final merge follows the last segment. On for every request with
+# PIPELINED_SUMMARY, else only for streamed (?stream=true) requests.
+PIPELINED_SUMMARY = os.getenv("PIPELINED_SUMMARY", "false").lower() in ("1", "true", "yes")
+PIPELINE_WINDOW_TOKENS = int(os.getenv("PIPELINE_WINDOW_TOKENS", SUMMARY_CHUNK_TOKENS))
+
+# Model loading: models load lazily on first use unless listed here
+# (comma-separated registry names, e.g. "bart,whisper:large-v3,llama")
+PRELOAD_MODELS = [m.strip() for m in os.getenv("PRELOAD_MODELS", "").split(",") if m.strip()]
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# Model server: with MODEL_SERVER_SOCKET set, API workers load no models and
+# send inference to a model-host process (python -m app.inference.server)
+# over that Unix socket, so HTTP workers scale without copying weights.
+# MODEL_SERVER_SOCKETS sends a model family (whisper, bart, llama) to its own
+# host instead, e.g. "whisper=/run/tad/whisper.sock,llama=/run/tad/llama.sock".
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET") or None
+MODEL_SERVER_SOCKETS = dict(
+    entry.strip().split("=", 1) for entry in os.getenv("MODEL_SERVER_SOCKETS", "").split(",") if "=" in entry
+)
+MODEL_SERVER_KEY_PATH = os.getenv("MODEL_SERVER_KEY_PATH", os.path.join(STATE_DIR, "model_server.key"))
+
+# Model pool: loaded models are kept within this budget (0 = unlimited) by
+# evicting the least recently used idle model; preloaded models stay put.
+# Per-model concurrency limits keep callers from oversubscribing cores.
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", 0))
+CPU_CORES = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", max(1, CPU_CORES // 4)))
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", max(1, CPU_CORES // WHISPER_NUM_WORKERS)))
+SUMMARIZER_MAX_CONCURRENCY = int(os.getenv("SUMMARIZER_MAX_CONCURRENCY", SUMMARY_WORKERS))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+
+# Long recordings: voice activity detection drops non-speech, the speech is
+# packed into chunks cut at silences and the chunks are transcribed in
+# parallel (one per Whisper worker). Applies from LONG_AUDIO_MIN_SECONDS of
+# audio; 0 disables it.
+LONG_AUDIO_MIN_SECONDS = float(os.getenv("LONG_AUDIO_MIN_SECONDS", 600))
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", 30))
+LONG_AUDIO_MIN_SILENCE_MS = int(os.getenv("LONG_AUDIO_MIN_SILENCE_MS", 500))
+LONG_AUDIO_SPEECH_PAD_MS = int(os.getenv("LONG_AUDIO_SPEECH_PAD_MS", 200))
+LONG_AUDIO_WORKERS = int(os.getenv("LONG_AUDIO_WORKERS", WHISPER_NUM_WORKERS))
+
+# /expand micro-batching
+EXPAND_BATCHING = os.getenv("EXPAND_BATCHING", "true").lower() in ("1", "true", "yes")
+EXPAND_BATCH_MAX_SIZE = int(os.getenv("EXPAND_BATCH_MAX_SIZE", 4))
+EXPAND_BATCH_MAX_WAIT_MS = float(os.getenv("EXPAND_BATCH_MAX_WAIT_MS", 25))
+
+# /expand prefix KV cache. With EXPAND_PREFIX_INCLUDES_STYLE the audience
+# and tone move into the system prompt, giving one prefix per combination
+# (8 tones x 4 audiences), so size the LRU accordingly.
+EXPAND_PREFIX_CACHE = os.getenv("EXPAND_PREFIX_CACHE", "true").lower() in ("1", "true", "yes")
+EXPAND_PREFIX_CACHE_SIZE = int(os.getenv("EXPAND_PREFIX_CACHE_SIZE", 8))
+EXPAND_PREFIX_INCLUDES_STYLE = os.getenv("EXPAND_PREFIX_INCLUDES_STYLE", "false").lower() in ("1", "true", "yes")
+
+# /expand length control. The token budget is the request's target_words
+# (else DEFAULT_TARGET_WORDS) x EXPAND_TOKENS_PER_WORD x EXPAND_LENGTH_SLACK,
+# plus room for the closing disclaimer line, capped at EXPAND_MAX_NEW_TOKENS.
+# With EXPAND_EARLY_STOP generation also ends once the disclaimer line, or
+# EXPAND_MAX_PARAGRAPHS paragraphs and a closing line, are complete.
+EXPAND_TOKENS_PER_WORD = float(os.getenv("EXPAND_TOKENS_PER_WORD", 1.35))
+EXPAND_LENGTH_SLACK = float(os.getenv("EXPAND_LENGTH_SLACK", 1.2))
+EXPAND_MAX_NEW_TOKENS = int(os.getenv("EXPAND_MAX_NEW_TOKENS", 1024))
+EXPAND_MAX_PARAGRAPHS = int(os.getenv("EXPAND_MAX_PARAGRAPHS", 4))
+EXPAND_EARLY_STOP = os.getenv("EXPAND_EARLY_STOP", "true").lower() in ("1", "true", "yes")
+
+# /expand assisted (speculative) decoding on the transformers backend: a
+# small draft model sharing the main model's tokenizer proposes
+# EXPAND_DRAFT_TOKENS tokens at a time and the main model verifies them in
+# one forward pass. The sampled distribution is unchanged. Assisted
+# generation is one sequence at a time, so it bypasses micro-batching.
+EXPAND_ASSISTED_DECODING = os.getenv("EXPAND_ASSISTED_DECODING", "false").lower() in ("1", "true", "yes")
+EXPAND_DRAFT_MODEL_ID = os.getenv("EXPAND_DRAFT_MODEL_ID", "meta-llama/Llama-3.2-1B-Instruct")
+EXPAND_DRAFT_TOKENS = int(os.getenv("EXPAND_DRAFT_TOKENS", 5))
+
+# /expand generation backend: "transformers" or "ctranslate2" (int8 on CPU)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "transformers")
+CT2_QUANTIZATION = os.getenv("CT2_QUANTIZATION", "int8")
+CT2_MODEL_DIR = os.getenv("CT2_MODEL_DIR", os.path.join(STATE_DIR, "ct2"))
+CT2_INTER_THREADS = int(os.getenv("CT2_INTER_THREADS", 1))
+CT2_INTRA_THREADS = int(os.getenv("CT2_INTRA_THREADS", max(1, CPU_CORES // max(1, CT2_INTER_THREADS))))
+
+# Hosted LLM providers (summarize-text). Base URLs can point at a local stub.
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", 64))
+PROVIDER_TIMEOUT_SECONDS = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", 60))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", 3))
+PROVIDER_BACKOFF_BASE_SECONDS = float(os.getenv("PROVIDER_BACKOFF_BASE_SECONDS", 0.5))
+PROVIDER_BACKOFF_MAX_SECONDS = float(os.getenv("PROVIDER_BACKOFF_MAX_SECONDS", 20))
+
+# Slow-request profiling (0 disables): folded stacks land in PROFILE_DIR
+PROFILE_SLOW_REQUESTS_MS = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", 0))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(STATE_DIR, "profiles"))
+
+# PII redaction: roster of names to always redact, and whether transcripts
+# and summaries are redacted before they leave the service
+REDACTION_ROSTER_PATH = os.getenv(
+    "REDACTION_ROSTER_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "students.csv"),
+)
+REDACT_TRANSCRIPTS = os.getenv("REDACT_TRANSCRIPTS", "false").lower() in ("1", "true", "yes")
+
+# Fine-tuned endpoints: LoRA adapters (peft save_pretrained output, one
+# directory per adapter under ADAPTER_DIR) served on the shared base model
+ADAPTER_DIR = os.getenv("ADAPTER_DIR", os.path.join(STATE_DIR, "adapters"))
+ADAPTER_MAX_LOADED = int(os.getenv("ADAPTER_MAX_LOADED", 4))
+FINETUNED_SUMMARIZE_ADAPTER = os.getenv("FINETUNED_SUMMARIZE_ADAPTER", "summarize")
+FINETUNED_EXPAND_ADAPTER = os.getenv("FINETUNED_EXPAND_ADAPTER", "expand")
@@ -39,6 +39,11 @@ DEFAULT_INCLUDE_CA_CONTEXT = True
 MODEL_ID = "meta-llama/Meta-Llama-3.1-8B-Instruct"
 # MODEL_ID = "Qwen/Qwen2.5-7B-Instruct"
 
+# Sampling parameters for /expand (shared by every generation backend)
+EXPAND_TEMPERATURE = 0.8
+EXPAND_TOP_P = 0.95
+EXPAND_REPETITION_PENALTY = 1.05
+
 
 # -------------------------------
 # Safety disclaimer
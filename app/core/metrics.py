@@ -0,0 +1,303 @@
+"""
+In-process metrics: Prometheus-style counters, gauges and histograms, timing
+spans for the hot paths, a Server-Timing middleware and an optional
+sampling profiler for slow requests.
+
+Metrics are per process; with several uvicorn workers, scrape each one (or
+aggregate in Prometheus). Jobs run on a process pool report from the
+worker process, not the API process.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+from collections import defaultdict
+from contextlib import contextmanager
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import PROFILE_SLOW_REQUESTS_MS, PROFILE_INTERVAL_MS, PROFILE_DIR
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_metrics = []
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), collect=None):
+        """
+        `collect`, if given, is called at scrape time and returns
+        {label values tuple: value}; use it to export state that some other
+        component already tracks (cache hit counters, queue sizes).
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _samples(self):
+        if self.collect is not None:
+            return self.collect().items()
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        suffix = "_total" if self.type == "counter" else ""
+        for key, value in sorted(self._samples()):
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _metrics:
+        try:
+            lines.extend(metric.render())
+        except Exception:
+            continue  # a broken collector must not take down the scrape
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("tad_stage_seconds", "Wall time per pipeline stage.", ["stage"])
+REQUEST_SECONDS = Histogram(
+    "tad_http_request_seconds", "HTTP request latency.", ["method", "route", "status"]
+)
+AUDIO_SECONDS = Histogram(
+    "tad_audio_seconds", "Duration of audio transcribed per request.", ["model"],
+    buckets=(1, 5, 15, 30, 60, 300, 900, 1800, 3600, 7200),
+)
+REAL_TIME_FACTOR = Histogram(
+    "tad_transcription_real_time_factor", "Transcription compute seconds per audio second.", ["model"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+TOKENS_PER_SECOND = Histogram(
+    "tad_generation_tokens_per_second", "Completion tokens per second of generation.", ["backend"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+GENERATED_TOKENS = Counter("tad_generated_tokens", "Completion tokens generated.", ["backend"])
+EXPAND_STOPS = Counter("tad_expand_stops", "Expansions by why generation ended.", ["reason"])
+
+_queues = {}
+
+
+def register_queue(name: str, depth):
+    """Export `depth()` as tad_queue_depth{queue=name} at scrape time."""
+    _queues[name] = depth
+
+
+QUEUE_DEPTH = Gauge(
+    "tad_queue_depth", "Items waiting in each work queue.", ["queue"],
+    collect=lambda: {(name,): depth() for name, depth in list(_queues.items())},
+)
+
+
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a block as `stage`: observed into tad_stage_seconds and, inside an
+    HTTP request, reported in its Server-Timing header. Works across
+    run_in_threadpool, which carries the request context to the worker.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def _server_timing(spans: list, total: float) -> str:
+    durations = _Counter()
+    for stage, elapsed in spans:
+        durations[stage] += elapsed
+    entries = [f"{stage};dur={1000 * elapsed:.1f}" for stage, elapsed in durations.items()]
+    entries.append(f"total;dur={1000 * total:.1f}")
+    return ", ".join(entries)
+
+
+class _StackSampler:
+    """
+    Samples every thread's Python stack on a background thread and keeps
+    counts per folded stack ("frame;frame;frame count"), the input format
+    of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = _Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="slow-request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def finish(self, path: str = None):
+        """Stop sampling and, given a path, write the profile there."""
+        self.stop()
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.dump(path)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: collects the request's spans, adds a
+    Server-Timing header, records request latency by route template and,
+    when PROFILE_SLOW_REQUESTS_MS is set, samples stacks during the request
+    and writes a folded-stack flamegraph for requests slower than that.
+
+    The profiler samples the whole process, so concurrent requests show up
+    in each other's profiles; it is meant for diagnosis, not always-on use.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans = []
+        token = _request_spans.set(spans)
+        sampler = _StackSampler(PROFILE_INTERVAL_MS / 1000).start() if PROFILE_SLOW_REQUESTS_MS > 0 else None
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(spans, time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_spans.reset(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                elapsed,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+            if sampler is not None:
+                path = None
+                if elapsed * 1000 >= PROFILE_SLOW_REQUESTS_MS:
+                    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}{scope['path'].replace('/', '_')}.folded"
+                    path = os.path.join(PROFILE_DIR, name)
+                # Joining the sampler and writing the profile would block the event loop
+                await run_in_threadpool(sampler.finish, path)
@@ -0,0 +1,10 @@
+"""
+Model-host mode.
+
+The model-host process (python -m app.inference.server) owns the
+registry's models and the generation backend. API workers started with
+MODEL_SERVER_SOCKET install thin proxies from app.inference.client in their
+place: Whisper and BART calls and /expand generation become requests over
+an authenticated Unix socket, with audio passed through shared memory.
+Tokenizers stay in the workers; they are small and prompts are built there.
+"""
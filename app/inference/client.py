@@ -0,0 +1,254 @@
+"""
+API-worker side of model-host mode: proxies that stand in for the local
+models and generation backend and forward each call to the model server.
+"""
+import threading
+from contextlib import contextmanager
+from functools import partial
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from types import SimpleNamespace
+
+from app.core.config import LLM_BACKEND
+from app.inference.protocol import ModelServerError, authkey, family_of, shared_array, socket_path
+from app.models.adapters import AdaptersUnavailable
+from app.models.backends import GenerationBackend, set_backend
+from app.models.registry import registry
+from app.models.whisper import WHISPER_SIZES
+
+# Registry entries served by the model host. Tokenizers stay local.
+REMOTE_MODELS = tuple(f"whisper:{size}" for size in WHISPER_SIZES) + ("bart", "llama", "llama-draft", "llama-ct2")
+
+# Server-side exceptions re-raised as themselves; anything else is a ModelServerError
+_ERRORS = {"KeyError": KeyError, "ValueError": ValueError, "AdaptersUnavailable": AdaptersUnavailable}
+
+_idle = {}
+_idle_lock = threading.Lock()
+_installed = False
+
+
+def _connect(path: str):
+    try:
+        return Client(path, family="AF_UNIX", authkey=authkey())
+    except (OSError, AuthenticationError) as e:
+        raise ModelServerError(f"Model server at {path} is unavailable: {e}")
+
+
+def _checkout(family: str):
+    path = socket_path(family)
+    with _idle_lock:
+        pool = _idle.setdefault(path, [])
+        conn = pool.pop() if pool else None
+    if conn is not None:
+        return path, conn, True
+    return path, _connect(path), False
+
+
+def _checkin(path: str, conn):
+    with _idle_lock:
+        _idle[path].append(conn)
+
+
+@contextmanager
+def _connection(family: str):
+    """
+    A connection to the family's host, reused across calls. Yields
+    (conn, pooled); a connection that fails mid-call is closed rather than
+    returned.
+    """
+    path, conn, pooled = _checkout(family)
+    try:
+        yield conn, pooled
+    except BaseException:
+        conn.close()
+        raise
+    _checkin(path, conn)
+
+
+def _result(reply):
+    if reply[0] == "ok":
+        return reply[1]
+    _, kind, message = reply
+    if kind in _ERRORS:
+        raise _ERRORS[kind](message)
+    raise ModelServerError(f"{kind}: {message}")
+
+
+def _call(family: str, op: str, **kwargs):
+    # A pooled connection may have gone stale (server restart); retry once on a fresh one
+    for attempt in range(2):
+        try:
+            with _connection(family) as (conn, pooled):
+                conn.send((op, kwargs))
+                reply = conn.recv()
+        except (EOFError, OSError) as e:
+            if pooled and attempt == 0:
+                continue
+            raise ModelServerError(f"Model server call {op} failed: {e}")
+        return _result(reply)
+
+
+def _stop_spec(stop):
+    return {"max_paragraphs": stop.max_paragraphs} if stop is not None else None
+
+
+def _apply_stop(stop, result: dict):
+    if stop is not None:
+        stop.reason = result.get("stop_reason")
+        stop.length = result.get("stop_length")
+
+
+class RemoteModel:
+    """Registry stand-in for a model that only the model host touches."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+
+class RemoteWhisper(RemoteModel):
+    """faster-whisper's transcribe() over the socket; audio goes through shared memory."""
+
+    def __init__(self, name: str, size: str):
+        super().__init__(name)
+        self.size = size
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            result = _call("whisper", "transcribe", model_size=self.size, audio=audio, options=options)
+        else:
+            if hasattr(audio, "read"):
+                from app.utils.audio import decode_audio
+                audio = decode_audio(audio)
+            with shared_array(audio) as spec:
+                result = _call("whisper", "transcribe", model_size=self.size, audio=spec, options=options)
+        segments = [SimpleNamespace(start=start, end=end, text=text) for start, end, text in result["segments"]]
+        info = SimpleNamespace(
+            language=result["language"],
+            language_probability=result["language_probability"],
+            duration=result["duration"],
+        )
+        return segments, info
+
+
+class RemoteSummarizer(RemoteModel):
+    """The BART summarization pipeline over the socket, with a local tokenizer for chunking."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            from app.models.summarizer import SUMMARIZER_MODEL_ID
+
+            self._tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL_ID)
+        return self._tokenizer
+
+    def __call__(self, texts, **kwargs):
+        return _call("bart", "summarize", texts=texts, kwargs=kwargs)
+
+
+class RemoteBackend(GenerationBackend):
+    """The model host's generation backend; requests from all workers batch there."""
+
+    name = LLM_BACKEND
+
+    def generate(self, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop=None) -> list:
+        result = _call(
+            "llama", "generate",
+            input_ids=input_ids, max_new_tokens=max_new_tokens, prefix_len=prefix_len, stop=_stop_spec(stop),
+        )
+        _apply_stop(stop, result)
+        return result["ids"]
+
+    def stream(self, input_ids: list, max_new_tokens: int, prefix_len: int, cancelled: threading.Event, stop=None):
+        request = {
+            "input_ids": input_ids, "max_new_tokens": max_new_tokens,
+            "prefix_len": prefix_len, "stop": _stop_spec(stop),
+        }
+        path, conn, _ = _checkout("llama")
+        finished = False
+        try:
+            conn.send(("stream", request))
+            while True:
+                reply = conn.recv()
+                if reply[0] != "piece":
+                    break
+                yield reply[1]
+                if cancelled.is_set():
+                    return 0
+            finished = True
+        except (EOFError, OSError) as e:
+            raise ModelServerError(f"Model server stream failed: {e}")
+        finally:
+            # Closing a connection mid-stream is what stops the server generating
+            if finished:
+                _checkin(path, conn)
+            else:
+                conn.close()
+        result = _result(reply)
+        _apply_stop(stop, result)
+        return result["completion"]
+
+    def stats(self) -> dict:
+        return {**_call("llama", "status")["backend"], "model_server": socket_path("llama")}
+
+
+def generate_with_adapter(adapter: str, input_ids: list, max_new_tokens: int, stop=None) -> list:
+    result = _call(
+        "llama", "generate_adapter",
+        adapter=adapter, input_ids=input_ids, max_new_tokens=max_new_tokens, stop=_stop_spec(stop),
+    )
+    _apply_stop(stop, result)
+    return result["ids"]
+
+
+def _hosts() -> dict:
+    """Socket path -> families it serves."""
+    hosts = {}
+    for name in REMOTE_MODELS:
+        hosts.setdefault(socket_path(family_of(name)), set()).add(family_of(name))
+    return hosts
+
+
+def models_status() -> dict:
+    """Registry status of the remote models, as reported by their hosts."""
+    status = {}
+    for families in _hosts().values():
+        remote = _call(next(iter(families)), "status")["models"]
+        status.update({name: remote[name] for name in REMOTE_MODELS if family_of(name) in families and name in remote})
+    return status
+
+
+def pool_stats() -> dict:
+    """Each host's pool stats, keyed by socket path."""
+    return {path: _call(next(iter(families)), "status")["pool"] for path, families in _hosts().items()}
+
+
+def warmup(name: str) -> dict:
+    return _call(family_of(name), "warmup", name=name)
+
+
+def _remote_warmup(proxy: RemoteModel):
+    warmup(proxy.name)
+
+
+def installed() -> bool:
+    return _installed
+
+
+def install():
+    """Swap the registry's models and the generation backend for model-host proxies."""
+    global _installed
+    for name in REMOTE_MODELS:
+        if name.startswith("whisper:"):
+            loader = partial(RemoteWhisper, name, name.split(":", 1)[1])
+        elif name == "bart":
+            loader = partial(RemoteSummarizer, name)
+        else:
+            loader = partial(RemoteModel, name)
+        registry.register(name, loader, warmup=_remote_warmup, size_bytes=0)
+    set_backend(RemoteBackend())
+    _installed = True
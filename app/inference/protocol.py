@@ -0,0 +1,91 @@
+"""
+Wire format shared by the model server and its clients.
+
+Messages are pickled over multiprocessing.connection, which frames them and
+authenticates both ends with a key only the service user can read. A
+request is (op, kwargs); replies are ("ok", result), ("error", type name,
+message) or, while streaming, ("piece", text) before the final "ok".
+"""
+import os
+import secrets
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+from app.core.config import MODEL_SERVER_KEY_PATH, MODEL_SERVER_SOCKET, MODEL_SERVER_SOCKETS
+
+FAMILIES = ("whisper", "bart", "llama")
+
+
+class ModelServerError(RuntimeError):
+    pass
+
+
+def family_of(model_name: str) -> str:
+    """Registry name -> family: whisper:large-v3 -> whisper, llama-draft -> llama."""
+    for family in FAMILIES:
+        if model_name.startswith(family):
+            return family
+    raise KeyError(f"Unknown model: {model_name}")
+
+
+def socket_path(family: str) -> str:
+    path = MODEL_SERVER_SOCKETS.get(family, MODEL_SERVER_SOCKET)
+    if not path:
+        raise ModelServerError(f"No model server socket configured for {family}")
+    return path
+
+
+def authkey(create: bool = False) -> bytes:
+    """The shared secret; the server creates it (mode 0600) on first start."""
+    try:
+        with open(MODEL_SERVER_KEY_PATH, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        if not create:
+            raise ModelServerError(f"Model server key {MODEL_SERVER_KEY_PATH} not found; is the server running?")
+    os.makedirs(os.path.dirname(MODEL_SERVER_KEY_PATH) or ".", exist_ok=True)
+    try:
+        fd = os.open(MODEL_SERVER_KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return authkey()  # another host process won the race
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_bytes(32))
+    return authkey()
+
+
+@contextmanager
+def shared_array(array):
+    """Copy `array` into a new shared memory block; yields its spec, unlinks on exit."""
+    import numpy as np
+
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        yield {"shm": block.name, "shape": array.shape, "dtype": array.dtype.str}
+    finally:
+        block.close()
+        block.unlink()
+
+
+@contextmanager
+def attached_array(spec: dict):
+    """Zero-copy view of a block made by shared_array in another process."""
+    import numpy as np
+
+    block = shared_memory.SharedMemory(name=spec["shm"])
+    try:
+        # The creating process owns the block; keep this one's tracker from unlinking it
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, "shared_memory")
+    except (ImportError, AttributeError, KeyError):
+        pass
+    view = np.ndarray(spec["shape"], dtype=spec["dtype"], buffer=block.buf)
+    try:
+        yield view
+    finally:
+        del view
+        try:
+            block.close()
+        except BufferError:
+            pass  # a decoder still holds a slice; the mapping goes when it does
@@ -0,0 +1,205 @@
+"""
+Model-host process: loads each model once and serves every API worker on
+the node over a Unix socket.
+
+    python -m app.inference.server --socket /run/tad/models.sock --preload whisper:large-v3 bart llama
+
+Run one host for all models, or one per family (see MODEL_SERVER_SOCKETS).
+Each client connection gets a thread; the registry's per-model concurrency
+limits and the /expand micro-batcher work across all of them, so requests
+from different workers batch together. Weights load through the usual
+loaders (safetensors, memory-mapped), so pages can also be shared between
+hosts on one machine.
+"""
+import argparse
+import logging
+import os
+import threading
+from multiprocessing.connection import Listener
+
+from app.core.config import EXPAND_MAX_PARAGRAPHS, PRELOAD_MODELS, WARMUP_ON_STARTUP
+from app.inference.protocol import attached_array, authkey
+
+logger = logging.getLogger(__name__)
+
+
+def _expansion_stop(spec):
+    if spec is None:
+        return None
+    from app.models.generator import get_tokenizer
+    from app.services.stopping import ExpansionStop
+
+    return ExpansionStop(get_tokenizer(), spec.get("max_paragraphs", EXPAND_MAX_PARAGRAPHS))
+
+
+def _stop_state(stop) -> dict:
+    return {"stop_reason": stop.reason, "stop_length": stop.length} if stop is not None else {}
+
+
+def transcribe(model_size: str, audio, options: dict) -> dict:
+    """`audio` is a shared-memory spec, or a path readable by this process."""
+    from app.models.whisper import use_whisper_model
+
+    def run(samples):
+        with use_whisper_model(model_size) as model:
+            segments, info = model.transcribe(samples, **options)
+            segments = [(s.start, s.end, s.text) for s in segments]
+        return {
+            "segments": segments,
+            "language": info.language,
+            "language_probability": info.language_probability,
+            "duration": info.duration,
+        }
+
+    if isinstance(audio, dict):
+        with attached_array(audio) as samples:
+            return run(samples)
+    return run(audio)
+
+
+def summarize(texts, kwargs: dict):
+    from app.models.registry import registry
+
+    with registry.use("bart") as summarizer:
+        return summarizer(texts, **kwargs)
+
+
+def generate(input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop: dict = None) -> dict:
+    from app.models.backends import get_backend
+
+    stop = _expansion_stop(stop)
+    ids = get_backend().generate(input_ids, max_new_tokens, prefix_len, stop)
+    return {"ids": ids, **_stop_state(stop)}
+
+
+def generate_adapter(adapter: str, input_ids: list, max_new_tokens: int, stop: dict = None) -> dict:
+    from app.services.finetuned import generate_with_adapter
+
+    stop = _expansion_stop(stop)
+    ids = generate_with_adapter(adapter, input_ids, max_new_tokens, stop)
+    return {"ids": ids, **_stop_state(stop)}
+
+
+def warmup(name: str) -> dict:
+    from app.models.registry import registry
+
+    return registry.warmup(name)
+
+
+def status() -> dict:
+    from app.models.backends import get_backend
+    from app.models.registry import registry
+
+    return {
+        "pid": os.getpid(),
+        "models": registry.status(),
+        "pool": registry.pool_stats(),
+        "backend": get_backend().stats(),
+    }
+
+
+HANDLERS = {
+    "transcribe": transcribe,
+    "summarize": summarize,
+    "generate": generate,
+    "generate_adapter": generate_adapter,
+    "warmup": warmup,
+    "status": status,
+}
+
+
+def _stream(conn, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop: dict = None):
+    from app.models.backends import get_backend
+
+    stop = _expansion_stop(stop)
+    cancelled = threading.Event()
+    pieces = get_backend().stream(input_ids, max_new_tokens, prefix_len, cancelled, stop)
+    try:
+        while True:
+            try:
+                piece = next(pieces)
+            except StopIteration as done:
+                return {"completion": done.value, **_stop_state(stop)}
+            # Raises once the client has gone, which cancels generation below
+            conn.send(("piece", piece))
+    finally:
+        cancelled.set()
+        pieces.close()
+
+
+def _serve(conn):
+    with conn:
+        while True:
+            try:
+                op, kwargs = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if op == "stream":
+                    result = _stream(conn, **kwargs)
+                elif op in HANDLERS:
+                    result = HANDLERS[op](**kwargs)
+                else:
+                    raise ValueError(f"Unknown op: {op}")
+            except OSError:
+                return  # client went away mid-reply
+            except Exception as e:
+                logger.exception("model server op %s failed", op)
+                reply = ("error", type(e).__name__, str(e))
+            else:
+                reply = ("ok", result)
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+
+def serve(socket_path: str, preload=(), warmup_models: bool = False):
+    from app.models.registry import registry
+    import app.models.backends  # noqa: F401  registers the generation backends' models
+    import app.models.summarizer  # noqa: F401
+    import app.models.whisper  # noqa: F401
+
+    for name in preload:
+        if warmup_models:
+            registry.warmup(name)
+        else:
+            registry.get(name)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # left over from a previous run
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    old_umask = os.umask(0o177)  # socket readable by this user only
+    try:
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey(create=True))
+    finally:
+        os.umask(old_umask)
+
+    logger.info("model server listening on %s", socket_path)
+    with listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except OSError as e:  # includes failed authentication
+                logger.warning("model server rejected a connection: %s", e)
+                continue
+            threading.Thread(target=_serve, args=(conn,), name="model-server-conn", daemon=True).start()
+
+
+def main(argv=None):
+    from app.core.config import MODEL_SERVER_SOCKET
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET, required=MODEL_SERVER_SOCKET is None,
+                        help="Unix socket path (default: MODEL_SERVER_SOCKET)")
+    parser.add_argument("--preload", nargs="*", default=PRELOAD_MODELS, help="registry names to load at startup")
+    parser.add_argument("--warmup", action="store_true", default=WARMUP_ON_STARTUP,
+                        help="run one dummy inference on each preloaded model")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.socket, args.preload, args.warmup)
+
+
+if __name__ == "__main__":
+    main()
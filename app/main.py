@@ -1,11 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from app.api.v1.routes_transcribe import router as transcribe_router
 from app.api.v1.routes_expand import router as expand_router
 from app.api.v1.finetuning import router as finetuned_router
+from app.api.v1.routes_jobs import router as jobs_router
+from app.api.v1.routes_ops import router as ops_router
+from app.api.v1.routes_uploads import router as uploads_router
+from app.core.config import MODEL_SERVER_SOCKET, MODEL_SERVER_SOCKETS, PRELOAD_MODELS, WARMUP_ON_STARTUP
+from app.core.metrics import ServerTimingMiddleware
+from app.inference import client as model_client
+from app.inference.protocol import ModelServerError
+from app.models.registry import registry
+from app.services.jobs import get_job_queue
+from app.services.providers import close_providers
+
+# Models live in the model-host process; this worker forwards to it
+if MODEL_SERVER_SOCKET or MODEL_SERVER_SOCKETS:
+    model_client.install()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models load lazily unless configured for preloading (by the model host, if there is one)
+    for name in PRELOAD_MODELS if not model_client.installed() else ():
+        if WARMUP_ON_STARTUP:
+            await run_in_threadpool(registry.warmup, name)
+        else:
+            await run_in_threadpool(registry.get, name)
+    # Resume any jobs left queued/running by a previous worker
+    get_job_queue().start()
+    yield
+    get_job_queue().shutdown()
+    await close_providers()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,11 +47,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware)
+
+
+@app.exception_handler(ModelServerError)
+async def model_server_error(request: Request, exc: ModelServerError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 app.include_router(transcribe_router, prefix="/v1", tags=["Transcription"])
 app.include_router(expand_router, prefix="/v1", tags=["Expand"])
 app.include_router(finetuned_router, prefix="/v1", tags=["Finetuned"])
+app.include_router(jobs_router, prefix="/v1", tags=["Jobs"])
+app.include_router(uploads_router, prefix="/v1", tags=["Uploads"])
+app.include_router(ops_router, prefix="/v1", tags=["Ops"])
 
 
 if __name__ == "__main__":
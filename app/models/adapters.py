@@ -0,0 +1,178 @@
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from app.core.config import ADAPTER_DIR, ADAPTER_MAX_LOADED
+from app.models.registry import registry
+
+
+class AdaptersUnavailable(RuntimeError):
+    """Adapter serving needs peft, which isn't installed."""
+
+_ADAPTER_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+class AdapterRegistry:
+    """
+    LoRA adapters served on top of the single shared base model from
+    generator.get_model, so each fine-tune costs only its adapter weights.
+
+    Adapters are peft `save_pretrained` directories under ADAPTER_DIR, named
+    by directory. They are loaded into the base model on first use and the
+    least recently used one is dropped once more than max_loaded are
+    resident.
+
+    peft injects the adapter layers into the base model in place, so the
+    active adapter is process-wide state. Requests hold the model through
+    use(name): any number of requests for the same adapter (or the plain
+    base model, name=None) run together, and switching to another waits
+    for them to drain. Once another adapter is waiting, new requests for
+    the current one queue behind it so neither side starves. Every holder
+    also holds a "llama" slot in the model registry, so the base model
+    can't be evicted while in use; when it is evicted, the adapters loaded
+    into it go with it.
+    """
+
+    def __init__(self, adapter_dir: str = ADAPTER_DIR, max_loaded: int = ADAPTER_MAX_LOADED):
+        self.adapter_dir = adapter_dir
+        self.max_loaded = max(1, max_loaded)
+        self._peft_model = None
+        self._base = None
+        self._loaded = OrderedDict()  # name -> adapter bytes, in LRU order
+        self._active = None
+        self._holders = 0
+        self._waiting = Counter()
+        self._cond = threading.Condition()
+        self.loads = self.evictions = self.switches = 0
+        self.wait_seconds = 0.0
+        registry.on_evict("llama", self._forget_base)
+
+    def available(self) -> list:
+        if not os.path.isdir(self.adapter_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.adapter_dir)
+            if os.path.exists(os.path.join(self.adapter_dir, name, "adapter_config.json"))
+        )
+
+    def path(self, name: str) -> str:
+        path = os.path.join(self.adapter_dir, name)
+        if not _ADAPTER_NAME.match(name) or not os.path.exists(os.path.join(path, "adapter_config.json")):
+            raise KeyError(f"Unknown adapter: {name}")
+        return path
+
+    @contextmanager
+    def use(self, name: str = None):
+        """Hold the model with adapter `name` (None: base model) active; yields the model to call."""
+        if name is not None:
+            self.path(name)  # fail fast, before queueing behind other adapters
+        with registry.use("llama") as base, self._hold(name, base):
+            yield self._peft_model if name is not None else base
+
+    @contextmanager
+    def _hold(self, name, base):
+        started = time.perf_counter()
+        with self._cond:
+            self._waiting[name] += 1
+            try:
+                while self._must_wait(name):
+                    self._cond.wait()
+            finally:
+                self._waiting[name] -= 1
+            try:
+                self._activate(name, base)
+            except Exception:
+                self._cond.notify_all()
+                raise
+            self._holders += 1
+            self.wait_seconds += time.perf_counter() - started
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._holders -= 1
+                self._cond.notify_all()
+
+    def _must_wait(self, name) -> bool:
+        if not self._holders:
+            return False
+        if self._active != name:
+            return True
+        return any(count for other, count in self._waiting.items() if other != name)
+
+    def _forget_base(self):
+        with self._cond:
+            self._base, self._peft_model, self._active = None, None, None
+            self._loaded.clear()
+
+    def _activate(self, name, base):
+        # Called with the gate held and no requests running on the model
+        if base is not self._base:
+            # First use, or the base model was reloaded: adapters went with it
+            self._base, self._peft_model, self._active = base, None, None
+            self._loaded.clear()
+        if name == self._active:
+            if name is not None:
+                self._loaded.move_to_end(name)
+            return
+
+        self.switches += 1
+        if name is None:
+            self._peft_model.base_model.disable_adapter_layers()
+        else:
+            if name not in self._loaded:
+                self._load(name)
+            self._loaded.move_to_end(name)
+            self._peft_model.base_model.enable_adapter_layers()
+            self._peft_model.set_adapter(name)
+        self._active = name
+
+    def _load(self, name: str):
+        try:
+            from peft import PeftModel
+        except ImportError as e:
+            raise AdaptersUnavailable("Serving fine-tuned adapters requires peft (pip install peft)") from e
+
+        path = self.path(name)
+        if self._peft_model is None:
+            self._peft_model = PeftModel.from_pretrained(self._base, path, adapter_name=name)
+            self._peft_model.eval()
+        else:
+            self._peft_model.load_adapter(path, adapter_name=name)
+        self.loads += 1
+        self._loaded[name] = self._adapter_bytes(name)
+
+        while len(self._loaded) > self.max_loaded:
+            evicted, _ = self._loaded.popitem(last=False)
+            self._peft_model.delete_adapter(evicted)
+            self.evictions += 1
+
+    def _adapter_bytes(self, name: str) -> int:
+        marker = f".{name}."
+        return sum(
+            p.numel() * p.element_size()
+            for n, p in self._peft_model.named_parameters()
+            if marker in n
+        )
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "available": self.available(),
+                "loaded": {name: {"bytes": size} for name, size in self._loaded.items()},
+                "loaded_bytes": sum(self._loaded.values()),
+                "max_loaded": self.max_loaded,
+                "active": self._active,
+                "in_use": self._holders,
+                "waiting": sum(self._waiting.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "switches": self.switches,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+
+adapters = AdapterRegistry()
@@ -0,0 +1,424 @@
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import (
+    HUGGINGFACE_HUB_TOKEN, LLM_BACKEND,
+    CT2_QUANTIZATION, CT2_MODEL_DIR, CT2_INTER_THREADS, CT2_INTRA_THREADS,
+    EXPAND_BATCHING, EXPAND_BATCH_MAX_SIZE, EXPAND_BATCH_MAX_WAIT_MS,
+    EXPAND_PREFIX_CACHE, EXPAND_PREFIX_CACHE_SIZE, EXPAND_ASSISTED_DECODING,
+)
+from app.core.constants import MODEL_ID, EXPAND_TEMPERATURE, EXPAND_TOP_P, EXPAND_REPETITION_PENALTY
+from app.core.metrics import Counter, register_queue
+from app.models.adapters import adapters
+from app.models.generator import get_tokenizer
+from app.models.registry import registry
+from app.services.batching import BatchScheduler
+from app.services.prefix_cache import PrefixCache
+from app.services.stopping import stopping_criteria
+
+
+class GenerationBackend:
+    """
+    Interface for the /expand generator. Backends take a tokenized prompt
+    (plus the length of its constant prefix, which they may cache) and
+    return completion token ids in the shared tokenizer's vocabulary.
+    `stop`, if given, is called with the completion ids so far and ends
+    generation when it returns True (see services.stopping.ExpansionStop).
+    """
+
+    name = None
+
+    def generate(self, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop=None) -> list:
+        raise NotImplementedError
+
+    def stream(self, input_ids: list, max_new_tokens: int, prefix_len: int, cancelled: threading.Event, stop=None):
+        """Yield text pieces as they are generated; return the completion token count."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+ASSISTED_DRAFT_TOKENS = Counter("tad_assisted_draft_tokens", "Tokens proposed by the draft model.")
+ASSISTED_ACCEPTED_TOKENS = Counter("tad_assisted_accepted_tokens", "Draft tokens accepted by the main model.")
+
+
+class AssistedStats:
+    """
+    Acceptance and speedup of assisted decoding. Every main-model forward
+    pass verifies the pending draft tokens and contributes one token of its
+    own, so tokens beyond the number of main passes were accepted drafts,
+    and tokens per main pass is the speedup over one pass per token.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.tokens = 0
+        self.target_passes = 0
+        self.draft_tokens = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, tokens: int, target_passes: int, draft_tokens: int, seconds: float):
+        accepted = min(draft_tokens, max(0, tokens - target_passes))
+        with self._lock:
+            self.requests += 1
+            self.tokens += tokens
+            self.target_passes += target_passes
+            self.draft_tokens += draft_tokens
+            self.seconds += seconds
+        ASSISTED_DRAFT_TOKENS.inc(draft_tokens)
+        ASSISTED_ACCEPTED_TOKENS.inc(accepted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            accepted = min(self.draft_tokens, max(0, self.tokens - self.target_passes))
+            return {
+                "requests": self.requests,
+                "draft_tokens": self.draft_tokens,
+                "accepted_tokens": accepted,
+                "acceptance_rate": round(accepted / self.draft_tokens, 4) if self.draft_tokens else None,
+                "tokens_per_target_pass": round(self.tokens / self.target_passes, 3) if self.target_passes else None,
+                "tokens_per_second": round(self.tokens / self.seconds, 2) if self.seconds else 0.0,
+            }
+
+
+class _Assist:
+    """
+    One generate() call's use of the draft model: the kwargs that attach it
+    (none when assisted decoding is off) and forward-pass counts of both
+    models, taken from the calling thread only.
+    """
+
+    def __init__(self, stats: AssistedStats, model=None, draft=None):
+        self.stats = stats
+        self.kwargs = {"assistant_model": draft} if draft is not None else {}
+        self.target_passes = 0
+        self.draft_passes = 0
+        self._handles = []
+        self._started = time.perf_counter()
+        if draft is not None:
+            thread = threading.get_ident()
+
+            def count(attr):
+                def hook(*_):
+                    if threading.get_ident() == thread:
+                        setattr(self, attr, getattr(self, attr) + 1)
+                return hook
+
+            self._handles = [
+                model.register_forward_hook(count("target_passes")),
+                draft.register_forward_hook(count("draft_passes")),
+            ]
+
+    def done(self, completion_tokens: int):
+        if self._handles:
+            # One draft pass per proposed token
+            self.stats.record(completion_tokens, self.target_passes, self.draft_passes,
+                              time.perf_counter() - self._started)
+
+    def close(self):
+        for handle in self._handles:
+            handle.remove()
+
+
+class _IncrementalDecoder:
+    """Turns a growing list of token ids into newly printable text."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.ids = []
+        self._printed = 0
+
+    def push(self, token_id: int) -> str:
+        self.ids.append(token_id)
+        text = self.tokenizer.decode(self.ids, skip_special_tokens=True)
+        if text.endswith("�"):
+            return ""  # wait for the rest of a multi-byte character
+        piece, self._printed = text[self._printed:], len(text)
+        return piece
+
+
+class TransformersBackend(GenerationBackend):
+    """
+    The Hugging Face model from generator.get_model, with micro-batching
+    and a prefix KV cache. Generation holds the base model through the
+    adapter registry so a fine-tuned adapter is never active underneath it.
+    With EXPAND_ASSISTED_DECODING each request runs on its own, with the
+    draft model from the registry attached as the assistant.
+    """
+
+    name = "transformers"
+    generate_kwargs = {
+        "temperature": EXPAND_TEMPERATURE,
+        "top_p": EXPAND_TOP_P,
+        "repetition_penalty": EXPAND_REPETITION_PENALTY,
+    }
+
+    def __init__(self):
+        self.prefix_cache = PrefixCache(max_entries=EXPAND_PREFIX_CACHE_SIZE) if EXPAND_PREFIX_CACHE else None
+        self._scheduler = None
+        self._lock = threading.Lock()
+        self.assisted = AssistedStats()
+
+    @property
+    def scheduler(self) -> BatchScheduler:
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = BatchScheduler(
+                    adapters.use, get_tokenizer,
+                    max_batch_size=EXPAND_BATCH_MAX_SIZE,
+                    max_wait_ms=EXPAND_BATCH_MAX_WAIT_MS,
+                    prefix_cache=self.prefix_cache,
+                    model_id=MODEL_ID,
+                    **self.generate_kwargs
+                )
+                register_queue("expand_batch", self._scheduler.queue_depth)
+        return self._scheduler
+
+    def _prefix_past(self, model, input_ids: list, prefix_len: int):
+        """KV cache for the first prefix_len prompt tokens, or None if not cacheable."""
+        if self.prefix_cache is None or not 0 < prefix_len < len(input_ids):
+            return None
+        return self.prefix_cache.get(model, MODEL_ID, input_ids[:prefix_len])
+
+    @contextmanager
+    def _assist(self, model):
+        if not EXPAND_ASSISTED_DECODING:
+            yield _Assist(self.assisted)
+            return
+        with registry.use("llama-draft") as draft:
+            assist = _Assist(self.assisted, model, draft)
+            try:
+                yield assist
+            finally:
+                assist.close()
+
+    def generate(self, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop=None) -> list:
+        if EXPAND_BATCHING and not EXPAND_ASSISTED_DECODING:
+            return self.scheduler.submit(input_ids, max_new_tokens, prefix_len, stop).result()
+
+        import torch
+
+        with adapters.use() as model, self._assist(model) as assist, torch.no_grad():
+            device = next(model.parameters()).device
+            inputs = torch.tensor([input_ids], dtype=torch.long, device=device)
+            out = model.generate(
+                input_ids=inputs,
+                attention_mask=torch.ones_like(inputs),
+                max_new_tokens=max_new_tokens,
+                past_key_values=self._prefix_past(model, input_ids, prefix_len),
+                stopping_criteria=[stopping_criteria([stop], len(input_ids))] if stop is not None else None,
+                **assist.kwargs,
+                **self.generate_kwargs
+            )
+            completion = out[0, len(input_ids):].tolist()
+            assist.done(len(completion))
+        return completion
+
+    def stream(self, input_ids: list, max_new_tokens: int, prefix_len: int, cancelled: threading.Event, stop=None):
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        class _StopWhenCancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full((input_ids.shape[0],), cancelled.is_set(), dtype=torch.bool, device=input_ids.device)
+
+        streamer = TextIteratorStreamer(get_tokenizer(), skip_prompt=True, skip_special_tokens=True)
+        output = {}
+
+        def run():
+            try:
+                with adapters.use() as model, self._assist(model) as assist, torch.no_grad():
+                    inputs = torch.tensor([input_ids], dtype=torch.long, device=next(model.parameters()).device)
+                    output["ids"] = model.generate(
+                        input_ids=inputs,
+                        attention_mask=torch.ones_like(inputs),
+                        max_new_tokens=max_new_tokens,
+                        past_key_values=self._prefix_past(model, input_ids, prefix_len),
+                        streamer=streamer,
+                        stopping_criteria=StoppingCriteriaList(
+                            [_StopWhenCancelled()] + ([stopping_criteria([stop], len(input_ids))] if stop else [])
+                        ),
+                        **assist.kwargs,
+                        **self.generate_kwargs
+                    )
+                    assist.done(int(output["ids"].shape[1] - len(input_ids)))
+            except Exception as e:
+                output["error"] = e
+                streamer.end()
+
+        thread = threading.Thread(target=run, name="expand-stream", daemon=True)
+        thread.start()
+        for piece in streamer:
+            if piece:
+                yield piece
+        thread.join()
+        if "error" in output:
+            raise output["error"]
+        return int(output["ids"].shape[1] - len(input_ids))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "batching": self._scheduler.stats() if self._scheduler is not None else None,
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache is not None else None,
+            "assisted": self.assisted.stats() if EXPAND_ASSISTED_DECODING else None,
+        }
+
+
+def ct2_model_dir(model_id: str = MODEL_ID, quantization: str = CT2_QUANTIZATION) -> str:
+    return os.path.join(CT2_MODEL_DIR, f"{model_id.replace('/', '--')}-{quantization}")
+
+
+def convert_ctranslate2_model(model_id: str = MODEL_ID, quantization: str = CT2_QUANTIZATION) -> str:
+    """
+    One-time conversion of the Hugging Face checkpoint into a quantized
+    CTranslate2 model. The result is cached under CT2_MODEL_DIR; conversion
+    writes to a temporary directory and is renamed into place, so
+    concurrent workers never see a half-written model.
+    """
+    import ctranslate2
+    from huggingface_hub import snapshot_download
+
+    output_dir = ct2_model_dir(model_id, quantization)
+    if os.path.exists(os.path.join(output_dir, "model.bin")):
+        return output_dir
+
+    source = model_id if os.path.isdir(model_id) else snapshot_download(
+        model_id,
+        token=HUGGINGFACE_HUB_TOKEN,
+        allow_patterns=["*.json", "*.safetensors", "tokenizer*"],
+    )
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    ctranslate2.converters.TransformersConverter(source, low_cpu_mem_usage=True).convert(
+        tmp_dir, quantization=quantization, force=True
+    )
+    try:
+        os.replace(tmp_dir, output_dir)
+    except OSError:
+        # Another worker finished first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return output_dir
+
+
+def _load_ct2_generator():
+    import ctranslate2
+
+    return ctranslate2.Generator(
+        convert_ctranslate2_model(),
+        device="cpu",
+        compute_type=CT2_QUANTIZATION,
+        inter_threads=CT2_INTER_THREADS,
+        intra_threads=CT2_INTRA_THREADS,
+    )
+
+# One slot per parallel generator (inter_threads)
+registry.register("llama-ct2", _load_ct2_generator, max_concurrency=CT2_INTER_THREADS)
+
+
+class CTranslate2Backend(GenerationBackend):
+    """
+    Quantized CTranslate2 generator. The constant prefix is passed as a
+    static prompt, which CTranslate2 caches internally; concurrent requests
+    are spread over CT2_INTER_THREADS parallel generators.
+    """
+
+    name = "ctranslate2"
+
+    def __init__(self):
+        self.requests = 0
+        self.generated_tokens = 0
+        self.generate_seconds = 0.0
+
+    def _options(self, input_ids: list, max_new_tokens: int, prefix_len: int) -> dict:
+        tokens = get_tokenizer().convert_ids_to_tokens(input_ids)
+        if not 0 < prefix_len < len(tokens):
+            prefix_len = 0
+        return {
+            "prompt": tokens[prefix_len:],
+            "static_prompt": tokens[:prefix_len] or None,
+            "max_length": max_new_tokens,
+            "sampling_topk": 0,
+            "sampling_topp": EXPAND_TOP_P,
+            "sampling_temperature": EXPAND_TEMPERATURE,
+            "repetition_penalty": EXPAND_REPETITION_PENALTY,
+        }
+
+    def _record(self, n_tokens: int, started: float):
+        self.requests += 1
+        self.generated_tokens += n_tokens
+        self.generate_seconds += time.perf_counter() - started
+
+    def generate(self, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop=None) -> list:
+        options = self._options(input_ids, max_new_tokens, prefix_len)
+        if stop is not None:
+            generated = []
+
+            def callback(step):
+                # Returning True ends decoding for this prompt
+                generated.append(step.token_id)
+                return stop(generated)
+
+            options["callback"] = callback
+        started = time.perf_counter()
+        with registry.use("llama-ct2") as generator:
+            result = generator.generate_batch(
+                [options.pop("prompt")], include_prompt_in_result=False, **options
+            )[0]
+        completion = result.sequences_ids[0]
+        self._record(len(completion), started)
+        return completion
+
+    def stream(self, input_ids: list, max_new_tokens: int, prefix_len: int, cancelled: threading.Event, stop=None):
+        options = self._options(input_ids, max_new_tokens, prefix_len)
+        decoder = _IncrementalDecoder(get_tokenizer())
+        started = time.perf_counter()
+        with registry.use("llama-ct2") as generator:
+            steps = generator.generate_tokens(options.pop("prompt"), **options)
+            try:
+                for step in steps:
+                    piece = decoder.push(step.token_id)
+                    if piece:
+                        yield piece
+                    if cancelled.is_set() or (stop is not None and stop(decoder.ids)):
+                        break
+            finally:
+                steps.close()  # stops decoding
+                self._record(len(decoder.ids), started)
+        return len(decoder.ids)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "requests": self.requests,
+            "tokens_per_second": round(self.generated_tokens / self.generate_seconds, 2) if self.generate_seconds else 0.0,
+        }
+
+
+BACKENDS = {
+    TransformersBackend.name: TransformersBackend,
+    CTranslate2Backend.name: CTranslate2Backend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str = None) -> GenerationBackend:
+    name = name or LLM_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND {name!r}; expected one of {sorted(BACKENDS)}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+def set_backend(backend: GenerationBackend):
+    """Serve get_backend(backend.name) with `backend` (the model-host client's proxy)."""
+    with _backends_lock:
+        _backends[backend.name] = backend
@@ -1,30 +1,55 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
-
 from app.core.constants import MODEL_ID
-from app.core.config import HUGGINGFACE_HUB_TOKEN  # ← import token here
+from app.core.config import (  # ← import token here
+    HUGGINGFACE_HUB_TOKEN, LLM_MAX_CONCURRENCY, EXPAND_DRAFT_MODEL_ID, EXPAND_DRAFT_TOKENS
+)
+from app.models.registry import registry
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(
+        MODEL_ID,
+        token=HUGGINGFACE_HUB_TOKEN  # ← pass token
+    )
+
+def _load_model(model_id: str = MODEL_ID):
+    import torch
+    from transformers import AutoModelForCausalLM
 
-_tokenizer = None
-_model = None
+    model = AutoModelForCausalLM.from_pretrained(
+        model_id,
+        torch_dtype=torch.bfloat16 if torch.cuda.is_available() else torch.float32,
+        device_map="auto" if torch.cuda.is_available() else None,
+        token=HUGGINGFACE_HUB_TOKEN  # ← pass token
+    )
+    if not torch.cuda.is_available():
+        model = model.to("cpu")
+    return model
+
+def _load_draft_model():
+    # Same tokenizer as MODEL_ID, so candidates are verified token for token
+    model = _load_model(EXPAND_DRAFT_MODEL_ID)
+    model.generation_config.num_assistant_tokens = EXPAND_DRAFT_TOKENS
+    return model
+
+def _warmup_model(model):
+    import torch
+
+    tokenizer = get_tokenizer()
+    inputs = tokenizer("Hello", return_tensors="pt").to(next(model.parameters()).device)
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=1, do_sample=False)
+
+registry.register("llama-tokenizer", _load_tokenizer)
+registry.register("llama", _load_model, warmup=_warmup_model, max_concurrency=LLM_MAX_CONCURRENCY)
+registry.register("llama-draft", _load_draft_model, warmup=_warmup_model, max_concurrency=LLM_MAX_CONCURRENCY)
 
 def get_tokenizer():
-    global _tokenizer
-    if _tokenizer is None:
-        _tokenizer = AutoTokenizer.from_pretrained(
-            MODEL_ID,
-            token=HUGGINGFACE_HUB_TOKEN  # ← pass token
-        )
-    return _tokenizer
+    return registry.get("llama-tokenizer")
 
 def get_model():
-    global _model
-    if _model is None:
-        _model = AutoModelForCausalLM.from_pretrained(
-            MODEL_ID,
-            torch_dtype=torch.bfloat16 if torch.cuda.is_available() else torch.float32,
-            device_map="auto" if torch.cuda.is_available() else None,
-            token=HUGGINGFACE_HUB_TOKEN  # ← pass token
-        )
-        if not torch.cuda.is_available():
-            _model = _model.to("cpu")
-    return _model
+    return registry.get("llama")
+
+def get_draft_model():
+    return registry.get("llama-draft")
@@ -0,0 +1,262 @@
+import ctypes
+import gc
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+
+from app.core.config import MODEL_MEMORY_BUDGET_MB, PRELOAD_MODELS
+from app.core.metrics import Gauge, Histogram
+
+MODEL_WAIT_SECONDS = Histogram(
+    "tad_model_wait_seconds", "Time spent waiting for a model slot.", ["model"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+
+
+def _rss() -> int:
+    try:
+        import psutil
+    except ImportError:
+        return 0
+    return psutil.Process().memory_info().rss
+
+
+def _model_bytes(model):
+    """Parameter and buffer bytes of a torch module (or a pipeline's .model), else None."""
+    module = getattr(model, "model", model)
+    if not hasattr(module, "parameters"):
+        return None
+    tensors = list(module.parameters()) + list(getattr(module, "buffers", lambda: [])())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _release_memory():
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)  # hand freed arenas back to the OS
+    except (OSError, AttributeError):
+        pass
+
+
+class ModelRegistry:
+    """
+    Owns every heavyweight model in the process. Models are loaded lazily on
+    first use (or explicitly via preload), exactly once, and the load and
+    warmup times are recorded for the readiness/status endpoints.
+
+    It is also a memory-budgeted pool. Callers run inference inside
+    use(name), which waits for one of the model's max_concurrency slots and
+    marks it busy. Before a load would exceed the budget, the least recently
+    used idle models are evicted (preloaded ones never are); busy models are
+    never evicted, so a budget smaller than the working set is exceeded
+    rather than deadlocking. Sizes are taken from the registration, else
+    torch parameter bytes, else the RSS growth during the load.
+    """
+
+    def __init__(self, memory_budget_bytes: int = int(MODEL_MEMORY_BUDGET_MB * 2 ** 20)):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._loaders = {}
+        self._warmups = {}
+        self._models = {}
+        self._locks = {}
+        self._load_seconds = {}
+        self._warmup_seconds = {}
+        self._declared_sizes = {}
+        self._sizes = {}
+        self._limits = {}
+        self._semaphores = {}
+        self._in_use = Counter()
+        self._waiting = Counter()
+        self._waits = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+        self._loads = Counter()
+        self._evictions = Counter()
+        self._evict_listeners = defaultdict(list)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader, warmup=None, max_concurrency: int = None, size_bytes: int = None):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            if warmup is not None:
+                self._warmups[name] = warmup
+            if size_bytes is not None:
+                self._declared_sizes[name] = size_bytes
+            if max_concurrency is not None and max_concurrency != self._limits.get(name):
+                self._limits[name] = max_concurrency
+                self._semaphores[name] = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    def on_evict(self, name: str, callback):
+        """Call `callback()` after `name` is evicted, to drop references held elsewhere."""
+        self._evict_listeners[name].append(callback)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._loaders
+
+    def get(self, name: str):
+        """
+        The loaded model, loading it if needed. Use this for cheap shared
+        objects (tokenizers); run inference through use() so the model is
+        counted as busy and can't be evicted underneath the call.
+        """
+        model = self._models.get(name)
+        if model is not None:
+            self._touch(name)
+            return model
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._locks[name]:
+            model = self._models.get(name)
+            if model is None:
+                self._make_room(keep=name, extra=self._expected_size(name))
+                rss_before = _rss()
+                start = time.perf_counter()
+                model = self._loaders[name]()
+                self._load_seconds[name] = round(time.perf_counter() - start, 3)
+                size = self._declared_sizes.get(name) or _model_bytes(model)
+                if size is None:
+                    size = max(0, _rss() - rss_before)
+                with self._lock:
+                    self._models[name] = model
+                    self._sizes[name] = size
+                    self._loads[name] += 1
+                    self._lru[name] = True
+                self._make_room(keep=name)
+        self._touch(name)
+        return model
+
+    @contextmanager
+    def use(self, name: str):
+        """Hold one of the model's concurrency slots for the duration of an inference call."""
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        semaphore = self._semaphores.get(name)
+        started = time.perf_counter()
+        if semaphore is not None:
+            with self._lock:
+                self._waiting[name] += 1
+            try:
+                semaphore.acquire()
+            finally:
+                with self._lock:
+                    self._waiting[name] -= 1
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._in_use[name] += 1
+            waits = self._waits[name]
+            waits["count"] += 1
+            waits["total"] += waited
+            waits["max"] = max(waits["max"], waited)
+        MODEL_WAIT_SECONDS.observe(waited, model=name)
+        try:
+            yield self.get(name)
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+            self._touch(name)
+            if semaphore is not None:
+                semaphore.release()
+
+    def _touch(self, name: str):
+        with self._lock:
+            if name in self._lru:
+                self._lru.move_to_end(name)
+
+    def _expected_size(self, name: str) -> int:
+        return self._declared_sizes.get(name) or self._sizes.get(name, 0)
+
+    def _make_room(self, keep: str, extra: int = 0):
+        """Evict idle models other than `keep`, least recently used first, until `extra` more bytes fit."""
+        if not self.memory_budget_bytes:
+            return
+        evicted = []
+        with self._lock:
+            for name in list(self._lru):
+                if self.memory_used_bytes() + extra <= self.memory_budget_bytes:
+                    break
+                if name == keep or name in PRELOAD_MODELS or self._in_use[name] or self._waiting[name]:
+                    continue
+                del self._models[name]
+                del self._lru[name]
+                self._evictions[name] += 1
+                evicted.append(name)
+        for name in evicted:
+            for callback in self._evict_listeners[name]:
+                callback()
+        if evicted:
+            _release_memory()
+
+    def memory_used_bytes(self) -> int:
+        return sum(self._sizes.get(name, 0) for name in list(self._models))
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def preload(self, names):
+        for name in names:
+            self.get(name)
+
+    def warmup(self, name: str) -> dict:
+        """Load the model if needed and run one dummy inference."""
+        with self.use(name) as model:
+            warmup = self._warmups.get(name)
+            if warmup is not None:
+                start = time.perf_counter()
+                warmup(model)
+                self._warmup_seconds[name] = round(time.perf_counter() - start, 3)
+        return self.status()[name]
+
+    def status(self) -> dict:
+        return {
+            name: {
+                "loaded": name in self._models,
+                "load_seconds": self._load_seconds.get(name),
+                "warmup_seconds": self._warmup_seconds.get(name),
+                "bytes": self._sizes.get(name) if name in self._models else None,
+                "in_use": self._in_use[name],
+                "waiting": self._waiting[name],
+                "max_concurrency": self._limits.get(name),
+                "loads": self._loads[name],
+                "evictions": self._evictions[name],
+            }
+            for name in self._loaders
+        }
+
+    def pool_stats(self) -> dict:
+        with self._lock:
+            waits = {
+                name: {
+                    "acquired": w["count"],
+                    "avg_wait_ms": round(1000 * w["total"] / w["count"], 2) if w["count"] else 0.0,
+                    "max_wait_ms": round(1000 * w["max"], 2),
+                }
+                for name, w in self._waits.items()
+            }
+        used = self.memory_used_bytes()
+        return {
+            "memory_budget_bytes": self.memory_budget_bytes or None,
+            "memory_used_bytes": used,
+            "occupancy": round(used / self.memory_budget_bytes, 4) if self.memory_budget_bytes else None,
+            "loaded": list(self._lru),
+            "in_use": {name: n for name, n in self._in_use.items() if n},
+            "waiting": {name: n for name, n in self._waiting.items() if n},
+            "evictions": sum(self._evictions.values()),
+            "waits": waits,
+        }
+
+
+registry = ModelRegistry()
+
+MODEL_MEMORY_BYTES = Gauge(
+    "tad_model_memory_bytes", "Estimated memory held by each loaded model.", ["model"],
+    collect=lambda: {(name,): registry._sizes.get(name, 0) for name in list(registry._models)},
+)
+MODEL_IN_USE = Gauge(
+    "tad_model_in_use", "Inference calls currently holding each model.", ["model"],
+    collect=lambda: {(name,): n for name, n in list(registry._in_use.items())},
+)
+MODEL_WAITING = Gauge(
+    "tad_model_waiting", "Callers waiting for a slot on each model.", ["model"],
+    collect=lambda: {(name,): n for name, n in list(registry._waiting.items())},
+)
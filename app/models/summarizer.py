@@ -1,11 +1,273 @@
-from transformers import pipeline
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-_summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=-1)
+from app.core.config import (
+    SUMMARY_CHUNK_TOKENS, SUMMARY_BATCH_SIZE, SUMMARY_WORKERS, SUMMARY_MAX_LATENCY_SECONDS,
+    SUMMARIZER_MAX_CONCURRENCY, PIPELINE_WINDOW_TOKENS
+)
+from app.models.registry import registry
+from app.services import output_cache
 
-def summarize_text(prompt: str, transcript: str) -> str:
+SUMMARIZER_MODEL_ID = "facebook/bart-large-cnn"
+MODEL_MAX_INPUT_TOKENS = 1024
+CHUNK_SUMMARY_MAX_TOKENS = 142
+CHUNK_SUMMARY_MIN_TOKENS = 20
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _load_summarizer():
+    from transformers import pipeline
+
+    return pipeline("summarization", model=SUMMARIZER_MODEL_ID, device=-1)
+
+
+def _warmup_summarizer(summarizer):
+    summarizer("The session covered coping strategies for exam stress.", max_length=16, min_length=1, do_sample=False)
+
+
+registry.register("bart", _load_summarizer, warmup=_warmup_summarizer, max_concurrency=SUMMARIZER_MAX_CONCURRENCY)
+
+
+def get_summarizer():
+    return registry.get("bart")
+
+
+def _count_tokens(text: str) -> int:
+    return len(get_summarizer().tokenizer(text, add_special_tokens=True)["input_ids"])
+
+
+def _split_long_sentence(sentence: str, max_tokens: int) -> list:
+    tokenizer = get_summarizer().tokenizer
+    ids = tokenizer(sentence, add_special_tokens=False)["input_ids"]
+    return [
+        tokenizer.decode(ids[i:i + max_tokens], skip_special_tokens=True)
+        for i in range(0, len(ids), max_tokens)
+    ]
+
+
+def chunk_text(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> list:
+    """
+    Split text on sentence boundaries into chunks of at most max_tokens.
+    """
+    chunks, current, current_tokens = [], [], 0
+    for sentence in _SENTENCE_RE.split(text.strip()):
+        if not sentence:
+            continue
+        n = _count_tokens(sentence)
+        pieces = [sentence] if n <= max_tokens else _split_long_sentence(sentence, max_tokens)
+        for piece in pieces:
+            n = _count_tokens(piece) if len(pieces) > 1 else n
+            if current and current_tokens + n > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += n
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _summarize_batch(texts: list, max_length: int, min_length: int) -> list:
+    with registry.use("bart") as summarizer:
+        results = summarizer(
+            texts,
+            max_length=max_length,
+            min_length=min_length,
+            do_sample=False,
+            truncation=True,
+            batch_size=SUMMARY_BATCH_SIZE,
+        )
+    return [r.get('summary_text') or r.get('generated_text') for r in results]
+
+
+def _map_chunks(chunks: list, deadline: float = None) -> list:
+    """
+    Summarize chunks in batches, SUMMARY_WORKERS batches at a time. Chunks not
+    started before the deadline fall back to their leading sentence.
+    """
+    batches = [chunks[i:i + SUMMARY_BATCH_SIZE] for i in range(0, len(chunks), SUMMARY_BATCH_SIZE)]
+    summaries = []
+
+    def run(batch):
+        if deadline is not None and time.monotonic() > deadline:
+            return [_SENTENCE_RE.split(chunk, maxsplit=1)[0] for chunk in batch]
+        return _summarize_batch(batch, CHUNK_SUMMARY_MAX_TOKENS, CHUNK_SUMMARY_MIN_TOKENS)
+
+    if SUMMARY_WORKERS > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as pool:
+            for batch_summaries in pool.map(run, batches):
+                summaries.extend(batch_summaries)
+    else:
+        for batch in batches:
+            summaries.extend(run(batch))
+    return summaries
+
+
+def _summary_key(prompt: str, transcript: str) -> str:
+    return output_cache.output_cache_key(
+        "bart", SUMMARIZER_MODEL_ID,
+        {
+            "chunk_tokens": SUMMARY_CHUNK_TOKENS,
+            "chunk_max_tokens": CHUNK_SUMMARY_MAX_TOKENS,
+            "chunk_min_tokens": CHUNK_SUMMARY_MIN_TOKENS,
+            "max_length": 512,
+        },
+        prompt=prompt.strip(),
+        transcript=transcript.strip(),
+    )
+
+
+def summarize_text(prompt: str, transcript: str, max_latency_seconds: float = SUMMARY_MAX_LATENCY_SECONDS,
+                   use_cache: bool = True) -> str:
     """
     Combine prompt with transcript and generate a summary.
+
+    Transcripts that don't fit BART's input window are split into
+    token-budgeted chunks, summarized in batches and reduced level by level
+    until the partial summaries fit; the final pass sees the prompt.
+    Decoding is greedy, so complete summaries are cached by their inputs.
     """
+    key = _summary_key(prompt, transcript)
+    cached = output_cache.lookup(key, use_cache)
+    if cached is not None:
+        return cached
+
     full_prompt = f"{prompt.strip()}\n{transcript.strip()}"
-    result = _summarizer(full_prompt, max_length=512, do_sample=False)
-    return result[0].get('summary_text') or result[0].get('generated_text')
+    budget = max(128, MODEL_MAX_INPUT_TOKENS - _count_tokens(prompt.strip()) - 8)
+    deadline = time.monotonic() + max_latency_seconds if max_latency_seconds else None
+
+    text = transcript.strip()
+    while _count_tokens(full_prompt) > MODEL_MAX_INPUT_TOKENS:
+        if deadline is not None and time.monotonic() > deadline:
+            break  # out of time: the final pass truncates whatever is left
+        chunks = chunk_text(text, min(SUMMARY_CHUNK_TOKENS, budget))
+        if len(chunks) <= 1:
+            break
+        text = " ".join(_map_chunks(chunks, deadline))
+        full_prompt = f"{prompt.strip()}\n{text}"
+    # A summary cut short by the latency budget isn't the deterministic one
+    degraded = deadline is not None and time.monotonic() > deadline
+
+    with registry.use("bart") as summarizer:
+        result = summarizer(full_prompt, max_length=512, do_sample=False, truncation=True)
+    summary = result[0].get('summary_text') or result[0].get('generated_text')
+    if not degraded:
+        output_cache.store(key, summary)
+    return summary
+
+
+def summarize_texts(pairs: list, use_cache: bool = True) -> list:
+    """
+    summarize_text for a list of (prompt, transcript) pairs. Pairs that fit
+    BART's input in one pass go through the pipeline together, in batches
+    of SUMMARY_BATCH_SIZE; longer ones are summarized one by one. Results
+    are cached like summarize_text's.
+    """
+    summaries, batch = [None] * len(pairs), []
+    for i, (prompt, transcript) in enumerate(pairs):
+        key = _summary_key(prompt, transcript)
+        cached = output_cache.lookup(key, use_cache)
+        if cached is not None:
+            summaries[i] = cached
+            continue
+        full_prompt = f"{prompt.strip()}\n{transcript.strip()}"
+        if _count_tokens(full_prompt) <= MODEL_MAX_INPUT_TOKENS:
+            batch.append((i, key, full_prompt))
+        else:
+            summaries[i] = summarize_text(prompt, transcript, use_cache=use_cache)
+
+    if batch:
+        with registry.use("bart") as summarizer:
+            results = summarizer(
+                [full_prompt for _, _, full_prompt in batch],
+                max_length=512,
+                do_sample=False,
+                truncation=True,
+                batch_size=SUMMARY_BATCH_SIZE,
+            )
+        for (i, key, _), result in zip(batch, results):
+            summaries[i] = result.get('summary_text') or result.get('generated_text')
+            output_cache.store(key, summaries[i])
+    return summaries
+
+
+class RollingSummarizer:
+    """
+    Summarizes a transcript while it is still being produced. Segments are
+    added as they arrive and packed into windows of window_tokens; each full
+    window is summarized in the background (SUMMARY_WORKERS at a time), and
+    once the window summaries would overflow BART's input the oldest are
+    merged into one, so the notes stay within a single final pass.
+    finish() summarizes the last window and merges the notes with the
+    prompt. A transcript that never fills a window is summarized exactly as
+    summarize_text would.
+
+    Segment texts are joined with single spaces, as run_transcription joins
+    the transcript, so a single window is the text summarize_text would get.
+    `prepare` (e.g. redaction) is applied to each window's text before it is
+    summarized; `on_partial(index, start, end, summary)` is called from a
+    worker thread as each window summary completes.
+    """
+
+    def __init__(self, prompt: str, window_tokens: int = PIPELINE_WINDOW_TOKENS, prepare=None,
+                 on_partial=None, use_cache: bool = True):
+        self.prompt = prompt.strip()
+        self.window_tokens = window_tokens
+        self.prepare = prepare or (lambda text: text)
+        self.on_partial = on_partial
+        self.use_cache = use_cache
+        self.windows = 0
+        self._window, self._window_tokens, self._window_start, self._window_end = [], 0, None, None
+        self._notes = []  # futures of window summaries and merged notes, oldest first
+        self._budget = max(128, MODEL_MAX_INPUT_TOKENS - _count_tokens(self.prompt) - 8)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, SUMMARY_WORKERS), thread_name_prefix="rolling-summary")
+
+    def add(self, text: str, start: float = None, end: float = None):
+        n = _count_tokens(text)
+        if self._window and self._window_tokens + n > self.window_tokens:
+            self._cut()
+        if not self._window:
+            self._window_start = start
+        self._window.append(text)
+        self._window_tokens += n
+        self._window_end = end
+
+    def _cut(self):
+        text = self.prepare(" ".join(self._window))
+        index, start, end = self.windows, self._window_start, self._window_end
+        self._window, self._window_tokens = [], 0
+        self.windows += 1
+        self._notes.append(self._pool.submit(self._summarize_window, index, start, end, text))
+        # Each note is at most CHUNK_SUMMARY_MAX_TOKENS; merge before they overflow the final pass
+        if len(self._notes) * CHUNK_SUMMARY_MAX_TOKENS > self._budget:
+            self._notes = [self._pool.submit(self._merge, self._notes[:-1]), self._notes[-1]]
+
+    def _summarize_window(self, index: int, start, end, text: str) -> str:
+        summary = _summarize_batch([text], CHUNK_SUMMARY_MAX_TOKENS, CHUNK_SUMMARY_MIN_TOKENS)[0]
+        if self.on_partial is not None:
+            self.on_partial(index, start, end, summary)
+        return summary
+
+    @staticmethod
+    def _merge(notes: list) -> str:
+        # Submitted after its inputs, so they are already running or ahead of it in the queue
+        text = " ".join(note.result() for note in notes)
+        return _summarize_batch([text], CHUNK_SUMMARY_MAX_TOKENS, CHUNK_SUMMARY_MIN_TOKENS)[0]
+
+    def finish(self) -> str:
+        try:
+            if not self._notes:
+                text = self.prepare(" ".join(self._window))
+                return summarize_text(self.prompt, text, use_cache=self.use_cache)
+            if self._window:
+                self._cut()
+            notes = " ".join(note.result() for note in self._notes)
+            return summarize_text(self.prompt, notes, use_cache=self.use_cache)
+        finally:
+            self.close()
+
+    def close(self):
+        """Cancel window summaries not yet started; safe to call more than once."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
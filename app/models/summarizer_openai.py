@@ -1,23 +1,34 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from app.services import output_cache
 from app.services.openai_formatter import format_prompt_for_openai
+from app.services.providers import get_provider
 
-load_dotenv()
+OPENAI_MODEL = "gpt-4"
+OPENAI_PARAMS = {"temperature": 0.5, "max_tokens": 800}
+SYSTEM_PROMPT = "You are a helpful assistant that summarizes therapy session transcripts into well-structured notes."
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+async def summarize_text(prompt: str, transcript: str, user_type: str, note_type: str, use_cache: bool = True) -> str:
+    key = output_cache.output_cache_key(
+        "openai", OPENAI_MODEL, {**OPENAI_PARAMS, "system": SYSTEM_PROMPT},
+        prompt=prompt, transcript=transcript, user_type=user_type, note_type=note_type,
+    )
+    cached = await output_cache.alookup(key, use_cache)
+    if cached is not None:
+        return cached
 
-async def summarize_text(prompt: str, transcript: str, user_type: str, note_type: str) -> str:
     full_prompt = format_prompt_for_openai(prompt, transcript, user_type, note_type)
 
-    response = client.chat.completions.create(
-        model="gpt-4",
-        temperature=0.5,
-        max_tokens=800,
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant that summarizes therapy session transcripts into well-structured notes."},
-            {"role": "user", "content": full_prompt}
-        ]
+    response = await get_provider("openai").post_json(
+        "/chat/completions",
+        {
+            "model": OPENAI_MODEL,
+            **OPENAI_PARAMS,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": full_prompt}
+            ]
+        }
     )
 
-    return response.choices[0].message.content.strip()
+    summary = response["choices"][0]["message"]["content"].strip()
+    await output_cache.astore(key, summary)
+    return summary
@@ -1,11 +1,49 @@
-from faster_whisper import WhisperModel
+from functools import partial
 
-_model_cache = {}
+import numpy as np
 
-def get_whisper_model(size: str = "large-v3") -> WhisperModel:
+from app.core.config import WHISPER_CPU_THREADS, WHISPER_NUM_WORKERS
+from app.models.registry import registry
+
+WHISPER_SIZES = ("base", "large-v3")
+
+# Model used for complete recordings (/transcribe-recorded, uploads, jobs)
+RECORDED_MODEL_SIZE = "large-v3"
+
+
+def _load_whisper(size: str):
+    from faster_whisper import WhisperModel
+
+    # num_workers parallel transcribe calls, each on cpu_threads cores
+    return WhisperModel(
+        size, compute_type="int8", device="cpu",
+        cpu_threads=WHISPER_CPU_THREADS, num_workers=WHISPER_NUM_WORKERS,
+    )
+
+def _warmup_whisper(model):
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+    list(segments)
+
+def _register(size: str) -> str:
+    name = f"whisper:{size}"
+    if name not in registry:
+        registry.register(
+            name, partial(_load_whisper, size), warmup=_warmup_whisper, max_concurrency=WHISPER_NUM_WORKERS
+        )
+    return name
+
+for _size in WHISPER_SIZES:
+    _register(_size)
+
+def get_whisper_model(size: str = "large-v3"):
     """
     Load and cache Whisper model by size.
     """
-    if size not in _model_cache:
-        _model_cache[size] = WhisperModel(size, compute_type="int8", device="cpu")
-    return _model_cache[size]
+    return registry.get(_register(size))
+
+def use_whisper_model(size: str = "large-v3"):
+    """
+    Context manager holding a Whisper model for one transcription. Consume
+    the segments inside it: faster-whisper decodes lazily.
+    """
+    return registry.use(_register(size))
@@ -6,17 +6,43 @@ class ExpandIn(BaseModel):
     brief: str = Field(..., min_length=3, description="Short note to expand.")
     audience: Audience
     tone: Tone
-    # The following three arrive in payload but are IGNORED / not parsed:
-    target_words: Optional[int] = None
+    # Unset fields fall back to DEFAULT_TARGET_WORDS / READING_LEVEL / INCLUDE_CA_CONTEXT
+    target_words: Optional[int] = Field(None, gt=0, description="Approximate length; also sets the token budget.")
     reading_level: Optional[str] = None
     include_california_context: Optional[bool] = None
 
 class TokenUsage(BaseModel):
     prompt: int
     completion: int
+    budget: Optional[int] = Field(None, description="max_new_tokens allowed for the completion.")
+    stop_reason: Optional[str] = Field(None, description="eos, disclaimer, paragraphs, length or cancelled.")
 
 class ExpandOut(BaseModel):
     expanded_text: str
     model: str
     tokens: TokenUsage
     safety: dict
+
+class FinetunedExpandIn(ExpandIn):
+    adapter: Optional[str] = Field(None, description="Adapter to use; defaults to FINETUNED_EXPAND_ADAPTER.")
+
+class FinetunedExpandOut(ExpandOut):
+    adapter: str
+
+class FinetunedSummarizeIn(BaseModel):
+    transcript: str = Field(..., min_length=1, description="Session transcript to summarize.")
+    prompt: Optional[str] = None
+    user_type: Optional[str] = None
+    note_type: Optional[str] = None
+    adapter: Optional[str] = Field(None, description="Adapter to use; defaults to FINETUNED_SUMMARIZE_ADAPTER.")
+
+class FinetunedSummarizeOut(BaseModel):
+    summary: str
+    model: str
+    adapter: str
+    tokens: TokenUsage
+    safety: Optional[dict] = Field(None, description="Redaction counts; set when REDACT_TRANSCRIPTS is on.")
+
+class UploadCreateIn(BaseModel):
+    filename: str = Field("", description="Original file name; its extension helps the decoder probe the format.")
+    size: int = Field(..., gt=0, description="Total upload size in bytes.")
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from app.services.stopping import stopping_criteria
+
+
+class _Pending:
+    __slots__ = ("input_ids", "max_new_tokens", "prefix_len", "stop", "future", "enqueued_at")
+
+    def __init__(self, input_ids, max_new_tokens, prefix_len, stop=None):
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens
+        self.prefix_len = prefix_len
+        self.stop = stop
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class BatchScheduler:
+    """
+    Coalesces concurrent generation requests into batched model.generate calls.
+
+    A single background thread waits for the first request, then keeps
+    collecting until max_batch_size requests are queued or max_wait_ms has
+    passed. The batch is left-padded, generated in one call and each row's
+    completion token ids are routed back to the caller's future. A row
+    finishes at its own max_new_tokens, or earlier on its `stop` condition,
+    without ending the batch.
+
+    Left padding shifts every row's positions, so a shared prefix KV cache
+    can only be reused when a batch holds a single request.
+
+    `hold_model()` returns a context manager yielding the model; it is held
+    for each batch's generate call only, so the model can be shared and
+    pooled between batches.
+    """
+
+    def __init__(self, hold_model, get_tokenizer, max_batch_size: int = 4,
+                 max_wait_ms: float = 25, prefix_cache=None, model_id: str = None,
+                 **generate_kwargs):
+        self.hold_model = hold_model
+        self.get_tokenizer = get_tokenizer
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.prefix_cache = prefix_cache
+        self.model_id = model_id
+        self.generate_kwargs = generate_kwargs
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.requests = 0
+        self.batch_sizes = Counter()
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.generated_tokens = 0
+        self.generate_seconds = 0.0
+
+    def submit(self, input_ids: list, max_new_tokens: int, prefix_len: int = 0, stop=None) -> Future:
+        """Queue one tokenized prompt; the future resolves to its completion ids."""
+        self._ensure_started()
+        pending = _Pending(input_ids, max_new_tokens, prefix_len, stop)
+        self._queue.put(pending)
+        return pending.future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="expand-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self._run(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.future.set_exception(e)
+            else:
+                for pending, completion in zip(batch, results):
+                    pending.future.set_result(completion)
+
+    def _run(self, batch: list) -> list:
+        import torch
+
+        tokenizer = self.get_tokenizer()
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+        started = time.perf_counter()
+        for pending in batch:
+            wait = started - pending.enqueued_at
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+
+        width = max(len(p.input_ids) for p in batch)
+        input_ids = torch.full((len(batch), width), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(batch), width), dtype=torch.long)
+        for row, pending in enumerate(batch):
+            n = len(pending.input_ids)
+            input_ids[row, width - n:] = torch.tensor(pending.input_ids, dtype=torch.long)
+            attention_mask[row, width - n:] = 1
+
+        stops = [pending.stop for pending in batch]
+        budgets = [pending.max_new_tokens for pending in batch]
+        # Rows with smaller budgets than the batch's largest stop at their own
+        criteria = [stopping_criteria(stops, width, budgets)] if any(stops) or len(set(budgets)) > 1 else []
+
+        with self.hold_model() as model:
+            eos_ids = model.generation_config.eos_token_id
+            eos_ids = set(eos_ids if isinstance(eos_ids, (list, tuple)) else [eos_ids])
+            device = next(model.parameters()).device
+            past_key_values = None
+            first = batch[0]
+            if len(batch) == 1 and self.prefix_cache is not None and 0 < first.prefix_len < width:
+                past_key_values = self.prefix_cache.get(model, self.model_id, first.input_ids[:first.prefix_len])
+
+            with torch.no_grad():
+                out = model.generate(
+                    input_ids=input_ids.to(device),
+                    attention_mask=attention_mask.to(device),
+                    max_new_tokens=max(p.max_new_tokens for p in batch),
+                    pad_token_id=pad_id,
+                    past_key_values=past_key_values,
+                    stopping_criteria=criteria,
+                    **self.generate_kwargs,
+                )
+
+        results = []
+        for row, pending in enumerate(batch):
+            completion = []
+            limit = pending.max_new_tokens
+            if getattr(pending.stop, "length", None) is not None:
+                limit = min(limit, pending.stop.length)
+            for token in out[row, width:].tolist()[:limit]:
+                if token in eos_ids:
+                    break
+                completion.append(token)
+            results.append(completion)
+            self.generated_tokens += len(completion)
+
+        self.generate_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.requests += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        return results
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "queue_depth": self.queue_depth(),
+            "avg_batch_size": round(self.requests / self.batches, 3) if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+            "avg_queue_wait_ms": round(1000 * self.queue_wait_total / self.requests, 2) if self.requests else 0.0,
+            "max_queue_wait_ms": round(1000 * self.queue_wait_max, 2),
+            "tokens_per_second": round(self.generated_tokens / self.generate_seconds, 2) if self.generate_seconds else 0.0,
+        }
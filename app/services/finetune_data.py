@@ -0,0 +1,152 @@
+"""
+Pre-tokenized, memory-mapped fine-tuning datasets.
+
+Each example is the exact prompt the serving path builds (chat template,
+generation prompt, same tokenizer call) followed by the target and EOS.
+Tokenizing happens once; epochs read straight from the memory map.
+
+Layout of a dataset directory:
+
+    tokens.bin          every example's token ids back to back (uint16 or uint32)
+    offsets.npy         int64, example i is tokens[offsets[i]:offsets[i + 1]]
+    prompt_lengths.npy  int32, leading tokens of each example that are prompt
+    meta.json           task, tokenizer, dtype, counts
+"""
+import csv
+import json
+import os
+import shutil
+from itertools import islice
+
+from app.core.constants import MODEL_ID
+from app.models.generator import get_tokenizer
+from app.schemas.requests import ExpandIn
+from app.services.finetuned import build_summary_messages
+from app.services.text_expander import build_messages
+
+IGNORE_INDEX = -100
+
+
+def summarize_example(row: dict):
+    """(messages, target) for a notes_summary.csv row."""
+    return build_summary_messages(row["prompt"], row["notes"], row.get("user_type"), row.get("note_type")), row["summary"]
+
+
+def expand_example(row: dict):
+    """(messages, target) for a notes_generation.csv row."""
+    p = ExpandIn(brief=row["brief"], audience=row["audience"], tone=row["tone"])
+    return build_messages(p), row["notes"]
+
+
+EXAMPLES = {
+    "summarize": summarize_example,
+    "expand": expand_example,
+}
+
+
+def _token_dtype(tokenizer):
+    import numpy as np
+
+    return np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.uint32
+
+
+def build_dataset(task: str, csv_path: str, out_dir: str, max_length: int = 2048, chunk_rows: int = 256,
+                  tokenizer=None) -> dict:
+    """
+    Tokenize every row of csv_path into out_dir with `tokenizer` (the
+    served model's by default). Rows longer than max_length tokens are
+    skipped rather than truncated, so no example loses its end of
+    sequence. The dataset is written to a temporary directory and
+    renamed into place.
+    """
+    import numpy as np
+
+    if tokenizer is None:
+        tokenizer = get_tokenizer()
+    dtype = _token_dtype(tokenizer)
+    eos = [tokenizer.eos_token_id] if tokenizer.eos_token_id is not None else []
+    make_example = EXAMPLES[task]
+
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    offsets, prompt_lengths = [0], []
+    skipped = 0
+    with open(csv_path, newline="", encoding="utf-8") as f, \
+            open(os.path.join(tmp_dir, "tokens.bin"), "wb") as tokens_file:
+        rows = csv.DictReader(f)
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            examples = [make_example(row) for row in chunk]
+            # Batched calls let fast tokenizers work in parallel
+            prompts = [
+                tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+                for messages, _ in examples
+            ]
+            prompt_ids = tokenizer(prompts)["input_ids"]
+            target_ids = tokenizer([target for _, target in examples], add_special_tokens=False)["input_ids"]
+            for prompt, target in zip(prompt_ids, target_ids):
+                ids = prompt + target + eos
+                if len(ids) > max_length:
+                    skipped += 1
+                    continue
+                tokens_file.write(np.asarray(ids, dtype=dtype).tobytes())
+                offsets.append(offsets[-1] + len(ids))
+                prompt_lengths.append(len(prompt))
+
+    np.save(os.path.join(tmp_dir, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_dir, "prompt_lengths.npy"), np.asarray(prompt_lengths, dtype=np.int32))
+    meta = {
+        "task": task,
+        "source": os.path.abspath(csv_path),
+        "tokenizer": getattr(tokenizer, "name_or_path", None) or MODEL_ID,
+        "vocab_size": len(tokenizer),
+        "dtype": np.dtype(dtype).name,
+        "examples": len(prompt_lengths),
+        "tokens": offsets[-1],
+        "skipped_too_long": skipped,
+        "max_length": max_length,
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return meta
+
+
+class TokenizedDataset:
+    """
+    Read-only view over a built dataset. Items are dicts of input_ids and
+    labels (prompt positions set to IGNORE_INDEX), the format Hugging Face
+    causal-LM training expects; only the requested example is read from disk.
+    """
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.tokens = np.memmap(os.path.join(path, "tokens.bin"), dtype=self.meta["dtype"], mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.prompt_lengths = np.load(os.path.join(path, "prompt_lengths.npy"), mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.prompt_lengths)
+
+    def __getitem__(self, i: int) -> dict:
+        import numpy as np
+
+        ids = np.asarray(self.tokens[self.offsets[i]:self.offsets[i + 1]], dtype=np.int64)
+        labels = ids.copy()
+        labels[:self.prompt_lengths[i]] = IGNORE_INDEX
+        return {"input_ids": ids, "labels": labels}
+
+    def lengths(self):
+        """Tokens per example, for length-grouped batching."""
+        import numpy as np
+
+        return np.diff(self.offsets)
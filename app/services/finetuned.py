@@ -0,0 +1,119 @@
+import time
+
+from app.core.config import REDACT_TRANSCRIPTS
+from app.core.constants import EDU_DISCLAIMER
+from app.core.metrics import span
+from app.inference import client as model_client
+from app.models.adapters import adapters
+from app.models.backends import TransformersBackend
+from app.models.generator import get_tokenizer
+from app.schemas.requests import ExpandIn
+from app.services.redaction import redact, safety_flags
+from app.services.stopping import stopping_criteria
+from app.services.text_expander import (
+    _expansion_stop, _max_new_tokens, _prompt_ids, _record_generation, _safety, _stop_reason
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You turn transcripts of school-based mental health sessions into structured, "
+    "de-identified clinical notes. Use neutral, respectful language and do not add "
+    "details that are not in the transcript."
+)
+DEFAULT_SUMMARY_PROMPT = (
+    "Summarize the transcript into a structured clinical note (SOAP style) using neutral, respectful language."
+)
+SUMMARY_MAX_NEW_TOKENS = 512
+
+
+def build_summary_messages(prompt: str, transcript: str, user_type: str = None, note_type: str = None):
+    # Shared with the dataset builder, so adapters see the prompt they were trained on
+    header = [prompt or DEFAULT_SUMMARY_PROMPT]
+    if user_type:
+        header.append(f"User type: {user_type}")
+    if note_type:
+        header.append(f"Note type: {note_type}")
+    return [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n".join(header) + f"\n\nTranscript:\n{transcript}"},
+    ]
+
+
+def render_prompt_ids(messages) -> list:
+    tokenizer = get_tokenizer()
+    prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    return tokenizer(prompt)["input_ids"]
+
+
+def generate_with_adapter(adapter: str, input_ids: list, max_new_tokens: int, stop=None) -> list:
+    """Completion token ids from the base model with `adapter` active."""
+    import torch
+
+    started = time.perf_counter()
+    if model_client.installed():
+        with span("generate"):
+            completion = model_client.generate_with_adapter(adapter, input_ids, max_new_tokens, stop)
+        _record_generation("lora", len(completion), time.perf_counter() - started)
+        return completion
+
+    with adapters.use(adapter) as model:
+        device = next(model.parameters()).device
+        inputs = torch.tensor([input_ids], dtype=torch.long, device=device)
+        with span("generate"), torch.no_grad():
+            out = model.generate(
+                input_ids=inputs,
+                attention_mask=torch.ones_like(inputs),
+                max_new_tokens=max_new_tokens,
+                stopping_criteria=[stopping_criteria([stop], len(input_ids))] if stop is not None else None,
+                **TransformersBackend.generate_kwargs
+            )
+    completion = out[0, len(input_ids):].tolist()
+    _record_generation("lora", len(completion), time.perf_counter() - started)
+    return completion
+
+
+def summarize_with_adapter(adapter: str, prompt: str, transcript: str, user_type: str = None, note_type: str = None):
+    """
+    (summary, tokens, safety). With REDACT_TRANSCRIPTS the transcript is
+    redacted before it reaches the model and the summary after, as in
+    run_transcription; safety is None otherwise.
+    """
+    if REDACT_TRANSCRIPTS:
+        with span("redact"):
+            transcript_redaction = redact(transcript)
+        transcript = transcript_redaction.text
+    with span("tokenize"):
+        input_ids = render_prompt_ids(build_summary_messages(prompt, transcript, user_type, note_type))
+    completion_ids = generate_with_adapter(adapter, input_ids, SUMMARY_MAX_NEW_TOKENS)
+    with span("detokenize"):
+        summary = get_tokenizer().decode(completion_ids, skip_special_tokens=True).strip()
+
+    safety = None
+    if REDACT_TRANSCRIPTS:
+        with span("redact"):
+            summary_redaction = redact(summary)
+        summary = summary_redaction.text
+        safety = safety_flags(transcript_redaction, summary_redaction)
+    return summary, {"prompt": len(input_ids), "completion": len(completion_ids)}, safety
+
+
+def expand_with_adapter(adapter: str, p: ExpandIn):
+    """Same prompt, disclaimer and safety handling as generate_expansion, on an adapter."""
+    with span("tokenize"):
+        input_ids, _ = _prompt_ids(p)
+    budget = _max_new_tokens(p)
+    stop = _expansion_stop()
+    completion_ids = generate_with_adapter(adapter, input_ids, budget, stop)
+    with span("detokenize"):
+        expanded = get_tokenizer().decode(completion_ids, skip_special_tokens=True).strip()
+
+    disclaimer_added = EDU_DISCLAIMER not in expanded
+    if disclaimer_added:
+        expanded = f"{expanded}\n\n*{EDU_DISCLAIMER}*"
+
+    tokens = {
+        "prompt": len(input_ids),
+        "completion": len(completion_ids),
+        "budget": budget,
+        "stop_reason": _stop_reason(stop, len(completion_ids), budget),
+    }
+    return expanded, tokens, _safety(p, disclaimer_added)
@@ -0,0 +1,230 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app.core.config import JOB_DB_PATH, JOB_EXECUTOR, JOB_WORKERS
+from app.core.metrics import register_queue
+from app.utils.audio import cleanup_files
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL_STATES = (SUCCEEDED, FAILED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+
+class JobStore:
+    """
+    SQLite-backed job table. Safe to share between threads, worker
+    processes and gunicorn workers on the same node.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, kind: str, params: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(params), time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def get_params(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["kind"], json.loads(row["params"])
+
+    def claim(self, job_id: str) -> bool:
+        """Atomically move a queued job to running; False if someone else got it."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, owner_pid = ?, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, os.getpid(), time.time(), job_id, QUEUED),
+            )
+        return cur.rowcount == 1
+
+    def finish(self, job_id: str, result=None, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (
+                    FAILED if error else SUCCEEDED,
+                    None if result is None else json.dumps(result),
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def count(self, status: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def recover(self) -> list:
+        """
+        Requeue jobs whose owning process is gone and return every queued job id.
+        """
+        with self._connect() as conn:
+            running = conn.execute(
+                "SELECT id, owner_pid FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for row in running:
+                if not _pid_alive(row["owner_pid"]):
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, owner_pid = NULL, started_at = NULL WHERE id = ? AND status = ?",
+                        (QUEUED, row["id"], RUNNING),
+                    )
+            queued = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in queued]
+
+
+def _row_to_job(row) -> dict:
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "started_at": row["started_at"],
+        "finished_at": row["finished_at"],
+    }
+
+
+def _pid_alive(pid) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _run_transcription_job(params: dict) -> dict:
+    from app.services.pipeline import run_transcription
+
+    try:
+        return run_transcription(
+            params["audio_path"],
+            params["user_type"],
+            params["note_type"],
+            params["prompt"],
+            params["model_size"],
+            audio_hash=params.get("audio_hash"),
+            use_cache=params.get("use_cache", True),
+        )
+    finally:
+        cleanup_files([params["audio_path"]])
+
+
+JOB_HANDLERS = {
+    "transcribe": _run_transcription_job,
+}
+
+
+def execute_job(db_path: str, job_id: str):
+    """
+    Worker entry point. Module-level so it can be pickled into a process pool.
+    """
+    store = JobStore(db_path)
+    if not store.claim(job_id):
+        return
+
+    kind, params = store.get_params(job_id)
+    try:
+        result = JOB_HANDLERS[kind](params)
+    except Exception as e:
+        store.finish(job_id, error=f"{type(e).__name__}: {e}")
+    else:
+        store.finish(job_id, result=result)
+
+
+class JobQueue:
+    """
+    Runs jobs from a JobStore on a thread or process pool.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, executor: str = JOB_EXECUTOR):
+        self.store = store
+        self.workers = max(1, workers)
+        self.executor_kind = executor
+        self._executor = None
+        register_queue("jobs", lambda: self.store.count(QUEUED))
+
+    def start(self):
+        if self._executor is not None:
+            return
+        if self.executor_kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        for job_id in self.store.recover():
+            self._executor.submit(execute_job, self.store.path, job_id)
+
+    def submit(self, kind: str, params: dict) -> dict:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        job = self.store.create(kind, params)
+        self._executor.submit(execute_job, self.store.path, job["job_id"])
+        return job
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(JobStore())
+    return _queue
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import (
+    LONG_AUDIO_CHUNK_SECONDS, LONG_AUDIO_MIN_SILENCE_MS, LONG_AUDIO_SPEECH_PAD_MS, LONG_AUDIO_WORKERS
+)
+from app.core.metrics import span
+from app.models.whisper import use_whisper_model
+from app.services.transcriber import transcribe_segments
+from app.utils.audio import SAMPLE_RATE
+
+# Part of the transcript cache key, so retuning never serves old chunkings
+LONG_AUDIO_OPTIONS = {
+    "chunk_seconds": LONG_AUDIO_CHUNK_SECONDS,
+    "min_silence_ms": LONG_AUDIO_MIN_SILENCE_MS,
+    "speech_pad_ms": LONG_AUDIO_SPEECH_PAD_MS,
+}
+
+
+def speech_chunks(samples, chunk_seconds: float = LONG_AUDIO_CHUNK_SECONDS,
+                  min_silence_ms: int = LONG_AUDIO_MIN_SILENCE_MS,
+                  speech_pad_ms: int = LONG_AUDIO_SPEECH_PAD_MS) -> list:
+    """
+    Speech regions from Silero VAD ({"start", "end"} in samples), packed into
+    chunks of at most chunk_seconds of speech. Chunks only break between
+    regions, i.e. at silences, except where a single region is longer than
+    a chunk (VAD already splits those at its quietest point).
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    regions = get_speech_timestamps(samples, VadOptions(
+        min_silence_duration_ms=min_silence_ms,
+        speech_pad_ms=speech_pad_ms,
+        max_speech_duration_s=chunk_seconds,
+    ))
+    limit = int(chunk_seconds * SAMPLE_RATE)
+    chunks, current, current_samples = [], [], 0
+    for region in regions:
+        n = region["end"] - region["start"]
+        if current and current_samples + n > limit:
+            chunks.append(current)
+            current, current_samples = [], 0
+        current.append(region)
+        current_samples += n
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _transcribe_chunk(samples, regions: list, model_size: str, options: dict) -> tuple:
+    """Transcribe one chunk's speech, concatenated, and map times back onto the recording."""
+    import numpy as np
+    from faster_whisper.vad import SpeechTimestampsMap
+
+    audio = np.concatenate([samples[r["start"]:r["end"]] for r in regions])
+    with use_whisper_model(model_size) as model:
+        segments, language = transcribe_segments(model, audio, **options)
+
+    timeline = SpeechTimestampsMap(regions, SAMPLE_RATE)
+    for segment in segments:
+        start_index = timeline.get_chunk_index(segment["start"])
+        # A segment ending exactly on a region boundary belongs to that region
+        end_index = timeline.get_chunk_index(max(segment["start"], segment["end"] - 1 / SAMPLE_RATE))
+        segment["start"] = timeline.get_original_time(segment["start"], start_index)
+        segment["end"] = timeline.get_original_time(segment["end"], end_index)
+    return segments, language
+
+
+def transcribe_long(samples, model_size: str, workers: int = LONG_AUDIO_WORKERS, **options) -> dict:
+    """
+    VAD-gated, chunked transcription of a long recording. The first chunk
+    is transcribed alone to pin the language (unless given), the rest in
+    parallel, LONG_AUDIO_WORKERS at a time; the model pool bounds how many
+    actually decode at once. Returns the stitched segments with times in
+    the original recording, the joined text and the real-time factor.
+    """
+    started = time.perf_counter()
+    audio_seconds = len(samples) / SAMPLE_RATE
+    with span("vad"):
+        chunks = speech_chunks(samples)
+
+    segments_by_chunk, language = [], options.get("language")
+    if chunks:
+        first, language = _transcribe_chunk(samples, chunks[0], model_size, options)
+        segments_by_chunk.append(first)
+        options = {**options, "language": language}
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            segments_by_chunk.extend(pool.map(
+                lambda regions: _transcribe_chunk(samples, regions, model_size, options)[0], chunks[1:]
+            ))
+
+    segments = [segment for chunk in segments_by_chunk for segment in chunk]
+    elapsed = time.perf_counter() - started
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+        "audio_seconds": round(audio_seconds, 2),
+        "speech_seconds": round(sum(r["end"] - r["start"] for c in chunks for r in c) / SAMPLE_RATE, 2),
+        "chunks": len(chunks),
+        "elapsed_seconds": round(elapsed, 3),
+        "real_time_factor": round(elapsed / audio_seconds, 4) if audio_seconds else None,
+    }
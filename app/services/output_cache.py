@@ -0,0 +1,61 @@
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import (
+    CACHE_DB_PATH, OUTPUT_CACHE, OUTPUT_CACHE_MEMORY_ITEMS, OUTPUT_CACHE_DISK_ITEMS, OUTPUT_CACHE_TTL_SECONDS
+)
+from app.utils.cache import LRUCache, SQLiteStore, TieredCache, make_cache_key
+
+BYPASS_HEADER = "x-cache-bypass"
+
+output_cache = TieredCache(
+    "outputs",
+    LRUCache(max_items=OUTPUT_CACHE_MEMORY_ITEMS, ttl_seconds=OUTPUT_CACHE_TTL_SECONDS),
+    SQLiteStore(
+        CACHE_DB_PATH, "outputs",
+        max_items=OUTPUT_CACHE_DISK_ITEMS, ttl_seconds=OUTPUT_CACHE_TTL_SECONDS,
+    ),
+)
+
+
+def output_cache_key(provider: str, model: str, params: dict, **inputs) -> str:
+    """
+    Key for one generated output. Everything that can change the output
+    (provider, model id, generation params and the request inputs) must be
+    passed in.
+    """
+    return make_cache_key("output", provider, model, params, inputs)
+
+
+def cache_bypassed(headers) -> bool:
+    """
+    True if the client opted out of cached outputs, e.g. to get a fresh
+    sample, via `Cache-Control: no-cache`/`no-store` or `X-Cache-Bypass: 1`.
+    """
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return True
+    return headers.get(BYPASS_HEADER, "").lower() in ("1", "true", "yes")
+
+
+def lookup(key: str, use_cache: bool = True):
+    if not (OUTPUT_CACHE and use_cache):
+        return None
+    return output_cache.get(key)
+
+
+def store(key: str, value):
+    # Bypassed requests still store their fresh output for later callers
+    if OUTPUT_CACHE:
+        output_cache.set(key, value)
+
+
+async def alookup(key: str, use_cache: bool = True):
+    """lookup() for the event loop: the disk tier is read on a worker thread."""
+    if not (OUTPUT_CACHE and use_cache):
+        return None
+    return await run_in_threadpool(output_cache.get, key)
+
+
+async def astore(key: str, value):
+    if OUTPUT_CACHE:
+        await run_in_threadpool(output_cache.set, key, value)
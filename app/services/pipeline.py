@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+
+from app.models.whisper import use_whisper_model
+from app.models.summarizer import RollingSummarizer, summarize_text
+from app.services.long_audio import LONG_AUDIO_OPTIONS, transcribe_long
+from app.services.transcriber import iter_segments, transcribe_audio
+from app.core.config import (
+    CACHE_DB_PATH, TRANSCRIPT_CACHE_MEMORY_ITEMS, TRANSCRIPT_CACHE_DISK_ITEMS, TRANSCRIPT_CACHE_TTL_SECONDS,
+    REDACT_TRANSCRIPTS, LONG_AUDIO_MIN_SECONDS, PIPELINED_SUMMARY
+)
+from app.core.metrics import AUDIO_SECONDS, REAL_TIME_FACTOR, span
+from app.services.redaction import redact, redact_batch, safety_flags
+from app.utils.audio import SAMPLE_RATE, get_file_hash, hash_fileobj, load_audio
+from app.utils.cache import LRUCache, SQLiteStore, TieredCache, make_cache_key
+
+# Decode parameters are part of the cache key, so changing them never
+# serves a transcript produced with different settings.
+TRANSCRIBE_OPTIONS = {"beam_size": 5}
+
+transcript_cache = TieredCache(
+    "transcripts",
+    LRUCache(max_items=TRANSCRIPT_CACHE_MEMORY_ITEMS, ttl_seconds=TRANSCRIPT_CACHE_TTL_SECONDS),
+    SQLiteStore(
+        CACHE_DB_PATH, "transcripts",
+        max_items=TRANSCRIPT_CACHE_DISK_ITEMS, ttl_seconds=TRANSCRIPT_CACHE_TTL_SECONDS,
+    ),
+)
+
+
+def transcript_cache_key(audio_hash: str, model_size: str, options: dict = TRANSCRIBE_OPTIONS) -> str:
+    return make_cache_key("transcript", "raw-sha256", audio_hash, model_size, options)
+
+
+def long_transcript_cache_key(audio_hash: str, model_size: str) -> str:
+    return transcript_cache_key(audio_hash, model_size, {**TRANSCRIBE_OPTIONS, "long_audio": LONG_AUDIO_OPTIONS})
+
+
+def _redacted(text: str) -> str:
+    return redact(text).text
+
+
+def transcribe_pipelined(samples, model_size: str, prompt: str, use_cache: bool = True, on_event=None):
+    """
+    Transcribe and summarize at once: segments feed a RollingSummarizer as
+    Whisper yields them, so summarization overlaps transcription. Returns
+    the raw transcript and the RollingSummarizer, whose finish() is then
+    only the last window and the merge. on_event(name, data) is
+    called with each "segment" and "partial_summary" (both redacted with
+    REDACT_TRANSCRIPTS).
+    """
+    emit = on_event or (lambda event, data: None)
+
+    def on_partial(index, start, end, summary):
+        emit("partial_summary", {
+            "index": index, "start": start, "end": end,
+            "text": _redacted(summary) if REDACT_TRANSCRIPTS else summary,
+        })
+
+    rolling = RollingSummarizer(
+        prompt, prepare=_redacted if REDACT_TRANSCRIPTS else None, on_partial=on_partial, use_cache=use_cache,
+    )
+    texts = []
+    try:
+        with use_whisper_model(model_size) as model:
+            with span("transcribe"):
+                for start, end, text in iter_segments(model, samples, **TRANSCRIBE_OPTIONS):
+                    # Unstripped, so windows join exactly like the transcript below
+                    texts.append(text)
+                    rolling.add(text, start, end)
+                    if on_event is not None and text.strip():
+                        emit("segment", {
+                            "start": start, "end": end,
+                            "text": _redacted(text.strip()) if REDACT_TRANSCRIPTS else text.strip(),
+                        })
+    except BaseException:
+        rolling.close()
+        raise
+    # Joined as transcribe_audio does, so the transcript cache entry is the same
+    return " ".join(texts), rolling
+
+
+def run_transcription(audio, user_type: str, note_type: str, prompt: str, model_size: str,
+                      suffix: str = "", audio_hash: str = None, use_cache: bool = True, decoded=None,
+                      pipelined: bool = PIPELINED_SUMMARY, on_event=None) -> dict:
+    """
+    Transcribe and summarize an upload given as a path or seekable file object.
+
+    The raw upload bytes are hashed for the cache lookup; on a miss they are
+    decoded once, in memory, to 16 kHz float32 and handed straight to Whisper.
+    This is blocking work; call it from a worker thread/process, never
+    directly on the event loop. use_cache=False skips the summary cache
+    lookup (the transcript cache is always used). With REDACT_TRANSCRIPTS
+    the transcript is redacted before it is summarized or returned, and the
+    summary after. `decoded` is an optional callable returning samples the
+    caller already decoded (None to decode `audio` here as usual).
+
+    Recordings of LONG_AUDIO_MIN_SECONDS or more go through transcribe_long
+    instead; the result then also carries the timestamped "segments", and
+    metadata["transcription"] the chunking and real-time factor.
+
+    With `pipelined`, a transcript that isn't cached is summarized while it
+    is transcribed (see transcribe_pipelined), and on_event receives its
+    segments and partial summaries.
+    """
+    if audio_hash is None:
+        with span("hash"):
+            audio_hash = get_file_hash(audio) if isinstance(audio, str) else hash_fileobj(audio)
+    cache_key = transcript_cache_key(audio_hash, model_size)
+    long_cache_key = long_transcript_cache_key(audio_hash, model_size)
+
+    long_result, rolling = None, None
+    with span("transcript_cache"):
+        raw_transcript = transcript_cache.get(cache_key)
+        if raw_transcript is None and LONG_AUDIO_MIN_SECONDS:
+            long_result = transcript_cache.get(long_cache_key)
+    if raw_transcript is None and long_result is None:
+        with span("decode"):
+            samples = decoded() if decoded is not None else None
+            if samples is None:
+                samples = load_audio(audio, suffix)
+        audio_seconds = len(samples) / SAMPLE_RATE
+        started = time.perf_counter()
+        if LONG_AUDIO_MIN_SECONDS and audio_seconds >= LONG_AUDIO_MIN_SECONDS:
+            with span("transcribe"):
+                long_result = transcribe_long(samples, model_size, **TRANSCRIBE_OPTIONS)
+            transcript_cache.set(long_cache_key, long_result)
+        elif pipelined:
+            raw_transcript, rolling = transcribe_pipelined(samples, model_size, prompt, use_cache, on_event)
+            transcript_cache.set(cache_key, raw_transcript)
+        else:
+            with use_whisper_model(model_size) as model:
+                with span("transcribe"):
+                    raw_transcript = transcribe_audio(model, samples, **TRANSCRIBE_OPTIONS)
+            transcript_cache.set(cache_key, raw_transcript)
+        AUDIO_SECONDS.observe(audio_seconds, model=model_size)
+        if audio_seconds:
+            REAL_TIME_FACTOR.observe((time.perf_counter() - started) / audio_seconds, model=model_size)
+
+    segments = None
+    if long_result is not None:
+        raw_transcript = long_result["text"]
+        segments = [dict(segment) for segment in long_result["segments"]]
+
+    if REDACT_TRANSCRIPTS:
+        with span("redact"):
+            transcript_redaction = redact(raw_transcript)
+        raw_transcript = transcript_redaction.text
+        if segments:
+            for segment, redaction in zip(segments, redact_batch([segment["text"] for segment in segments])):
+                segment["text"] = redaction.text
+
+    with span("summarize"):
+        if rolling is not None:
+            summary = rolling.finish()
+        else:
+            summary = summarize_text(prompt, raw_transcript, use_cache=use_cache)
+
+    metadata = {
+        "user_type": user_type,
+        "note_type": note_type
+    }
+    if long_result is not None:
+        metadata["transcription"] = {
+            key: long_result[key]
+            for key in ("language", "audio_seconds", "speech_seconds", "chunks", "elapsed_seconds", "real_time_factor")
+        }
+        metadata["transcription"]["mode"] = "long_audio"
+    elif rolling is not None:
+        metadata["transcription"] = {"mode": "pipelined", "summary_windows": rolling.windows}
+    if REDACT_TRANSCRIPTS:
+        with span("redact"):
+            summary_redaction = redact(summary)
+        summary = summary_redaction.text
+        metadata["safety"] = safety_flags(transcript_redaction, summary_redaction)
+
+    result = {
+        "original_transcript": raw_transcript,
+        "formatted_text": summary,
+        "prompt_used": prompt,
+        "metadata": metadata
+    }
+    if segments is not None:
+        result["segments"] = segments
+    return result
+
+
+def stream_transcription(*args, **kwargs):
+    """
+    run_transcription in pipelined mode on its own thread, yielding
+    (event, data) as segments and partial summaries arrive, then
+    ("result", result) or ("error", {"detail"}). A consumer that stops
+    early leaves the run to finish, so its transcript is still cached.
+    """
+    events = queue.Queue()
+
+    def run():
+        try:
+            result = run_transcription(*args, pipelined=True, on_event=lambda *event: events.put(event), **kwargs)
+        except Exception as e:
+            events.put(("error", {"detail": str(e)}))
+        else:
+            events.put(("result", result))
+
+    threading.Thread(target=run, name="pipelined-transcription", daemon=True).start()
+    while True:
+        event, data = events.get()
+        yield event, data
+        if event in ("result", "error"):
+            return
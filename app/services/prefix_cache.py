@@ -0,0 +1,85 @@
+import copy
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from app.utils.cache import make_cache_key
+
+
+class PrefixCache:
+    """
+    LRU of precomputed attention key/values for constant prompt prefixes.
+
+    The stored cache is never handed out directly; every generation starts
+    from a deep copy, since generate() appends to the cache in place.
+    A missing prefix is computed outside the lock by the first caller to
+    ask for it; concurrent callers for the same prefix wait on that
+    result, and lookups of other prefixes aren't held up.
+    """
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._pending = {}  # key -> Future of a prefix being computed
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+        self.prefix_tokens_reused = 0
+
+    def get(self, model, model_id: str, prefix_ids: list):
+        """Return a private copy of the KV cache for prefix_ids, computing it once."""
+        key = make_cache_key(model_id, prefix_ids)
+        computing = False
+        with self._lock:
+            cache = self._entries.get(key)
+            pending = None
+            if cache is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif key in self._pending:
+                pending = self._pending[key]
+                self.hits += 1
+            else:
+                pending = self._pending[key] = Future()
+                computing = True
+                self.misses += 1
+            if not computing:
+                self.prefix_tokens_reused += len(prefix_ids)
+
+        if computing:
+            try:
+                cache = self._compute(model, prefix_ids)
+            except BaseException as e:
+                with self._lock:
+                    del self._pending[key]
+                pending.set_exception(e)
+                raise
+            with self._lock:
+                self._entries[key] = cache
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                del self._pending[key]
+            pending.set_result(cache)
+        elif pending is not None:
+            cache = pending.result()
+        return copy.deepcopy(cache)
+
+    @staticmethod
+    def _compute(model, prefix_ids: list):
+        import torch
+
+        device = next(model.parameters()).device
+        ids = torch.tensor([prefix_ids], dtype=torch.long, device=device)
+        with torch.no_grad():
+            out = model(input_ids=ids, attention_mask=torch.ones_like(ids), use_cache=True)
+        return out.past_key_values
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "prefix_tokens_reused": self.prefix_tokens_reused,
+        }
@@ -0,0 +1,184 @@
+import asyncio
+import importlib.util
+import random
+
+import httpx
+
+from app.core.config import (
+    ANTHROPIC_API_KEY, ANTHROPIC_BASE_URL, OPENAI_API_KEY, OPENAI_BASE_URL,
+    PROVIDER_MAX_CONCURRENCY, PROVIDER_TIMEOUT_SECONDS, PROVIDER_MAX_RETRIES,
+    PROVIDER_BACKOFF_BASE_SECONDS, PROVIDER_BACKOFF_MAX_SECONDS,
+)
+from app.core.metrics import register_queue, span
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+
+class ProviderError(RuntimeError):
+    def __init__(self, provider: str, status_code: int = None, detail: str = ""):
+        self.provider = provider
+        self.status_code = status_code
+        super().__init__(f"{provider} API failed ({status_code}): {detail}")
+
+
+class ProviderNotConfigured(ProviderError):
+    """The provider's API key is missing; a deployment problem, not an upstream failure."""
+
+    def __init__(self, provider: str, detail: str):
+        self.provider = provider
+        self.status_code = None
+        RuntimeError.__init__(self, detail)
+
+
+class ProviderClient:
+    """
+    One long-lived pooled httpx.AsyncClient per provider: keep-alive,
+    HTTP/2 when the h2 package is installed, a concurrency semaphore,
+    timeouts, and retries with jittered exponential backoff on
+    429/5xx and transport errors.
+    """
+
+    def __init__(self, name: str, base_url: str, headers: dict,
+                 max_concurrency: int = PROVIDER_MAX_CONCURRENCY,
+                 timeout: float = PROVIDER_TIMEOUT_SECONDS,
+                 max_retries: int = PROVIDER_MAX_RETRIES):
+        self.name = name
+        self.base_url = base_url
+        self.headers = headers
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._semaphore = None
+
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.waiting = 0
+        register_queue(f"provider_{name}", lambda: self.waiting)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(self.timeout, connect=min(10.0, self.timeout)),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    def _backoff(attempt: int, response: httpx.Response = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), PROVIDER_BACKOFF_MAX_SECONDS)
+            except ValueError:
+                pass
+        # Full jitter keeps retrying clients from synchronizing
+        return random.uniform(0, min(PROVIDER_BACKOFF_MAX_SECONDS, PROVIDER_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    async def post_json(self, path: str, payload: dict) -> dict:
+        with span(self.name):
+            self.waiting += 1
+            try:
+                await self.semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            try:
+                return await self._post_with_retries(path, payload)
+            finally:
+                self.in_flight -= 1
+                self.semaphore.release()
+
+    async def _post_with_retries(self, path: str, payload: dict) -> dict:
+        for attempt in range(self.max_retries + 1):
+            self.requests += 1
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.post(path, json=payload)
+            except httpx.TransportError as e:
+                if last_attempt:
+                    self.failures += 1
+                    raise ProviderError(self.name, detail=f"{type(e).__name__}: {e}") from e
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            if response.is_error:
+                self.failures += 1
+                raise ProviderError(self.name, response.status_code, response.text)
+            return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+def _openai_headers() -> dict:
+    if not OPENAI_API_KEY:
+        raise ProviderNotConfigured("openai", "Missing OPENAI_API_KEY in your environment (.env) file.")
+    return {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+
+
+def _anthropic_headers() -> dict:
+    # Checked on first use rather than at import so that deployments
+    # that never call Claude don't need a key.
+    if not ANTHROPIC_API_KEY:
+        raise ProviderNotConfigured("anthropic", "Missing ANTHROPIC_API_KEY in your environment (.env) file.")
+    return {
+        "x-api-key": ANTHROPIC_API_KEY,
+        "anthropic-version": "2023-06-01",
+    }
+
+
+PROVIDERS = {
+    "openai": (OPENAI_BASE_URL, _openai_headers),
+    "anthropic": (ANTHROPIC_BASE_URL, _anthropic_headers),
+}
+
+_clients = {}
+
+
+def get_provider(name: str) -> ProviderClient:
+    if name not in _clients:
+        base_url, headers = PROVIDERS[name]
+        _clients[name] = ProviderClient(name, base_url, headers())
+    return _clients[name]
+
+
+async def close_providers():
+    for client in _clients.values():
+        await client.aclose()
+
+
+def provider_stats() -> dict:
+    return {name: client.stats() for name, client in _clients.items()}
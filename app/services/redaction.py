@@ -0,0 +1,137 @@
+import csv
+import os
+import re
+import threading
+from collections import Counter, namedtuple
+
+from app.core.config import REDACTION_ROSTER_PATH
+
+# Every alternative starts at the beginning of a word; the shared (?<!\w)
+# guard lets the scan skip mid-word positions without trying any of them.
+EMAIL_PATTERN = r"\w[\w\.-]*@[\w\.-]+\.\w+"
+PHONE_PATTERN = r"\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b"
+# Any capitalized word or pair of words; only used when heuristic names are on
+NAME_PATTERN = r"[A-Z][a-z]+(?:\s[A-Z][a-z]+)?\b"
+# Names inside an email address are left for the email pattern
+NOT_IN_EMAIL = r"(?![\w.-]*@)"
+
+REPLACEMENTS = {
+    "email": "[redacted email]",
+    "phone": "[redacted phone]",
+    "roster": "the student",
+    "name": "the student",
+}
+
+Span = namedtuple("Span", "start end kind")
+
+
+class Redaction(namedtuple("Redaction", "text spans")):
+    """Redacted text plus the spans (in the original text) that were replaced."""
+
+    __slots__ = ()
+
+    def counts(self) -> dict:
+        return dict(Counter(span.kind for span in self.spans))
+
+
+def trie_pattern(words) -> str:
+    """
+    Regex for an exact match of any of `words`, laid out as a character trie
+    so shared prefixes are tested once and the scan stays linear in the
+    input, much like an Aho-Corasick automaton. Longer words win over their
+    prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node) -> str:
+        end = node.get("", False)
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if end else body
+
+    return build(trie)
+
+
+def load_roster(path: str = REDACTION_ROSTER_PATH) -> list:
+    """Full names plus their individual parts from a CSV with a student_name column."""
+    if not path or not os.path.exists(path):
+        return []
+    names = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            full = (row.get("student_name") or "").strip()
+            if full:
+                names.add(full)
+                names.update(part for part in full.split() if len(part) > 1)
+    return sorted(names)
+
+
+class Redactor:
+    """
+    Email, phone and roster-name redaction in a single regex pass.
+
+    Every pattern is compiled into one alternation of named groups, so each
+    text is scanned once regardless of how many patterns or roster names
+    there are. heuristic_names additionally replaces any capitalized
+    word(s), which is what scrub_pii has always done for short briefs, but
+    is too aggressive for transcripts.
+    """
+
+    def __init__(self, names=(), heuristic_names: bool = False):
+        alternatives = [f"(?P<email>{EMAIL_PATTERN})", f"(?P<phone>{PHONE_PATTERN})"]
+        if names:
+            alternatives.append(rf"(?P<roster>{trie_pattern(names)}\b{NOT_IN_EMAIL})")
+        if heuristic_names:
+            alternatives.append(f"(?P<name>{NAME_PATTERN}{NOT_IN_EMAIL})")
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + ")")
+
+    def redact(self, text: str) -> Redaction:
+        pieces, spans, last = [], [], 0
+        for match in self.pattern.finditer(text):
+            kind = match.lastgroup
+            start, end = match.span()
+            pieces.append(text[last:start])
+            pieces.append(REPLACEMENTS[kind])
+            spans.append(Span(start, end, kind))
+            last = end
+        if not spans:
+            return Redaction(text, [])
+        pieces.append(text[last:])
+        return Redaction("".join(pieces), spans)
+
+    def redact_batch(self, texts) -> list:
+        return [self.redact(text) for text in texts]
+
+
+_redactors = {}
+_lock = threading.Lock()
+
+
+def get_redactor(heuristic_names: bool = False) -> Redactor:
+    """Shared redactor over the configured roster, built on first use."""
+    with _lock:
+        if heuristic_names not in _redactors:
+            _redactors[heuristic_names] = Redactor(load_roster(), heuristic_names=heuristic_names)
+    return _redactors[heuristic_names]
+
+
+def redact(text: str, heuristic_names: bool = False) -> Redaction:
+    return get_redactor(heuristic_names).redact(text)
+
+
+def redact_batch(texts, heuristic_names: bool = False) -> list:
+    return get_redactor(heuristic_names).redact_batch(texts)
+
+
+def safety_flags(*redactions: Redaction) -> dict:
+    counts = Counter()
+    for redaction in redactions:
+        counts.update(span.kind for span in redaction.spans)
+    return {"pii_removed": bool(counts), "redactions": dict(counts)}
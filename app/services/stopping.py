@@ -0,0 +1,77 @@
+import re
+
+from app.core.constants import EDU_DISCLAIMER
+
+# A closing disclaimer: a line that opens like EDU_DISCLAIMER or with a
+# "Disclaimer:" label and, markdown aside, is no longer than EDU_DISCLAIMER.
+# Body text that merely mentions disclaimers or professional care doesn't match.
+_DISCLAIMER_LINE = re.compile(
+    r"^[*_\s]*(?:disclaimer\s*:|this (?:expanded )?(?:text|content|information) is for "
+    r"(?:illustrative and )?educational purposes only\b)",
+    re.IGNORECASE,
+)
+DISCLAIMER_MAX_CHARS = len(EDU_DISCLAIMER)
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+class ExpansionStop:
+    """
+    Stop condition for an /expand completion, called with the completion
+    ids so far (as often as every step). It fires once a closing disclaimer
+    line is complete, or once max_paragraphs paragraphs plus a closing line
+    are. Text is only decoded when a newly generated token holds a line
+    break, so the check is cheap per step. After firing, `reason` says why
+    and `length` is the completion length at that point.
+    """
+
+    def __init__(self, tokenizer, max_paragraphs: int):
+        self.tokenizer = tokenizer
+        self.max_paragraphs = max_paragraphs
+        self.reason = None
+        self.length = None
+        self._checked = 0
+
+    def __call__(self, completion_ids: list) -> bool:
+        if self.reason is not None:
+            return True
+        new_ids, self._checked = completion_ids[self._checked:], len(completion_ids)
+        if not new_ids or "\n" not in self.tokenizer.decode(new_ids):
+            return False
+
+        text = self.tokenizer.decode(completion_ids, skip_special_tokens=True)
+        # The last line/paragraph is still being written
+        lines = [line.strip() for line in text.split("\n")[:-1] if line.strip()]
+        paragraphs = [block for block in _PARAGRAPH_BREAK.split(text.lstrip())[:-1] if block.strip()]
+        last = lines[-1] if lines else ""
+        if len(lines) > 1 and len(last.strip("*_ ")) <= DISCLAIMER_MAX_CHARS and _DISCLAIMER_LINE.match(last):
+            self.reason = "disclaimer"
+        elif len(paragraphs) > self.max_paragraphs:
+            self.reason = "paragraphs"
+        else:
+            return False
+        self.length = len(completion_ids)
+        return True
+
+
+def stopping_criteria(stops: list, start: int, max_new_tokens: list = None):
+    """
+    transformers StoppingCriteria that finishes each row of a generate()
+    batch once stops[row] (a callable on that row's completion ids, or
+    None) returns True, or once the row has max_new_tokens[row] tokens.
+    Completions begin at column `start`.
+    """
+    import torch
+    from transformers import StoppingCriteria
+
+    limits = max_new_tokens or [None] * len(stops)
+
+    class _Stop(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            length = input_ids.shape[1] - start
+            done = [
+                (limit is not None and length >= limit) or (stop is not None and stop(row[start:].tolist()))
+                for row, stop, limit in zip(input_ids, stops, limits)
+            ]
+            return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    return _Stop()
@@ -0,0 +1,162 @@
+import numpy as np
+
+from app.models.whisper import use_whisper_model
+
+SAMPLE_RATE = 16000
+
+# Sliding window defaults for live transcription
+STREAM_STEP_SECONDS = 1.0       # decode after this much new audio
+STREAM_OVERLAP_SECONDS = 2.0    # trailing audio that is re-decoded before a segment is final
+STREAM_WINDOW_SECONDS = 20.0    # hard cap on the re-decoded window
+
+
+class PcmDecoder:
+    """Little-endian 16-bit PCM chunks -> mono 16 kHz float32."""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = 1):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._remainder = b""
+
+    def decode(self, chunk: bytes) -> np.ndarray:
+        data = self._remainder + chunk
+        frame_bytes = 2 * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        if self.sample_rate != SAMPLE_RATE and len(samples):
+            n_out = int(round(len(samples) * SAMPLE_RATE / self.sample_rate))
+            samples = np.interp(
+                np.linspace(0, len(samples) - 1, n_out), np.arange(len(samples)), samples
+            ).astype(np.float32)
+        return samples
+
+
+class OpusDecoder:
+    """Raw Opus packets (one per message) -> mono 16 kHz float32."""
+
+    def __init__(self, sample_rate: int = 48000, channels: int = 1):
+        import av
+
+        self._codec = av.CodecContext.create("opus", "r")
+        self._codec.sample_rate = sample_rate
+        self._codec.layout = "stereo" if channels == 2 else "mono"
+        self._resampler = av.AudioResampler(format="flt", layout="mono", rate=SAMPLE_RATE)
+        self._av = av
+
+    def decode(self, chunk: bytes) -> np.ndarray:
+        out = []
+        for frame in self._codec.decode(self._av.Packet(chunk)):
+            for resampled in self._resampler.resample(frame):
+                out.append(resampled.to_ndarray().reshape(-1))
+        return np.concatenate(out) if out else np.zeros(0, dtype=np.float32)
+
+
+DECODERS = {
+    "pcm_s16le": PcmDecoder,
+    "opus": OpusDecoder,
+}
+
+
+class StreamingTranscriber:
+    """
+    Incremental faster-whisper transcription over a sliding window.
+
+    Audio is appended as it arrives. Each decode re-transcribes the window
+    that has not been finalized yet; segments that end before the trailing
+    overlap are emitted as final and dropped from the window, the rest are
+    reported as partial and re-decoded with more context next time.
+
+    The model is only held while a window is decoded, so an idle stream
+    doesn't occupy one of its slots.
+    """
+
+    def __init__(self, model_size: str = "base", step_seconds: float = STREAM_STEP_SECONDS,
+                 overlap_seconds: float = STREAM_OVERLAP_SECONDS,
+                 window_seconds: float = STREAM_WINDOW_SECONDS):
+        self.model_size = model_size
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        self.overlap_seconds = overlap_seconds
+        self.window_seconds = window_seconds
+        self.language = None
+
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0.0   # stream time (s) of _buffer[0]
+        self._pending = 0          # samples appended since the last decode
+        self.final_segments = []
+
+    def feed(self, samples: np.ndarray):
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._pending += len(samples)
+
+    def ready(self) -> bool:
+        return self._pending >= self.step_samples
+
+    def process(self, flush: bool = False) -> dict:
+        """
+        Decode the current window. Returns newly finalized segments and the
+        current partial hypothesis. With flush=True everything is finalized.
+        """
+        self._pending = 0
+        if not len(self._buffer):
+            return {"final": [], "partial": []}
+
+        segments = self._decode()
+        buffer_seconds = len(self._buffer) / SAMPLE_RATE
+
+        if flush:
+            cutoff = float("inf")
+        elif buffer_seconds > self.window_seconds:
+            # Window is full: keep at most the newest segment open
+            cutoff = segments[-1]["start"] if len(segments) > 1 else float("inf")
+        else:
+            cutoff = buffer_seconds - self.overlap_seconds
+
+        final = [s for s in segments if s["end"] <= cutoff]
+        partial = [s for s in segments if s["end"] > cutoff]
+
+        if flush:
+            trim = buffer_seconds
+        elif final:
+            trim = final[-1]["end"]
+        elif buffer_seconds > self.window_seconds:
+            trim = buffer_seconds - self.overlap_seconds
+        else:
+            trim = 0.0
+
+        for s in final + partial:
+            s["start"] = round(self._buffer_start + s["start"], 2)
+            s["end"] = round(self._buffer_start + s["end"], 2)
+
+        if trim:
+            trim_samples = min(len(self._buffer), int(trim * SAMPLE_RATE))
+            self._buffer = self._buffer[trim_samples:]
+            self._buffer_start += trim_samples / SAMPLE_RATE
+
+        self.final_segments.extend(final)
+        return {"final": final, "partial": partial}
+
+    def _decode(self) -> list:
+        prompt = " ".join(s["text"] for s in self.final_segments[-3:]) or None
+        with use_whisper_model(self.model_size) as model:
+            segments, info = model.transcribe(
+                self._buffer,
+                language=self.language,
+                beam_size=1,
+                initial_prompt=prompt,
+                condition_on_previous_text=False,
+            )
+            segments = [
+                {"start": seg.start, "end": seg.end, "text": seg.text.strip()}
+                for seg in segments
+                if seg.text.strip()
+            ]
+        if self.language is None and len(self._buffer) >= 3 * SAMPLE_RATE:
+            self.language = info.language
+        return segments
+
+    @property
+    def transcript(self) -> str:
+        return " ".join(s["text"] for s in self.final_segments)
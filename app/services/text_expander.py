@@ -1,45 +1,56 @@
-import re
-import torch
+import threading
+import time
 from app.core.constants import (
     DEFAULT_TARGET_WORDS, DEFAULT_READING_LEVEL, DEFAULT_INCLUDE_CA_CONTEXT,
-    EDU_DISCLAIMER
+    EDU_DISCLAIMER, MODEL_ID, EXPAND_TEMPERATURE, EXPAND_TOP_P, EXPAND_REPETITION_PENALTY
 )
-from app.models.generator import get_model, get_tokenizer
+from app.core.config import (
+    EXPAND_PREFIX_INCLUDES_STYLE, EXPAND_TOKENS_PER_WORD, EXPAND_LENGTH_SLACK, EXPAND_MAX_NEW_TOKENS,
+    EXPAND_MAX_PARAGRAPHS, EXPAND_EARLY_STOP
+)
+from app.core.metrics import EXPAND_STOPS, GENERATED_TOKENS, TOKENS_PER_SECOND, span
+from app.models.backends import get_backend
+from app.models.generator import get_tokenizer
 from app.schemas.requests import ExpandIn
+from app.services import output_cache
+from app.services.redaction import redact, safety_flags
+from app.services.stopping import ExpansionStop
 
-NAME_RE = re.compile(r"\b([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)\b")
-PHONE_RE = re.compile(r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b")
-EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+# Room in the token budget for the model's own closing disclaimer line
+DISCLAIMER_TOKENS = 64
 
 def scrub_pii(text: str) -> str:
-    t = EMAIL_RE.sub("[redacted email]", text)
-    t = PHONE_RE.sub("[redacted phone]", t)
-    # Light-touch name scrub (won't alter acronyms/roles)
-    t = NAME_RE.sub(lambda m: "the student" if " " in m.group(0) or m.group(0)[0].isupper() else m.group(0), t)
-    return t
+    # Briefs are short, so capitalized words are treated as names too
+    return redact(text, heuristic_names=True).text
+
+SYSTEM_PROMPT = (
+    "You expand short notes into clear, educational text about mental health therapy "
+    "within K–12 schools in California, specifically interactions between mental health "
+    "professionals and students. Avoid diagnosis/treatment advice; do not solicit PHI. "
+    "Explain context (roles, confidentiality limits, mandated reporting basics, escalation/referral), "
+    "and tailor content to the specified audience and tone."
+)
+
+def build_system_prompt(p: ExpandIn) -> str:
+    if EXPAND_PREFIX_INCLUDES_STYLE:
+        return f"{SYSTEM_PROMPT}\nAudience: {p.audience}\nTone: {p.tone}"
+    return SYSTEM_PROMPT
 
 def build_messages(p: ExpandIn):
-    # Ignore request fields for target/reading/CA flags; use constants instead
-    target_words = DEFAULT_TARGET_WORDS
-    reading_level = DEFAULT_READING_LEVEL
-    include_ca = DEFAULT_INCLUDE_CA_CONTEXT
-
-    system = (
-        "You expand short notes into clear, educational text about mental health therapy "
-        "within K–12 schools in California, specifically interactions between mental health "
-        "professionals and students. Avoid diagnosis/treatment advice; do not solicit PHI. "
-        "Explain context (roles, confidentiality limits, mandated reporting basics, escalation/referral), "
-        "and tailor content to the specified audience and tone."
-    )
+    target_words = _target_words(p)
+    reading_level = p.reading_level or DEFAULT_READING_LEVEL
+    include_ca = DEFAULT_INCLUDE_CA_CONTEXT if p.include_california_context is None else p.include_california_context
+
+    system = build_system_prompt(p)
+    style = "" if EXPAND_PREFIX_INCLUDES_STYLE else f"Audience: {p.audience}\nTone: {p.tone}\n"
 
     user = (
         f"Brief: {scrub_pii(p.brief)}\n"
-        f"Audience: {p.audience}\n"
-        f"Tone: {p.tone}\n"
+        f"{style}"
         f"Reading level: {reading_level}\n"
         f"Target length: ~{target_words} words\n"
         f"California context required: {include_ca}\n"
-        "Output: A cohesive explanation (2–4 paragraphs) that is educational and de-identified. "
+        f"Output: A cohesive explanation (2–{EXPAND_MAX_PARAGRAPHS} paragraphs) that is educational and de-identified. "
         "Close with a one-line disclaimer."
     )
 
@@ -49,42 +60,172 @@ def build_messages(p: ExpandIn):
         {"role": "assistant", "content": "Understood. Here is the expanded educational text:"}
     ]
 
-def generate_expansion(p: ExpandIn):
-    model = get_model()
+def _prompt_ids(p: ExpandIn):
+    """
+    Tokenized prompt plus the length of its constant prefix (system turn
+    rendered by the chat template), or 0 if the prefix doesn't tokenize to
+    an exact prefix of the full prompt.
+    """
     tokenizer = get_tokenizer()
-
     messages = build_messages(p)
     prompt = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-    inputs = tokenizer(prompt, return_tensors="pt")
-    device = next(model.parameters()).device
-    inputs = {k: v.to(device) for k, v in inputs.items()}
-
-    with torch.no_grad():
-        out = model.generate(
-            **inputs,
-            max_new_tokens=min(1024, int(DEFAULT_TARGET_WORDS * 4)),  # generous buffer
-            temperature=0.8,
-            top_p=0.95,
-            repetition_penalty=1.05
-        )
+    input_ids = tokenizer(prompt)["input_ids"]
 
-    full = tokenizer.decode(out[0], skip_special_tokens=True)
-    expanded = full.split("Understood. Here is the expanded educational text:")[-1].strip()
+    prefix = tokenizer.apply_chat_template(messages[:1], tokenize=False, add_generation_prompt=False)
+    prefix_ids = tokenizer(prefix)["input_ids"]
+    prefix_len = len(prefix_ids) if input_ids[:len(prefix_ids)] == prefix_ids else 0
+    return input_ids, prefix_len
 
-    # Enforce disclaimer
-    if EDU_DISCLAIMER not in expanded:
-        expanded = f"{expanded}\n\n*{EDU_DISCLAIMER}*"
+def _target_words(p: ExpandIn) -> int:
+    return p.target_words or DEFAULT_TARGET_WORDS
+
+def _max_new_tokens(p: ExpandIn) -> int:
+    budget = _target_words(p) * EXPAND_TOKENS_PER_WORD * EXPAND_LENGTH_SLACK + DISCLAIMER_TOKENS
+    return min(EXPAND_MAX_NEW_TOKENS, int(budget))
+
+def _expansion_stop():
+    return ExpansionStop(get_tokenizer(), EXPAND_MAX_PARAGRAPHS) if EXPAND_EARLY_STOP else None
+
+def _stop_reason(stop, completion_tokens: int, budget: int) -> str:
+    if stop is not None and stop.reason:
+        return stop.reason
+    return "length" if completion_tokens >= budget else "eos"
+
+def _output_key(p: ExpandIn) -> str:
+    # The rendered messages carry every request field the model sees
+    return output_cache.output_cache_key(
+        get_backend().name, MODEL_ID,
+        {
+            "temperature": EXPAND_TEMPERATURE,
+            "top_p": EXPAND_TOP_P,
+            "repetition_penalty": EXPAND_REPETITION_PENALTY,
+            "max_new_tokens": _max_new_tokens(p),
+            "max_paragraphs": EXPAND_MAX_PARAGRAPHS if EXPAND_EARLY_STOP else None,
+        },
+        messages=build_messages(p),
+    )
+
+def _record_generation(backend: str, n_tokens: int, seconds: float):
+    GENERATED_TOKENS.inc(n_tokens, backend=backend)
+    if seconds > 0 and n_tokens:
+        TOKENS_PER_SECOND.observe(n_tokens / seconds, backend=backend)
 
-    # Basic safety checks (no PHI; purely educational)
-    safety = {
-        "pii_removed": True,
+def _safety(p: ExpandIn, disclaimer_added: bool) -> dict:
+    # What was actually done: PII replaced in the brief, disclaimer appended
+    return {
+        **safety_flags(redact(p.brief, heuristic_names=True)),
         "educational_only": True,
-        "disclaimer_added": True
+        "disclaimer_added": disclaimer_added
     }
 
+def _cached_safety(p: ExpandIn, cached: dict) -> dict:
+    # Entries stored before safety flags were cached don't carry them
+    if "safety" in cached:
+        return cached["safety"]
+    return _safety(p, disclaimer_added=cached["text"].endswith(f"*{EDU_DISCLAIMER}*"))
+
+def generate_expansion(p: ExpandIn, use_cache: bool = True):
+    key = _output_key(p)
+    with span("output_cache"):
+        cached = output_cache.lookup(key, use_cache)
+    if cached is not None:
+        return cached["text"], cached["tokens"], _cached_safety(p, cached)
+
+    tokenizer = get_tokenizer()
+    with span("tokenize"):
+        input_ids, prefix_len = _prompt_ids(p)
+
+    backend = get_backend()
+    budget = _max_new_tokens(p)
+    stop = _expansion_stop()
+    started = time.perf_counter()
+    with span("generate"):
+        completion_ids = backend.generate(
+            input_ids,
+            max_new_tokens=budget,
+            prefix_len=prefix_len,
+            stop=stop,
+        )
+    _record_generation(backend.name, len(completion_ids), time.perf_counter() - started)
+    with span("detokenize"):
+        expanded = tokenizer.decode(completion_ids, skip_special_tokens=True).strip()
+
+    # Enforce disclaimer
+    disclaimer_added = EDU_DISCLAIMER not in expanded
+    if disclaimer_added:
+        expanded = f"{expanded}\n\n*{EDU_DISCLAIMER}*"
+
+    safety = _safety(p, disclaimer_added)
+
     tokens = {
-        "prompt": int(inputs["input_ids"].numel()),
-        "completion": int(out[0].numel() - inputs["input_ids"].numel())
+        "prompt": len(input_ids),
+        "completion": len(completion_ids),
+        "budget": budget,
+        "stop_reason": _stop_reason(stop, len(completion_ids), budget)
     }
+    EXPAND_STOPS.inc(reason=tokens["stop_reason"])
+
+    output_cache.store(key, {"text": expanded, "tokens": tokens, "safety": safety})
+    return expanded, tokens, safety
+
+def stream_expansion(p: ExpandIn, cancelled: threading.Event, use_cache: bool = True):
+    """
+    Yield (event, data) pairs: ("token", text) as text is produced, then
+    ("disclaimer", text) if the model didn't include it, then ("usage",
+    {"tokens", "safety"}). Setting `cancelled` stops generation at the next token.
+    A cached expansion is replayed as a single token event.
+    """
+    key = _output_key(p)
+    cached = output_cache.lookup(key, use_cache)
+    if cached is not None:
+        yield "token", cached["text"]
+        yield "usage", {"tokens": cached["tokens"], "safety": _cached_safety(p, cached)}
+        return
+
+    with span("tokenize"):
+        input_ids, prefix_len = _prompt_ids(p)
+
+    backend = get_backend()
+    budget = _max_new_tokens(p)
+    stop = _expansion_stop()
+    started = time.perf_counter()
+    pieces = backend.stream(
+        input_ids,
+        max_new_tokens=budget,
+        prefix_len=prefix_len,
+        cancelled=cancelled,
+        stop=stop,
+    )
+    text = []
+    try:
+        while True:
+            try:
+                piece = next(pieces)
+            except StopIteration as done:
+                completion_tokens = done.value
+                break
+            text.append(piece)
+            yield "token", piece
+
+        _record_generation(backend.name, completion_tokens, time.perf_counter() - started)
+        expanded = "".join(text)
+        disclaimer_added = EDU_DISCLAIMER not in expanded
+        if disclaimer_added:
+            disclaimer = f"\n\n*{EDU_DISCLAIMER}*"
+            expanded += disclaimer
+            yield "disclaimer", disclaimer
 
-    return expanded, tokens
+        tokens = {
+            "prompt": len(input_ids),
+            "completion": completion_tokens,
+            "budget": budget,
+            "stop_reason": "cancelled" if cancelled.is_set() else _stop_reason(stop, completion_tokens, budget)
+        }
+        EXPAND_STOPS.inc(reason=tokens["stop_reason"])
+        safety = _safety(p, disclaimer_added)
+        if not cancelled.is_set():
+            output_cache.store(key, {"text": expanded.strip(), "tokens": tokens, "safety": safety})
+        yield "usage", {"tokens": tokens, "safety": safety}
+    finally:
+        cancelled.set()
+        pieces.close()
@@ -1,15 +1,16 @@
-def transcribe_audio(model, audio_path: str) -> str:
+def transcribe_audio(model, audio, **options) -> str:
     """
     Transcribes the given audio file using either OpenAI or Faster-Whisper.
 
     Args:
         model: Whisper model instance.
-        audio_path (str): Path to the .wav audio file.
+        audio: Path to an audio file, or mono 16 kHz float32 samples.
+        **options: Decode parameters forwarded to model.transcribe.
 
     Returns:
         str: Transcribed text.
     """
-    result = model.transcribe(audio_path)
+    result = model.transcribe(audio, **options)
 
     # OpenAI Whisper returns a dict
     if isinstance(result, dict) and "text" in result:
@@ -21,3 +22,46 @@ def transcribe_audio(model, audio_path: str) -> str:
         return " ".join([segment.text for segment in segments])
 
     raise ValueError("Unexpected transcription result format.")
+
+
+def iter_segments(model, audio, **options):
+    """
+    Yield (start, end, text) for each segment as the model produces it.
+    faster-whisper decodes lazily, so segments arrive while later audio is
+    still being transcribed; consume them while holding the model.
+    """
+    result = model.transcribe(audio, **options)
+
+    if isinstance(result, dict) and "segments" in result:
+        for s in result["segments"]:
+            yield s["start"], s["end"], s["text"]
+    elif isinstance(result, tuple):
+        segments, _ = result
+        for s in segments:
+            yield s.start, s.end, s.text
+    else:
+        raise ValueError("Unexpected transcription result format.")
+
+
+def transcribe_segments(model, audio, **options):
+    """
+    Transcribe and return ([{"start", "end", "text"}, ...], language), with
+    times in seconds from the start of `audio`. Empty segments are dropped.
+    """
+    result = model.transcribe(audio, **options)
+
+    if isinstance(result, dict) and "segments" in result:
+        segments, language = result["segments"], result.get("language")
+        segments = [(s["start"], s["end"], s["text"]) for s in segments]
+    elif isinstance(result, tuple):
+        segments, info = result
+        language = info.language
+        segments = [(s.start, s.end, s.text) for s in segments]
+    else:
+        raise ValueError("Unexpected transcription result format.")
+
+    return [
+        {"start": start, "end": end, "text": text.strip()}
+        for start, end, text in segments
+        if text.strip()
+    ], language
@@ -0,0 +1,381 @@
+"""
+Resumable uploads for recorded sessions.
+
+An upload is a directory under UPLOAD_SESSION_DIR holding meta.json and the
+bytes received so far. Byte ranges must arrive in order, but a range may
+overlap what is already stored, so retrying a chunk is harmless; a client
+that lost its connection reads the received count and carries on from
+there. All state is on disk, so any worker on the node can take a chunk.
+
+The process receiving the chunks also hashes them as they are written and,
+with UPLOAD_DECODE_AHEAD, decodes them on a background thread while the
+rest is still arriving, so finalizing only has to transcribe. Bytes that
+landed in another worker are caught up from the file. That state is freed
+when the upload is finalized or deleted; a reaper thread also frees it in
+any other worker once the upload is gone from disk or idle for the TTL.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from app.core.config import UPLOAD_DECODE_AHEAD, UPLOAD_MAX_BYTES, UPLOAD_SESSION_DIR, UPLOAD_TTL_SECONDS
+from app.utils.audio import HASH_CHUNK_SIZE, decode_audio
+
+# The decode-ahead thread re-checks the file this often while starved, and
+# gives up (finalize then decodes from the file) after this long without data
+DECODE_POLL_SECONDS = 0.25
+DECODE_IDLE_SECONDS = 300
+
+# How often each process looks for live state of uploads that have gone
+LIVE_SWEEP_SECONDS = 60
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_SUFFIX = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+
+
+class UploadError(Exception):
+    def __init__(self, status_code: int, detail: str, received: int = None):
+        self.status_code = status_code
+        self.detail = detail
+        self.received = received
+        super().__init__(detail)
+
+
+class _Abandoned(Exception):
+    pass
+
+
+class _LiveUpload:
+    """In-process state of an upload: running hash and decode-ahead thread."""
+
+    def __init__(self):
+        self.hasher = hashlib.sha256()
+        self.hashed = 0
+        self.lock = threading.Lock()
+        self.changed = threading.Condition()
+        self.cancelled = threading.Event()
+        self.decoded = threading.Event()
+        self.decoder = None
+        self.samples = None
+        self.touched = time.monotonic()
+
+    def appended(self, offset: int, chunk: bytes):
+        self.touched = time.monotonic()
+        with self.lock:
+            if offset == self.hashed:
+                self.hasher.update(chunk)
+                self.hashed += len(chunk)
+        with self.changed:
+            self.changed.notify_all()
+
+    def catch_up(self, path: str):
+        """Hash whatever is in the file beyond what this process has seen."""
+        with self.lock, open(path, "rb") as f:
+            f.seek(self.hashed)
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                self.hasher.update(chunk)
+                self.hashed += len(chunk)
+
+    def cancel(self):
+        self.cancelled.set()
+        with self.changed:
+            self.changed.notify_all()
+
+    def decode(self, path: str, size: int):
+        reader = _GrowingFile(path, size, self)
+        try:
+            self.samples = decode_audio(reader)
+        except Exception:
+            self.samples = None
+        finally:
+            reader.close()
+            self.decoded.set()
+
+
+class _GrowingFile:
+    """
+    Read-only file object over an upload that is still being written.
+    Reads block until the requested bytes exist, so PyAV can demux the
+    file as it grows; seeking past the received bytes is allowed and the
+    next read waits for them.
+    """
+
+    def __init__(self, path: str, size: int, live: _LiveUpload):
+        self._file = open(path, "rb")
+        self._size = size
+        self._live = live
+        self._pos = 0
+
+    def _wait_for(self, end: int) -> int:
+        last_size, last_growth = -1, time.monotonic()
+        while True:
+            available = os.fstat(self._file.fileno()).st_size
+            if available >= end:
+                return available
+            if available != last_size:
+                last_size, last_growth = available, time.monotonic()
+            if self._live.cancelled.is_set() or time.monotonic() - last_growth > DECODE_IDLE_SECONDS:
+                raise _Abandoned()
+            with self._live.changed:
+                self._live.changed.wait(DECODE_POLL_SECONDS)
+
+    def read(self, n: int = -1) -> bytes:
+        end = self._size if n is None or n < 0 else min(self._size, self._pos + n)
+        if end <= self._pos:
+            return b""
+        available = self._wait_for(self._pos + 1)
+        self._file.seek(self._pos)
+        data = self._file.read(min(end, available) - self._pos)
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seekable(self) -> bool:
+        return True
+
+    def close(self):
+        self._file.close()
+
+
+class RangeWriter:
+    """Appends one request's byte range, dropping any part already stored."""
+
+    def __init__(self, file, live: _LiveUpload, offset: int, skip: int, remaining: int):
+        self.file = file
+        self.live = live
+        self.offset = offset
+        self.skip = skip
+        self.remaining = remaining
+
+    def write(self, chunk: bytes):
+        if self.skip:
+            dropped = min(self.skip, len(chunk))
+            chunk = chunk[dropped:]
+            self.skip -= dropped
+        if not chunk:
+            return
+        if len(chunk) > self.remaining:
+            raise UploadError(400, "Request body is longer than its Content-Range", received=self.offset)
+        self.file.write(chunk)
+        self.file.flush()
+        self.live.appended(self.offset, chunk)
+        self.offset += len(chunk)
+        self.remaining -= len(chunk)
+
+    def close(self):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+class UploadStore:
+    def __init__(self, root: str = UPLOAD_SESSION_DIR, max_bytes: int = UPLOAD_MAX_BYTES,
+                 ttl_seconds: float = UPLOAD_TTL_SECONDS, decode_ahead: bool = UPLOAD_DECODE_AHEAD):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.decode_ahead = decode_ahead
+        self._live = {}
+        self._lock = threading.Lock()
+        self._reaper = None
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, upload_id: str) -> str:
+        if not _UPLOAD_ID.match(upload_id):
+            raise UploadError(404, "Upload not found")
+        return os.path.join(self.root, upload_id)
+
+    def _meta(self, upload_id: str) -> dict:
+        try:
+            with open(os.path.join(self._dir(upload_id), "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError(404, "Upload not found")
+
+    def _data_path(self, meta: dict) -> str:
+        return os.path.join(self._dir(meta["upload_id"]), "data" + meta["suffix"])
+
+    def _live_upload(self, meta: dict) -> _LiveUpload:
+        with self._lock:
+            live = self._live.get(meta["upload_id"])
+            if live is None:
+                live = self._live[meta["upload_id"]] = _LiveUpload()
+                if self.decode_ahead:
+                    live.decoder = threading.Thread(
+                        target=live.decode, args=(self._data_path(meta), meta["size"]),
+                        name=f"upload-decode-{meta['upload_id'][:8]}", daemon=True,
+                    )
+                    live.decoder.start()
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="upload-reaper", daemon=True)
+                self._reaper.start()
+            live.touched = time.monotonic()
+        return live
+
+    def _reap(self):
+        while True:
+            time.sleep(LIVE_SWEEP_SECONDS)
+            self.sweep_live()
+            with self._lock:
+                if not self._live:
+                    self._reaper = None
+                    return
+
+    def create(self, filename: str, size: int) -> dict:
+        if size <= 0:
+            raise UploadError(400, "Upload size must be positive")
+        if size > self.max_bytes:
+            raise UploadError(413, f"Uploads are limited to {self.max_bytes} bytes")
+        self.prune()
+
+        suffix = os.path.splitext(filename or "")[-1]
+        meta = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": filename,
+            "suffix": suffix if _SUFFIX.match(suffix) else "",
+            "size": size,
+            "created_at": time.time(),
+        }
+        directory = self._dir(meta["upload_id"])
+        os.makedirs(directory)
+        open(self._data_path(meta), "wb").close()
+        with open(os.path.join(directory, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(directory, "meta.json.tmp"), os.path.join(directory, "meta.json"))
+        return self.status(meta["upload_id"])
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._meta(upload_id)
+        stat = os.stat(self._data_path(meta))
+        return {
+            "upload_id": upload_id,
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "received": stat.st_size,
+            "complete": stat.st_size == meta["size"],
+            "created_at": meta["created_at"],
+            "expires_at": stat.st_mtime + self.ttl_seconds,
+        }
+
+    def open_range(self, upload_id: str, start: int, end: int, total: int = None) -> RangeWriter:
+        """
+        Lock the upload for writing bytes start..end (inclusive). The range
+        may begin before the bytes already received (the overlap is
+        skipped) but not after them.
+        """
+        meta = self._meta(upload_id)
+        if total is not None and total != meta["size"]:
+            raise UploadError(400, f"Content-Range total must be the upload size ({meta['size']})")
+        if start > end or end >= meta["size"]:
+            raise UploadError(416, "Content-Range is outside the upload")
+
+        path = self._data_path(meta)
+        f = open(path, "r+b")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            raise UploadError(409, "Another request is writing to this upload")
+        received = os.fstat(f.fileno()).st_size
+        if start > received:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+            raise UploadError(409, f"Next range must start at byte {received}", received=received)
+
+        live = self._live_upload(meta)
+        if live.hashed != received:
+            live.catch_up(path)
+        f.seek(received)
+        return RangeWriter(f, live, received, skip=received - start, remaining=max(0, end + 1 - received))
+
+    def finalize(self, upload_id: str) -> dict:
+        """
+        The path, suffix and SHA-256 of a complete upload, plus `decoded`:
+        a callable returning the decode-ahead samples, or None if this
+        process has none and the file has to be decoded.
+        """
+        status = self.status(upload_id)
+        if not status["complete"]:
+            raise UploadError(409, "Upload is incomplete", received=status["received"])
+        meta = self._meta(upload_id)
+        path = self._data_path(meta)
+        live = self._live_upload(meta)
+        live.catch_up(path)
+        with live.lock:
+            audio_hash = live.hasher.copy().hexdigest()
+
+        def decoded():
+            if live.decoder is None:
+                return None
+            live.decoded.wait()
+            return live.samples
+
+        return {"path": path, "suffix": meta["suffix"], "audio_hash": audio_hash, "decoded": decoded}
+
+    def release(self, upload_id: str):
+        """Free this process's hash and decoded samples, keeping the bytes so finalize can be retried."""
+        with self._lock:
+            live = self._live.pop(upload_id, None)
+        if live is not None:
+            live.cancel()
+
+    def sweep_live(self):
+        """Release live state of uploads that are gone from disk or have been idle here for the TTL."""
+        idle_cutoff = time.monotonic() - self.ttl_seconds
+        with self._lock:
+            stale = [
+                self._live.pop(upload_id) for upload_id, live in list(self._live.items())
+                if live.touched < idle_cutoff or not os.path.isdir(os.path.join(self.root, upload_id))
+            ]
+        for live in stale:
+            live.cancel()
+
+    def delete(self, upload_id: str):
+        directory = self._dir(upload_id)
+        self.release(upload_id)
+        if not os.path.isdir(directory):
+            raise UploadError(404, "Upload not found")
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def prune(self):
+        """Delete uploads that have received nothing for UPLOAD_TTL_SECONDS."""
+        cutoff = time.time() - self.ttl_seconds
+        for upload_id in os.listdir(self.root):
+            if not _UPLOAD_ID.match(upload_id):
+                continue
+            directory = os.path.join(self.root, upload_id)
+            try:
+                newest = max(os.stat(os.path.join(directory, name)).st_mtime for name in os.listdir(directory))
+            except (FileNotFoundError, ValueError):
+                continue
+            if newest < cutoff:
+                try:
+                    self.delete(upload_id)
+                except UploadError:
+                    pass
+        self.sweep_live()
+
+
+_store = None
+
+
+def get_upload_store() -> UploadStore:
+    global _store
+    if _store is None:
+        _store = UploadStore()
+    return _store
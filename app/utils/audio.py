@@ -1,11 +1,11 @@
 import hashlib
 import os
-from pydub import AudioSegment
+import shutil
+import tempfile
+import numpy as np
 
-def convert_to_wav(input_path, output_path):
-    """Convert any audio/video file to .wav format using pydub (FFmpeg)"""
-    audio = AudioSegment.from_file(input_path)
-    audio.export(output_path, format="wav")
+SAMPLE_RATE = 16000
+HASH_CHUNK_SIZE = 1024 * 1024
 
 def get_file_hash(file_path):
     """Return SHA256 hash of the given file (used for caching)"""
@@ -15,6 +15,66 @@ def get_file_hash(file_path):
             hasher.update(chunk)
     return hasher.hexdigest()
 
+def hash_fileobj(fileobj):
+    """Return SHA256 of a seekable file object from its start, then rewind it"""
+    hasher = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+    fileobj.seek(0)
+    return hasher.hexdigest()
+
+def copy_and_hash(src, dst):
+    """Copy src into dst file object, hashing bytes as they pass through"""
+    hasher = hashlib.sha256()
+    while chunk := src.read(HASH_CHUNK_SIZE):
+        hasher.update(chunk)
+        dst.write(chunk)
+    return hasher.hexdigest()
+
+def decode_audio(source, sample_rate=SAMPLE_RATE):
+    """
+    Decode a path or file object once with PyAV into mono float32 samples
+    at sample_rate, without writing any intermediate files.
+    """
+    import av
+
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+    chunks = []
+    with av.open(source, mode="r", metadata_errors="ignore") as container:
+        for frame in container.decode(audio=0):
+            frame.pts = None
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
+
+def load_audio(source, suffix=""):
+    """
+    Decode an upload to a 16 kHz float32 array. File objects are decoded
+    in memory; if the container can't be demuxed from a stream (e.g. it
+    needs the file extension to probe), fall back to a temp file.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return decode_audio(source)
+
+    import av
+
+    try:
+        source.seek(0)
+        return decode_audio(source)
+    except (av.FFmpegError, ValueError):
+        source.seek(0)
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            shutil.copyfileobj(source, tmp, HASH_CHUNK_SIZE)
+        try:
+            return decode_audio(tmp.name)
+        finally:
+            cleanup_files([tmp.name])
+
 def cleanup_files(paths):
     """Remove temporary files"""
     for path in paths:
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from app.core.metrics import Counter
+
+_MISSING = object()
+
+_registry = {}
+
+
+def make_cache_key(*parts) -> str:
+    """Stable SHA-256 key over any JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU with optional TTL.
+    """
+
+    def __init__(self, max_items: int = 256, ttl_seconds: float = None):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, stored_at = entry
+            if self.ttl_seconds and time.time() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._data),
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SQLiteStore:
+    """
+    On-disk JSON value store shared by every process on the node.
+    Several namespaces can live in one database file.
+    """
+
+    def __init__(self, path: str, namespace: str, max_items: int = 10000, ttl_seconds: float = None):
+        self.path = path
+        self.namespace = namespace
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self.expirations += 1
+                self.misses += 1
+                return default
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now),
+            )
+            count = conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+            overflow = count - self.max_items
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                    (self.namespace, self.namespace, overflow),
+                )
+                self.evictions += overflow
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            items = conn.execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        return {
+            "items": items,
+            "max_items": self.max_items,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TieredCache:
+    """
+    Memory LRU in front of an optional shared disk store. Disk hits are
+    promoted into memory. Values must be JSON-serializable.
+    """
+
+    def __init__(self, name: str, memory: LRUCache, disk: SQLiteStore = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        _registry[name] = self
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key, _MISSING)
+            if value is not _MISSING:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        lookups = memory["hits"] + memory["misses"]
+        disk_hits = self.disk.hits if self.disk is not None else 0
+        return {
+            "hit_rate": round((memory["hits"] + disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory": memory,
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def cache_stats() -> dict:
+    """Stats for every TieredCache created in this process."""
+    return {name: cache.stats() for name, cache in _registry.items()}
+
+
+def _collect_lookups() -> dict:
+    samples = {}
+    for name, cache in list(_registry.items()):
+        for tier, store in (("memory", cache.memory), ("disk", cache.disk)):
+            if store is not None:
+                samples[(name, tier, "hit")] = store.hits
+                samples[(name, tier, "miss")] = store.misses
+    return samples
+
+
+CACHE_LOOKUPS = Counter(
+    "tad_cache_lookups", "Cache lookups by tier and outcome.", ["cache", "tier", "result"],
+    collect=_collect_lookups,
+)
@@ -0,0 +1,114 @@
+"""
+Compare /expand generation backends: tokens/sec and peak RSS.
+
+Each backend runs in a fresh subprocess so peak RSS reflects only that
+backend's weights and runtime. "transformers+assisted" is the transformers
+backend with assisted decoding on; its row adds the draft acceptance rate
+and the speedup over the plain transformers row.
+
+    python -m benchmarks.bench_backends --backends transformers ctranslate2 --requests 5
+    python -m benchmarks.bench_backends --backends transformers transformers+assisted
+    python -m benchmarks.bench_backends --convert   # one-time CTranslate2 conversion only
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BRIEFS = [
+    "Student reports frequent arguments at home.",
+    "Student feels overwhelmed by assignments and exams.",
+    "Student experiences worry and physical tension before class.",
+    "Student reports being teased and excluded by peers.",
+]
+
+
+def run_child(backend_name: str, requests: int, max_new_tokens: int) -> dict:
+    from app.models.backends import get_backend
+    from app.schemas.requests import ExpandIn
+    from app.services.text_expander import _prompt_ids
+
+    started = time.perf_counter()
+    backend = get_backend(backend_name)
+    prompts = [
+        _prompt_ids(ExpandIn(brief=BRIEFS[i % len(BRIEFS)], audience="parent", tone="supportive"))
+        for i in range(requests)
+    ]
+    backend.generate(prompts[0][0], 1, prompts[0][1])  # load (and for CT2, convert) the weights
+    load_seconds = time.perf_counter() - started
+
+    tokens = 0
+    first_token_latencies = []
+    started = time.perf_counter()
+    for input_ids, prefix_len in prompts:
+        t0 = time.perf_counter()
+        backend.generate(input_ids, 1, prefix_len)
+        first_token_latencies.append(time.perf_counter() - t0)
+        tokens += len(backend.generate(input_ids, max_new_tokens, prefix_len))
+    elapsed = time.perf_counter() - started - sum(first_token_latencies)
+
+    assisted = backend.stats().get("assisted")
+    return {
+        "backend": backend_name,
+        "requests": requests,
+        "completion_tokens": tokens,
+        "tokens_per_second": round(tokens / elapsed, 2) if elapsed else 0.0,
+        "avg_time_to_first_token_s": round(sum(first_token_latencies) / len(first_token_latencies), 3),
+        "load_seconds": round(load_seconds, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "acceptance_rate": assisted["acceptance_rate"] if assisted else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["transformers", "ctranslate2"])
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--max-new-tokens", type=int, default=128)
+    parser.add_argument("--convert", action="store_true", help="only run the CTranslate2 conversion")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.convert:
+        from app.models.backends import convert_ctranslate2_model
+        print(convert_ctranslate2_model())
+        return
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.requests, args.max_new_tokens)))
+        return
+
+    results = []
+    for name in args.backends:
+        backend_name, _, mode = name.partition("+")
+        env = dict(os.environ, EXPAND_BATCHING="false", EXPAND_ASSISTED_DECODING=str(mode == "assisted").lower())
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--child", backend_name,
+             "--requests", str(args.requests), "--max-new-tokens", str(args.max_new_tokens)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        result["backend"] = name
+        results.append(result)
+
+    plain = {r["backend"]: r["tokens_per_second"] for r in results}
+    for r in results:
+        base = plain.get(r["backend"].partition("+")[0])
+        r["speedup"] = round(r["tokens_per_second"] / base, 2) if "+" in r["backend"] and base else None
+
+    print(f"{'backend':<24}{'tok/s':>10}{'ttft s':>10}{'load s':>10}{'peak RSS MB':>14}{'accept':>8}{'speedup':>9}")
+    for r in results:
+        print(f"{r['backend']:<24}{r['tokens_per_second']:>10}{r['avg_time_to_first_token_s']:>10}"
+              f"{r['load_seconds']:>10}{r['peak_rss_mb']:>14}{r['acceptance_rate'] or '-':>8}{r['speedup'] or '-':>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+End-to-end latency/throughput benchmark for the /v1 endpoints.
+
+Boots app.main:app in-process (lifespan included) with fake Whisper/BART
+models and a tiny random Llama swapped into the model registry, and points
+the OpenAI/Anthropic clients at a local stub server with injectable
+latency. Synthetic audio of each requested length is generated up front
+(distinct per request, so the transcript cache never hits), then each
+scenario is driven with concurrent requests.
+
+Per scenario it reports p50/p95/p99 latency, throughput, error count and
+peak RSS, plus p50/p95/p99 for the pipeline stages hit along the way
+(decode, transcribe, summarize, tokenize, generate, provider). Results are
+written as JSON; pass --baseline to diff against an earlier run.
+
+    python -m benchmarks.bench_endpoints --requests 16 --concurrency 4 --output run.json
+    python -m benchmarks.bench_endpoints --scenarios expand summarize-text --baseline run.json
+    python -m benchmarks.bench_endpoints --real-models --recorded-seconds 60
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks import fakes
+from benchmarks.stub_providers import create_app, free_port, serve_in_thread
+
+SCENARIOS = ["transcribe-live", "transcribe-recorded", "summarize-text", "expand"]
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {
+        "count": len(samples),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "mean_ms": round(1000 * float(np.mean(samples)), 2),
+    }
+
+
+class StageTimer:
+    """Wraps pipeline functions in place and records their wall time per stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self.samples = defaultdict(list)
+
+    def _record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, owner, attr: str, stage: str):
+        func = getattr(owner, attr)
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._record(stage, time.perf_counter() - start)
+        else:
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._record(stage, time.perf_counter() - start)
+        setattr(owner, attr, timed)
+
+    def install(self):
+        from app.models.backends import get_backend
+        from app.services import pipeline, providers, text_expander
+
+        self.wrap(pipeline, "load_audio", "decode")
+        self.wrap(pipeline, "transcribe_audio", "transcribe")
+        self.wrap(pipeline, "summarize_text", "summarize")
+        self.wrap(text_expander, "_prompt_ids", "tokenize")
+        self.wrap(get_backend(), "generate", "generate")
+        self.wrap(providers.ProviderClient, "post_json", "provider")
+
+    def report(self) -> dict:
+        with self._lock:
+            return {stage: percentiles(samples) for stage, samples in sorted(self.samples.items())}
+
+
+class RSSSampler:
+    """Samples this process's resident set size on a thread; keeps the peak."""
+
+    def __init__(self, interval: float = 0.05):
+        import psutil
+
+        self.process = psutil.Process()
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.process.memory_info().rss)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 2 ** 20, 1)
+
+
+def _note_fields() -> dict:
+    from app.core.constants import NOTE_TYPE_MAP
+
+    user_type = next(iter(NOTE_TYPE_MAP))
+    return {
+        "user_type": user_type,
+        "note_type": next(iter(NOTE_TYPE_MAP[user_type])),
+        "prompt": "Summarize the session into a structured note.",
+    }
+
+
+def _long_text(words: int, seed: int) -> str:
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(fakes.WORDS), size=words)
+    sentences = [" ".join(fakes.WORDS[i] for i in picks[j:j + 12]) + "." for j in range(0, words, 12)]
+    return " ".join(sentences)
+
+
+def build_requests(args) -> dict:
+    """(name -> list of httpx request kwargs); one extra request per scenario is used for warmup."""
+    fields = _note_fields()
+    n = args.requests + 1
+    requests = {}
+    if "transcribe-live" in args.scenarios:
+        for seconds in args.live_seconds:
+            requests[f"transcribe-live[{seconds:g}s]"] = [
+                {"url": "/v1/transcribe-live", "data": fields,
+                 "files": {"audio_file": ("clip.wav", fakes.synthetic_wav(seconds, seed=i), "audio/wav")}}
+                for i in range(n)
+            ]
+    if "transcribe-recorded" in args.scenarios:
+        for seconds in args.recorded_seconds:
+            requests[f"transcribe-recorded[{seconds:g}s]"] = [
+                {"url": "/v1/transcribe-recorded", "data": fields,
+                 "files": {"audio_file": ("session.wav", fakes.synthetic_wav(seconds, seed=10_000 + i), "audio/wav")}}
+                for i in range(n)
+            ]
+    if "summarize-text" in args.scenarios:
+        requests["summarize-text"] = [
+            {"url": "/v1/summarize-text", "data": {**fields, "long_text": _long_text(args.text_words, seed=i)}}
+            for i in range(n)
+        ]
+    if "expand" in args.scenarios:
+        requests["expand"] = [
+            {"url": "/v1/expand", "json": {
+                "brief": f"Student {i} reports worry and tension before exams.",
+                "audience": "parent", "tone": "supportive",
+            }}
+            for i in range(n)
+        ]
+    return requests
+
+
+async def run_scenario(client, requests: list, concurrency: int, stages: StageTimer) -> dict:
+    await client.post(**requests[0])  # warmup: model load, first-call overheads
+    stages.reset()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(kwargs):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(**kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(kwargs) for kwargs in requests[1:]))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "latency": percentiles(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "errors": errors,
+        "peak_rss_mb": rss.peak_mb,
+        "stages": stages.report(),
+    }
+
+
+async def run_all(app, args, stages: StageTimer) -> dict:
+    import httpx
+
+    requests = build_requests(args)
+    results = {}
+    async with app.router.lifespan_context(app):
+        stages.install()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name, scenario_requests in requests.items():
+                print(f"running {name} ...", file=sys.stderr)
+                results[name] = await run_scenario(client, scenario_requests, args.concurrency, stages)
+    return results
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: dict, baseline: dict = None):
+    header = f"{'scenario':<28}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}{'err':>5}{'RSS MB':>9}"
+    print(header)
+    for name, r in results.items():
+        lat = r["latency"]
+        print(f"{name:<28}{lat['p50_ms']:>10}{lat['p95_ms']:>10}{lat['p99_ms']:>10}"
+              f"{r['throughput_rps']:>9}{r['errors']:>5}{r['peak_rss_mb']:>9}")
+        for stage, s in r["stages"].items():
+            print(f"  {stage:<26}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}")
+        old = (baseline or {}).get(name)
+        if old:
+            def delta(new, prev):
+                return f"{100 * (new - prev) / prev:+.1f}%" if prev else "n/a"
+            print(f"  {'vs baseline':<26}{delta(lat['p50_ms'], old['latency']['p50_ms']):>10}"
+                  f"{delta(lat['p95_ms'], old['latency']['p95_ms']):>10}"
+                  f"{delta(lat['p99_ms'], old['latency']['p99_ms']):>10}"
+                  f"{delta(r['throughput_rps'], old['throughput_rps']):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=16, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--live-seconds", type=float, nargs="+", default=[5, 15])
+    parser.add_argument("--recorded-seconds", type=float, nargs="+", default=[30, 120])
+    parser.add_argument("--text-words", type=int, default=800, help="length of /summarize-text input")
+    parser.add_argument("--provider-latency-ms", type=float, default=200)
+    parser.add_argument("--provider-jitter-ms", type=float, default=50)
+    parser.add_argument("--provider-error-rate", type=float, default=0.0)
+    parser.add_argument("--whisper-rtf", type=float, nargs=2, default=[0.02, 0.1], metavar=("BASE", "LARGE"),
+                        help="fake Whisper compute seconds per audio second")
+    parser.add_argument("--summarizer-ms", type=float, default=20, help="fake BART latency per call")
+    parser.add_argument("--llama-layers", type=int, default=2)
+    parser.add_argument("--llama-hidden", type=int, default=64)
+    parser.add_argument("--real-models", action="store_true", help="use the configured models instead of fakes")
+    parser.add_argument("--cache", action="store_true", help="leave the output cache on")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    # Must be in place before app.core.config is imported
+    os.environ.setdefault("TAD_STATE_DIR", tempfile.mkdtemp(prefix="tad_bench_"))
+    os.environ["PRELOAD_MODELS"] = ""
+    os.environ["OUTPUT_CACHE"] = "true" if args.cache else "false"
+    os.environ["OPENAI_BASE_URL"] = os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{stub_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "stub")
+
+    stub = serve_in_thread(
+        create_app(args.provider_latency_ms, args.provider_jitter_ms, args.provider_error_rate), stub_port
+    )
+
+    from app.main import app
+
+    if not args.real_models:
+        fakes.install(
+            whisper_rtf={"base": args.whisper_rtf[0], "large-v3": args.whisper_rtf[1]},
+            summarizer=fakes.FakeSummarizer(seconds_per_call=args.summarizer_ms / 1000),
+            llama=fakes.tiny_llama(hidden_size=args.llama_hidden, layers=args.llama_layers),
+        )
+
+    stages = StageTimer()
+    try:
+        results = asyncio.run(run_all(app, args, stages))
+    finally:
+        stub.should_exit = True
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+
+    if args.output:
+        report = {
+            "meta": {
+                "git_rev": _git_rev(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "cpu_count": os.cpu_count(),
+                "args": vars(args),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+PII redaction throughput: the old three-pass scrub_pii against the
+single-pass redaction engine.
+
+Texts are built from the notes in data/notes_summary.csv, concatenated to
+the requested length, with roster names, emails and phone numbers mixed in.
+
+    python -m benchmarks.bench_redaction --words 200 9000 --texts 50
+"""
+import argparse
+import csv
+import json
+import random
+import re
+import time
+
+from app.services.redaction import Redactor, load_roster
+
+NAME_RE = re.compile(r"\b([A-Z][a-z]+(?:\s[A-Z][a-z]+)?)\b")
+PHONE_RE = re.compile(r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b")
+EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+
+
+def legacy_scrub_pii(text: str) -> str:
+    """scrub_pii as it was before the redaction engine, for comparison."""
+    t = EMAIL_RE.sub("[redacted email]", text)
+    t = PHONE_RE.sub("[redacted phone]", t)
+    t = NAME_RE.sub(lambda m: "the student" if " " in m.group(0) or m.group(0)[0].isupper() else m.group(0), t)
+    return t
+
+
+def build_texts(notes_path: str, roster: list, words: int, count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    with open(notes_path, newline="", encoding="utf-8") as f:
+        sentences = [s for row in csv.DictReader(f) for s in row["notes"].split(". ") if s]
+    texts = []
+    for _ in range(count):
+        out, n = [], 0
+        while n < words:
+            sentence = rng.choice(sentences)
+            roll = rng.random()
+            if roll < 0.05 and roster:
+                sentence = f"{rng.choice(roster)} said {sentence.lower()}"
+            elif roll < 0.06:
+                sentence += f", reach them at parent{rng.randint(1, 999)}@example.org"
+            elif roll < 0.07:
+                sentence += f", call {rng.randint(200, 999)}-555-{rng.randint(1000, 9999)}"
+            out.append(sentence)
+            n += len(sentence.split())
+        texts.append(". ".join(out) + ".")
+    return texts
+
+
+def measure(fn, texts: list, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - start)
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 2 ** 20
+    return {
+        "seconds": round(best, 4),
+        "texts_per_second": round(len(texts) / best, 1),
+        "mb_per_second": round(size_mb / best, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", default="data/notes_summary.csv")
+    parser.add_argument("--roster", default="data/students.csv")
+    parser.add_argument("--words", type=int, nargs="+", default=[60, 1500, 9000],
+                        help="words per text (a brief, a session, about an hour of speech)")
+    parser.add_argument("--texts", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    roster = load_roster(args.roster)
+    brief_mode = Redactor(roster, heuristic_names=True)
+    transcript_mode = Redactor(roster)
+
+    results = []
+    for words in args.words:
+        texts = build_texts(args.notes, roster, words, args.texts)
+        legacy = [legacy_scrub_pii(t) for t in texts]
+        same = sum(old == new.text for old, new in zip(legacy, brief_mode.redact_batch(texts)))
+        row = {
+            "words": words,
+            "texts": len(texts),
+            "legacy_scrub_pii": measure(lambda ts: [legacy_scrub_pii(t) for t in ts], texts, args.repeat),
+            "engine_heuristic_names": measure(brief_mode.redact_batch, texts, args.repeat),
+            "engine_roster_only": measure(transcript_mode.redact_batch, texts, args.repeat),
+            "identical_to_legacy": f"{same}/{len(texts)}",
+        }
+        results.append(row)
+
+    print(f"{'words':>7}{'legacy MB/s':>14}{'engine MB/s':>14}{'roster MB/s':>14}{'same output':>14}")
+    for r in results:
+        print(f"{r['words']:>7}{r['legacy_scrub_pii']['mb_per_second']:>14}"
+              f"{r['engine_heuristic_names']['mb_per_second']:>14}"
+              f"{r['engine_roster_only']['mb_per_second']:>14}{r['identical_to_legacy']:>14}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Stand-in models for benchmarking the service without real weights.
+
+The fakes honour the interfaces the app relies on and spend a configurable
+amount of wall time per unit of work, so scheduling, caching, decoding and
+serialization overheads are measured for real while model compute is
+simulated. install() swaps them into the model registry.
+"""
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+Segment = namedtuple("Segment", "start end text")
+TranscriptionInfo = namedtuple("TranscriptionInfo", "language language_probability duration")
+
+WORDS = (
+    "student session goals coping stress exams family peers support plan "
+    "breathing triggers school counselor progress follow up safety weekly"
+).split()
+
+
+class FakeWhisper:
+    """faster_whisper.WhisperModel look-alike: `rtf` seconds of compute per audio second."""
+
+    def __init__(self, rtf: float = 0.05, words_per_second: float = 2.5, segment_seconds: float = 5.0):
+        self.rtf = rtf
+        self.words_per_second = words_per_second
+        self.segment_seconds = segment_seconds
+
+    def transcribe(self, audio, **options):
+        if isinstance(audio, str):
+            from app.utils.audio import load_audio
+            audio = load_audio(audio)
+        duration = len(audio) / SAMPLE_RATE
+        info = TranscriptionInfo("en", 0.99, duration)
+
+        def segments():
+            start = 0.0
+            while start < duration:
+                end = min(duration, start + self.segment_seconds)
+                time.sleep((end - start) * self.rtf)
+                n = max(1, int((end - start) * self.words_per_second))
+                text = " ".join(WORDS[(int(start) + i) % len(WORDS)] for i in range(n))
+                yield Segment(start, end, text + ".")
+                start = end
+
+        return segments(), info
+
+
+class _WordTokenizer:
+    def __call__(self, text, add_special_tokens=True, **kwargs):
+        ids = list(range(len(text.split())))
+        return {"input_ids": ids + ([0, 2] if add_special_tokens else [])}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(WORDS[i % len(WORDS)] for i in ids)
+
+
+class FakeSummarizer:
+    """transformers summarization pipeline look-alike with per-token cost."""
+
+    def __init__(self, seconds_per_call: float = 0.02, seconds_per_token: float = 0.0002):
+        self.tokenizer = _WordTokenizer()
+        self.seconds_per_call = seconds_per_call
+        self.seconds_per_token = seconds_per_token
+
+    def __call__(self, texts, max_length: int = 142, **kwargs):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        tokens = sum(len(t.split()) for t in batch)
+        time.sleep(self.seconds_per_call + tokens * self.seconds_per_token)
+        return [
+            {"summary_text": " ".join(t.split()[:max(1, min(max_length // 2, 60))]).rstrip(".") + "."}
+            for t in batch
+        ]
+
+
+def tiny_llama(hidden_size: int = 64, layers: int = 2, vocab_size: int = 512, seed: int = 0):
+    """
+    A randomly initialised Llama and a word-level tokenizer with a chat
+    template. Real transformers code paths, a fraction of the compute.
+    """
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=vocab_size, hidden_size=hidden_size, intermediate_size=hidden_size * 2,
+        num_hidden_layers=layers, num_attention_heads=4, num_key_value_heads=2,
+        bos_token_id=1, eos_token_id=2,
+    )
+    model = LlamaForCausalLM(config).eval()
+    model.generation_config.do_sample = True
+
+    vocab = {"<pad>": 0, "<s>": 1, "</s>": 2, "[UNK]": 3}
+    vocab.update({f"w{i}": i for i in range(4, vocab_size)})
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, bos_token="<s>", eos_token="</s>", unk_token="[UNK]", pad_token="<pad>"
+    )
+    tokenizer.chat_template = (
+        "<s>{% for m in messages %}{{ m['role'] }} {{ m['content'] }} </s> {% endfor %}"
+        "{% if add_generation_prompt %}assistant {% endif %}"
+    )
+    return model, tokenizer
+
+
+def install(whisper_rtf: dict = None, summarizer: FakeSummarizer = None, llama: tuple = None,
+            draft=None):
+    """
+    Register fakes over the real loaders. Call after importing app.main so
+    the model modules have already registered theirs.
+    """
+    from app.models.registry import registry
+
+    whisper_rtf = whisper_rtf or {"base": 0.02, "large-v3": 0.1}
+    for size, rtf in whisper_rtf.items():
+        registry.register(f"whisper:{size}", lambda rtf=rtf: FakeWhisper(rtf=rtf))
+    summarizer = summarizer or FakeSummarizer()
+    registry.register("bart", lambda: summarizer)
+    model, tokenizer = llama or tiny_llama()
+    registry.register("llama", lambda: model)
+    registry.register("llama-tokenizer", lambda: tokenizer)
+    # A smaller Llama over the same vocabulary, for assisted decoding
+    draft = draft or tiny_llama(hidden_size=32, layers=1, vocab_size=model.config.vocab_size, seed=1)[0]
+    registry.register("llama-draft", lambda: draft)
+
+
+def synthetic_wav(seconds: float, seed: int = 0) -> bytes:
+    """16 kHz mono 16-bit WAV of a voiced-ish tone plus noise. Seeds give distinct bytes."""
+    import io
+    import wave
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t)  # syllable-rate amplitude modulation
+    signal = 0.3 * envelope * np.sin(2 * np.pi * 180 * t) + 0.02 * rng.standard_normal(t.size)
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
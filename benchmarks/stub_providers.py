@@ -0,0 +1,84 @@
+"""
+Local stand-in for the OpenAI and Anthropic HTTP APIs.
+
+Serves /v1/chat/completions and /v1/messages with an injectable latency
+(fixed + jitter) and error rate, so the provider client layer can be
+exercised, and benchmarked, without network access or API keys.
+
+    python -m benchmarks.stub_providers --port 8901 --latency-ms 300 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import random
+import socket
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency_ms: float = 200, jitter_ms: float = 50, error_rate: float = 0.0) -> FastAPI:
+    app = FastAPI()
+    app.state.requests = 0
+
+    async def simulate(request: Request):
+        app.state.requests += 1
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+        if random.random() < error_rate:
+            return JSONResponse({"error": {"message": "overloaded"}}, status_code=random.choice([429, 503]))
+        body = await request.json()
+        words = body["messages"][-1]["content"].split()
+        return " ".join(words[:min(len(words), 60)])
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        text = await simulate(request)
+        if isinstance(text, JSONResponse):
+            return text
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]}
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        text = await simulate(request)
+        if isinstance(text, JSONResponse):
+            return text
+        return {"content": [{"type": "text", "text": text}]}
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app: FastAPI, port: int):
+    """Run the stub on a daemon thread; returns the uvicorn server (set .should_exit to stop)."""
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="stub-providers", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("stub provider server did not start")
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
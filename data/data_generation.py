@@ -1,40 +1,28 @@
-# Generate synthetic CSVs and SQL schema for the user's FastAPI project.
-# Files created:
-# - /mnt/data/tad_transcriber/data/students.csv
-# - /mnt/data/tad_transcriber/data/notes_summary.csv
-# - /mnt/data/tad_transcriber/data/notes_generation.csv
-# - /mnt/data/tad_transcriber/db/schema.sql
-
-import os, csv, random, uuid, datetime, textwrap, json
+# Generate synthetic CSV/Parquet/Arrow datasets (and matching audio) for the
+# tad-ai service: students, notes_summary and notes_generation.
+#
+#   python data/data_generation.py                        # CSVs in <tmp>/tad-ai-data
+#   python data/data_generation.py --students 1000000 --generation-rows 5000000 \
+#       --format parquet --shards 16 --workers 8 --out-dir /scratch/tad
+#   python data/data_generation.py --audio-rows 200 --audio-dir data/audio
+#
+# The committed data/*.csv predate this generator and are not reproduced by
+# it. Output goes to a scratch directory unless --out-dir says otherwise, so
+# a bare run can't replace them (data/students.csv is the redaction roster).
+#
+# Every row is derived from (seed, table, row index) alone, so output is
+# identical for a given seed regardless of shard or worker count. Shards are
+# written in parallel with bounded memory; CSV shards are concatenated into a
+# single file, Parquet/Arrow shards are kept as a directory of parts.
+
+import argparse, csv, datetime, os, random, shutil, tempfile, uuid, wave
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-# Try to use Faker for better names; fallback if unavailable.
-try:
-    from faker import Faker
-    fake = Faker()
-except Exception:
-    class _MiniFake:
-        first = ["Alex","Sam","Jamie","Jordan","Taylor","Morgan","Casey","Riley","Avery","Quinn",
-                 "Noah","Liam","Mason","Ethan","Logan","Lucas","Emma","Olivia","Ava","Sophia"]
-        last  = ["Kimani","Otieno","Mwangi","Mutiso","Njoroge","Omollo","Omondi","Kiptoo","Barasa","Cheruiyot",
-                 "Smith","Brown","Wilson","Johnson","Davis","Miller","Garcia","Martinez","Lopez","Gonzalez"]
-        def name(self):
-            return f"{random.choice(self.first)} {random.choice(self.last)}"
-    fake = _MiniFake()
-
-BASE = Path("/tad_ai")
-DATA = BASE / "data"
-DB   = BASE / "db"
-DATA.mkdir(parents=True, exist_ok=True)
-DB.mkdir(parents=True, exist_ok=True)
-
-# -------------------------
-# CONFIG
-# -------------------------
-N_STUDENTS = 1200
-NOTES_PER_STUDENT = 3  # avg
-N_NOTES = N_STUDENTS * NOTES_PER_STUDENT  # 3600 >= 3000
-N_GEN = 3200  # notes_generation
+FIRST_NAMES = ["Alex","Sam","Jamie","Jordan","Taylor","Morgan","Casey","Riley","Avery","Quinn",
+               "Noah","Liam","Mason","Ethan","Logan","Lucas","Emma","Olivia","Ava","Sophia"]
+LAST_NAMES  = ["Kimani","Otieno","Mwangi","Mutiso","Njoroge","Omollo","Omondi","Kiptoo","Barasa","Cheruiyot",
+               "Smith","Brown","Wilson","Johnson","Davis","Miller","Garcia","Martinez","Lopez","Gonzalez"]
 
 GENDERS = ["male", "female", "nonbinary"]
 USER_TYPES = ["Therapist", "Counselor", "Patient"]
@@ -45,25 +33,40 @@ AUDIENCES = ["school_staff","therapist","student","parent"]
 TONES = ["neutral_clinical","supportive","plain_language","culturally_sensitive",
          "formal_report","student_friendly","parent_friendly","crisis_informational"]
 
+COLUMNS = {
+    "students": ["student_id","student_name","gender"],
+    "notes_summary": ["uuid","student_id","notes","summary","prompt","user_type","note_type","issue","session_date"],
+    "notes_generation": ["uuid","brief","notes","audience","tone","issue_tag"],
+}
+
+SAMPLE_RATE = 16000
+WORDS_PER_SECOND = 2.5  # conversational speech rate used to size audio
+
+def row_rng(seed, table, index):
+    # Independent stream per row: reproducible and shard-count agnostic
+    return random.Random(f"{seed}:{table}:{index}")
+
+def row_uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
 # Distributions: keep balanced by cycling rather than pure random
 def cycle_pick(pool, i):
     return pool[i % len(pool)]
 
-def cycle_multi_issues(index):
+def cycle_multi_issues(index, rng):
     # Ensure each issue appears roughly equally by rotating the start
-    k = random.choice([1,2,3])  # 1-3 issues per note
+    k = rng.choice([1,2,3])  # 1-3 issues per note
     start = index % len(ISSUES)
     picks = []
     for j in range(k):
         picks.append(ISSUES[(start + j) % len(ISSUES)])
     return picks
 
-def rand_sentence(words=12):
-    # simple sentence builder if Faker isn't available
+def rand_sentence(rng, words=12):
     parts = ["student","reports","concern","about","stress","and","home","situation","with","peers","and","exams"]
-    return " ".join(random.sample(parts, min(len(parts), words))).capitalize() + "."
+    return " ".join(rng.sample(parts, min(len(parts), words))).capitalize() + "."
 
-def make_transcript(issues_list):
+def make_transcript(issues_list, rng):
     openings = [
         "Okay so this session focused on",
         "In today's conversation we explored",
@@ -79,11 +82,11 @@ def make_transcript(issues_list):
         "The conversation stayed practical and respectful throughout.",
     ]
     sents = [
-        f"{random.choice(openings)} {', '.join(issues_list).replace('_',' ')}.",
+        f"{rng.choice(openings)} {', '.join(issues_list).replace('_',' ')}.",
         "The goal was to understand triggers and plan small next steps.",
-        random.choice(fillers),
-        rand_sentence(10),
-        rand_sentence(10),
+        rng.choice(fillers),
+        rand_sentence(rng, 10),
+        rand_sentence(rng, 10),
     ]
     return " ".join(sents)
 
@@ -139,56 +142,235 @@ def expand_text(brief, audience, tone):
     return " ".join(p for p in paragraphs if p)
 
 # -------------------------
-# Generate students
+# Rows, one per index
+# -------------------------
+def student_row(i, cfg):
+    rng = row_rng(cfg["seed"], "students", i)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    return [i + 1, name, cycle_pick(GENDERS, i)]
+
+def notes_summary_row(idx, cfg):
+    rng = row_rng(cfg["seed"], "notes_summary", idx)
+    note_uuid = row_uuid(rng)
+    sid = idx // cfg["notes_per_student"] + 1
+    user_type = cycle_pick(USER_TYPES, idx)
+    note_type = cycle_pick(NOTE_TYPES, idx)
+    issues_list = cycle_multi_issues(idx, rng)
+    issues_csv = "{" + ",".join(issues_list) + "}"
+    transcript = make_transcript(issues_list, rng)
+    summary = make_summary(issues_list, user_type, note_type)
+    # spread dates evenly over the year from start_date
+    dt = cfg["start_date"] + datetime.timedelta(days=int((365 / cfg["n_notes"]) * idx))
+    return [note_uuid, sid, transcript, summary, make_prompt(), user_type, note_type, issues_csv, dt.isoformat()]
+
+def notes_generation_row(i, cfg):
+    rng = row_rng(cfg["seed"], "notes_generation", i)
+    issue = cycle_pick(ISSUES, i)
+    audience = cycle_pick(AUDIENCES, i)
+    tone = cycle_pick(TONES, i)
+    brief = brief_from_issue(issue)
+    return [row_uuid(rng), brief, expand_text(brief, audience, tone), audience, tone, issue]
+
+ROW_BUILDERS = {
+    "students": student_row,
+    "notes_summary": notes_summary_row,
+    "notes_generation": notes_generation_row,
+}
+
+# -------------------------
+# Writers (streaming, bounded memory)
 # -------------------------
-students_path = DATA / "students.csv"
-with students_path.open("w", newline="", encoding="utf-8") as f:
-    w = csv.writer(f)
-    w.writerow(["student_id","student_name","gender"])
-    for sid in range(1, N_STUDENTS+1):
-        name = fake.name()
-        gender = cycle_pick(GENDERS, sid-1)
-        w.writerow([sid, name, gender])
+class CsvShardWriter:
+    def __init__(self, path, columns):
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.w = csv.writer(self.f)
+        self.w.writerow(columns)
+
+    def write(self, rows):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class ArrowShardWriter:
+    """Parquet or Arrow IPC shard, written one record batch at a time."""
+
+    def __init__(self, path, columns, fmt):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(c, pa.int64() if c == "student_id" else pa.string()) for c in columns])
+        if fmt == "parquet":
+            self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema)
+
+    def write(self, rows):
+        cols = list(zip(*rows))
+        self.writer.write_batch(self.pa.record_batch(
+            [self.pa.array(col, type=field.type) for col, field in zip(cols, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+def open_writer(path, columns, fmt):
+    if fmt == "csv":
+        return CsvShardWriter(path, columns)
+    return ArrowShardWriter(path, columns, fmt)
+
+def write_shard(table, shard, start, stop, out_path, fmt, batch_rows, cfg):
+    build = ROW_BUILDERS[table]
+    writer = open_writer(out_path, COLUMNS[table], fmt)
+    try:
+        batch = []
+        for i in range(start, stop):
+            batch.append(build(i, cfg))
+            if len(batch) >= batch_rows:
+                writer.write(batch)
+                batch = []
+        if batch:
+            writer.write(batch)
+    finally:
+        writer.close()
+    return table, shard, stop - start
 
 # -------------------------
-# Generate notes_summary
+# Synthetic audio matching notes_summary rows
 # -------------------------
-notes_path = DATA / "notes_summary.csv"
-start_date = datetime.date.today() - datetime.timedelta(days=365)
-
-with notes_path.open("w", newline="", encoding="utf-8") as f:
-    w = csv.writer(f)
-    w.writerow([
-        "uuid","student_id","notes","summary","prompt","user_type","note_type","issue","session_date"
-    ])
-    idx = 0
-    for sid in range(1, N_STUDENTS+1):
-        # 3 notes per student
-        for s in range(NOTES_PER_STUDENT):
-            note_uuid = str(uuid.uuid4())
-            user_type = cycle_pick(USER_TYPES, idx)
-            note_type = cycle_pick(NOTE_TYPES, idx)
-            issues_list = cycle_multi_issues(idx)
-            issues_csv = "{" + ",".join(issues_list) + "}"
-            transcript = make_transcript(issues_list)
-            summary = make_summary(issues_list, user_type, note_type)
-            prompt = make_prompt()
-            # spread dates evenly
-            dt = start_date + datetime.timedelta(days=int((365/N_NOTES)*idx))
-            w.writerow([note_uuid, sid, transcript, summary, prompt, user_type, note_type, issues_csv, dt.isoformat()])
-            idx += 1
+def synthetic_speech(seconds, rng):
+    """Voiced-ish tone with syllable-rate modulation and noise; pitch varies per row."""
+    import numpy as np
+
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = rng.uniform(100, 240)
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(2.5, 4.5) * t)
+    noise = np.random.default_rng(rng.getrandbits(32)).standard_normal(t.size)
+    signal = 0.3 * envelope * np.sin(2 * np.pi * pitch * t) + 0.02 * noise
+    return (np.clip(signal, -1, 1) * 32767).astype("<i2")
+
+def write_audio_shard(shard, start, stop, audio_dir, audio_seconds, cfg):
+    manifest = []
+    for idx in range(start, stop):
+        row = notes_summary_row(idx, cfg)
+        note_uuid, transcript = row[0], row[2]
+        seconds = audio_seconds or max(1.0, len(transcript.split()) / WORDS_PER_SECOND)
+        path = Path(audio_dir) / f"{note_uuid}.wav"
+        with wave.open(str(path), "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            w.writeframes(synthetic_speech(seconds, row_rng(cfg["seed"], "audio", idx)).tobytes())
+        manifest.append([note_uuid, path.name, round(seconds, 2)])
+    return shard, manifest
 
 # -------------------------
-# Generate notes_generation
+# Orchestration
 # -------------------------
-gen_path = DATA / "notes_generation.csv"
-with gen_path.open("w", newline="", encoding="utf-8") as f:
-    w = csv.writer(f)
-    w.writerow(["uuid","brief","notes","audience","tone","issue_tag"])
-    for i in range(N_GEN):
-        issue = cycle_pick(ISSUES, i)
-        audience = cycle_pick(AUDIENCES, i)
-        tone = cycle_pick(TONES, i)
-        brief = brief_from_issue(issue)
-        expanded = expand_text(brief, audience, tone)
-        w.writerow([str(uuid.uuid4()), brief, expanded, audience, tone, issue])
+def shard_ranges(n_rows, shards):
+    size = -(-n_rows // shards) if n_rows else 0
+    return [(s, s * size, min(n_rows, (s + 1) * size)) for s in range(shards) if s * size < n_rows]
+
+def merge_csv_shards(parts, out_path):
+    with open(out_path, "wb") as out:
+        for n, part in enumerate(parts):
+            with open(part, "rb") as f:
+                if n:
+                    f.readline()  # header already written by the first part
+                shutil.copyfileobj(f, out)
+            os.remove(part)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic tad-ai datasets.")
+    parser.add_argument("--out-dir", default=os.path.join(tempfile.gettempdir(), "tad-ai-data"),
+                        help="defaults to a scratch directory, never the committed data/")
+    parser.add_argument("--students", type=int, default=1200)
+    parser.add_argument("--notes-per-student", type=int, default=3)
+    parser.add_argument("--generation-rows", type=int, default=3200)
+    parser.add_argument("--tables", nargs="+", choices=sorted(COLUMNS), default=list(COLUMNS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start-date", default="2024-10-01",
+                        help="first session date; notes are spread over the following year")
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    parser.add_argument("--shards", type=int, default=1, help="shards per table")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-rows", type=int, default=10000, help="rows buffered per write")
+    parser.add_argument("--audio-rows", type=int, default=0,
+                        help="write WAVs for the first N notes_summary rows")
+    parser.add_argument("--audio-dir", help="defaults to <out-dir>/audio")
+    parser.add_argument("--audio-seconds", type=float,
+                        help="fixed clip length; default is sized from each transcript")
+    args = parser.parse_args(argv)
+    if args.format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error(f"--format {args.format} requires pyarrow (pip install pyarrow)")
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_notes = args.students * args.notes_per_student
+    cfg = {
+        "seed": args.seed,
+        "notes_per_student": args.notes_per_student,
+        "n_notes": max(1, n_notes),
+        "start_date": datetime.date.fromisoformat(args.start_date),
+    }
+    n_rows = {"students": args.students, "notes_summary": n_notes, "notes_generation": args.generation_rows}
+    ext = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}[args.format]
+
+    jobs = []
+    for table in args.tables:
+        ranges = shard_ranges(n_rows[table], max(1, args.shards))
+        if args.format == "csv" and len(ranges) <= 1:
+            paths = [out_dir / f"{table}.csv"]
+        elif args.format == "csv":
+            paths = [out_dir / f"{table}.part-{s:05d}.csv" for s, _, _ in ranges]
+        else:
+            (out_dir / table).mkdir(exist_ok=True)
+            paths = [out_dir / table / f"part-{s:05d}.{ext}" for s, _, _ in ranges]
+        for (shard, start, stop), path in zip(ranges, paths):
+            jobs.append((table, shard, start, stop, str(path)))
+
+    audio_dir = Path(args.audio_dir or out_dir / "audio")
+    audio_ranges = shard_ranges(min(args.audio_rows, n_notes), max(1, args.workers))
+    if audio_ranges:
+        audio_dir.mkdir(parents=True, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [
+            pool.submit(write_shard, table, shard, start, stop, path, args.format, args.batch_rows, cfg)
+            for table, shard, start, stop, path in jobs
+        ]
+        audio_futures = [
+            pool.submit(write_audio_shard, shard, start, stop, str(audio_dir), args.audio_seconds, cfg)
+            for shard, start, stop in audio_ranges
+        ]
+        written = {}
+        for future in futures:
+            table, _, count = future.result()
+            written[table] = written.get(table, 0) + count
+        manifests = sorted((f.result() for f in audio_futures), key=lambda r: r[0])
+
+    if args.format == "csv":
+        for table in args.tables:
+            parts = sorted(p for _, _, _, _, p in [j for j in jobs if j[0] == table] if ".part-" in p)
+            if parts:
+                merge_csv_shards(parts, out_dir / f"{table}.csv")
+
+    if manifests:
+        with (audio_dir / "manifest.csv").open("w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["uuid", "audio_file", "seconds"])
+            for _, manifest in manifests:
+                w.writerows(manifest)
+        written["audio"] = sum(len(m) for _, m in manifests)
+
+    for name, count in written.items():
+        print(f"{name}: {count} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from app.core.constants import EDU_DISCLAIMER
+from app.services.stopping import ExpansionStop, stopping_criteria
+
+
+class CharTokenizer:
+    """One token per character, so every step sees exactly one more char."""
+
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids)
+
+
+def _run(text, max_paragraphs=4):
+    """Feed `text` one token at a time; return the stop and the text generated when it fired."""
+    tokenizer = CharTokenizer()
+    ids = tokenizer.encode(text)
+    stop = ExpansionStop(tokenizer, max_paragraphs)
+    for n in range(1, len(ids) + 1):
+        if stop(ids[:n]):
+            return stop, tokenizer.decode(ids[:n])
+    return stop, text
+
+
+def test_body_mentioning_disclaimers_does_not_stop():
+    text = (
+        "Worry before exams is common.\n"
+        "A disclaimer on a worksheet is not a substitute for professional support from a counselor.\n"
+        "These notes are for educational purposes only in the sense that they explain the idea.\n"
+        "Breathing exercises help many students settle.\n"
+    )
+    stop, generated = _run(text)
+    assert stop.reason is None
+    assert generated == text
+
+
+def test_closing_disclaimer_stops():
+    body = "Worry before exams is common.\nBreathing exercises help many students settle.\n"
+    text = f"{body}*{EDU_DISCLAIMER}*\nExtra text after the disclaimer."
+    stop, generated = _run(text)
+    assert stop.reason == "disclaimer"
+    assert generated == f"{body}*{EDU_DISCLAIMER}*\n"
+
+
+def test_labelled_disclaimer_line_stops():
+    text = "Worry before exams is common.\n**Disclaimer:** talk to your school counselor.\nMore."
+    stop, _ = _run(text)
+    assert stop.reason == "disclaimer"
+
+
+def test_long_line_opening_like_disclaimer_does_not_stop():
+    line = "This text is for educational purposes only " + "and keeps going " * 40
+    stop, _ = _run(f"Intro line.\n{line}\n")
+    assert stop.reason is None
+
+
+def test_paragraph_limit_stops():
+    text = "One.\n\nTwo.\n\nThree.\n\nFour.\n"
+    stop, _ = _run(text, max_paragraphs=2)
+    assert stop.reason == "paragraphs"
+
+
+def test_criteria_stop_rows_at_their_own_budget():
+    import torch
+
+    criteria = stopping_criteria([None, None], start=2, max_new_tokens=[3, 5])
+    assert criteria(torch.zeros((2, 5), dtype=torch.long), None).tolist() == [True, False]
+    assert criteria(torch.zeros((2, 7), dtype=torch.long), None).tolist() == [True, True]
@@ -0,0 +1,126 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import app.api.v1.routes_uploads as routes_uploads
+from app.services.uploads import UploadError, UploadStore
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(root=str(tmp_path), decode_ahead=False)
+
+
+def _put(store, upload_id, start, end):
+    writer = store.open_range(upload_id, start, end, len(DATA))
+    try:
+        writer.write(DATA[start:end + 1])
+    finally:
+        writer.close()
+
+
+def test_ranges_append_in_order(store):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 4095)
+    _put(store, upload_id, 4096, len(DATA) - 1)
+    upload = store.finalize(upload_id)
+    assert open(upload["path"], "rb").read() == DATA
+    assert upload["audio_hash"] == hashlib.sha256(DATA).hexdigest()
+    assert upload["suffix"] == ".wav"
+
+
+def test_duplicate_and_overlapping_ranges_are_skipped(store):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 4095)
+    _put(store, upload_id, 0, 4095)
+    _put(store, upload_id, 2048, len(DATA) - 1)
+    assert store.status(upload_id)["received"] == len(DATA)
+    assert store.finalize(upload_id)["audio_hash"] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_range_past_received_bytes_is_rejected(store):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 1023)
+    with pytest.raises(UploadError) as e:
+        store.open_range(upload_id, 2048, 4095, len(DATA))
+    assert e.value.status_code == 409
+    assert e.value.received == 1024
+
+
+def test_resume_after_restart(store, tmp_path):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 5000)
+
+    restarted = UploadStore(root=str(tmp_path), decode_ahead=False)
+    received = restarted.status(upload_id)["received"]
+    assert received == 5001
+    _put(restarted, upload_id, received, len(DATA) - 1)
+    assert restarted.finalize(upload_id)["audio_hash"] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_finalize_incomplete_upload(store):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 1023)
+    with pytest.raises(UploadError) as e:
+        store.finalize(upload_id)
+    assert e.value.status_code == 409
+    assert e.value.received == 1024
+
+
+def test_prune_expires_idle_uploads(tmp_path):
+    store = UploadStore(root=str(tmp_path), ttl_seconds=-1, decode_ahead=False)
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, 1023)
+    store.prune()
+    with pytest.raises(UploadError) as e:
+        store.status(upload_id)
+    assert e.value.status_code == 404
+    assert upload_id not in store._live
+
+
+def test_live_state_freed_when_another_worker_deletes(store, tmp_path):
+    upload_id = store.create("session.wav", len(DATA))["upload_id"]
+    _put(store, upload_id, 0, len(DATA) - 1)
+    assert upload_id in store._live
+
+    UploadStore(root=str(tmp_path), decode_ahead=False).delete(upload_id)
+    store.sweep_live()
+    assert upload_id not in store._live
+
+
+def test_finalize_failure_keeps_upload_for_retry(store, monkeypatch):
+    calls = []
+
+    def run_transcription(path, user_type, note_type, prompt, model_size, suffix, **kwargs):
+        calls.append(kwargs["audio_hash"])
+        if len(calls) == 1:
+            raise RuntimeError("model server unavailable")
+        return {"original_transcript": "transcript"}
+
+    monkeypatch.setattr(routes_uploads, "get_upload_store", lambda: store)
+    monkeypatch.setattr(routes_uploads, "run_transcription", run_transcription)
+    api = FastAPI()
+    api.include_router(routes_uploads.router, prefix="/v1")
+    client = TestClient(api, raise_server_exceptions=False)
+
+    upload_id = client.post("/v1/uploads", json={"filename": "session.wav", "size": len(DATA)}).json()["upload_id"]
+    client.put(
+        f"/v1/uploads/{upload_id}", content=DATA,
+        headers={"Content-Range": f"bytes 0-{len(DATA) - 1}/{len(DATA)}"},
+    )
+    form = {"user_type": "Therapist", "note_type": "Progress Note", "prompt": "Summarize"}
+
+    assert client.post(f"/v1/uploads/{upload_id}/finalize", data=form).status_code == 500
+    assert upload_id not in store._live
+    assert client.get(f"/v1/uploads/{upload_id}").json()["complete"]
+
+    response = client.post(f"/v1/uploads/{upload_id}/finalize", data=form)
+    assert response.status_code == 200
+    assert response.json() == {"original_transcript": "transcript"}
+    assert calls == [hashlib.sha256(DATA).hexdigest()] * 2
+    assert client.get(f"/v1/uploads/{upload_id}").status_code == 404
+    assert upload_id not in store._live